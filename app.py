@@ -1,7 +1,13 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from router import router as document_router
 from config import settings
+from services.minio_handler import get_minio_handler
+from services.render_pool import shutdown_render_pool
+from services.retention import get_retention_manager
+from services.tracing import TracingMiddleware, shutdown_tracing
+from services.warmup import run_warmup
 
 # Create FastAPI app
 app = FastAPI(
@@ -19,6 +25,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Server span per sampled request, continuing the caller's W3C traceparent
+app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(document_router, prefix="/api/v1")
 
@@ -26,3 +35,24 @@ app.include_router(document_router, prefix="/api/v1")
 async def startup_event():
     print(f"Starting {settings.APP_TITLE} v{settings.APP_VERSION}")
     print(f"Server running on http://{settings.HOST}:{settings.PORT}")
+    
+    # Create the shared MinIO client once per worker; the bucket is verified in the background.
+    # With local default storage MinIO may not exist at all; requests that ask for it verify the bucket on first use
+    if settings.DEFAULT_STORAGE == "minio":
+        get_minio_handler().start_bucket_revalidation()
+    
+    # Reclaim disk space from old and rarely downloaded files in the background
+    get_retention_manager().start()
+    
+    # Prime creators, pools and connections; /api/v1/ready reports ready once this finishes
+    app.state.warmup_task = asyncio.create_task(run_warmup())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    warmup_task = getattr(app.state, "warmup_task", None)
+    if warmup_task is not None:
+        warmup_task.cancel()
+    get_minio_handler().stop_bucket_revalidation()
+    get_retention_manager().stop()
+    shutdown_render_pool()
+    shutdown_tracing()
@@ -0,0 +1,107 @@
+"""Deterministic synthetic inputs for the creator benchmarks"""
+import os
+import random
+import sqlite3
+from typing import List
+
+WORDS = (
+    "revenue forecast quarter margin pipeline customer region growth churn target "
+    "invoice budget supplier contract delivery backlog headcount review summary risk"
+).split()
+
+def sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+def markdown_table(rng: random.Random, rows: int, cols: int) -> List[str]:
+    lines = ["|" + "|".join(f"Column {c + 1}" for c in range(cols)) + "|"]
+    lines.append("|" + "|".join("-------" for _ in range(cols)) + "|")
+    for _ in range(rows):
+        lines.append("|" + "|".join(str(rng.randint(0, 100000)) for _ in range(cols)) + "|")
+    return lines
+
+def docx_markdown(paragraphs: int = 200, tables: int = 0, rows: int = 20, cols: int = 5, seed: int = 1) -> str:
+    """Markdown for DocxCreator: headings, formatted paragraphs, lists and R x C tables"""
+    rng = random.Random(seed)
+    lines = ["# Synthetic report"]
+    for i in range(paragraphs):
+        if i % 25 == 0:
+            lines.append(f"## Section {i // 25 + 1}")
+        kind = i % 5
+        if kind == 0:
+            lines.append(f"**{sentence(rng, 4)}** {sentence(rng)} *{sentence(rng, 6)}*")
+        elif kind == 1:
+            lines.append(f"- {sentence(rng, 8)}")
+        elif kind == 2:
+            lines.append(f"{i}. {sentence(rng, 8)}")
+        elif kind == 3:
+            lines.append(f"[SIZE:14]{sentence(rng, 6)}[/SIZE] {sentence(rng)}")
+        else:
+            lines.append(sentence(rng, 20))
+    for t in range(tables):
+        lines.append(f"### Table {t + 1}")
+        lines.extend(markdown_table(rng, rows, cols))
+        lines.append("")
+    return "\n".join(lines)
+
+def excel_content(sheets: int = 1, tables: int = 1, rows: int = 1000, cols: int = 8, seed: int = 1) -> str:
+    """Content for ExcelCreator: sheets of formatted text and R x C tables"""
+    rng = random.Random(seed)
+    lines = []
+    for s in range(sheets):
+        lines.append(f"# Sheet {s + 1}")
+        lines.append(f"[BOLD]{sentence(rng, 5)}[/BOLD]")
+        for _ in range(tables):
+            lines.extend(markdown_table(rng, rows, cols))
+            lines.append("")
+    return "\n".join(lines)
+
+def write_images(folder: str, count: int = 3, size: int = 640) -> List[str]:
+    """Small PNG files for slides that reference local images"""
+    from PIL import Image
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"image_{i}.png")
+        if not os.path.exists(path):
+            Image.new("RGB", (size, size * 3 // 4), ((40 * i) % 256, 120, 200)).save(path)
+        paths.append(path)
+    return paths
+
+def presentation_html(slides: int = 20, table_rows: int = 0, table_cols: int = 4,
+                      images: List[str] = (), seed: int = 1) -> str:
+    """HTML deck for PresentationCreator: text and list slides, optionally with tables and images"""
+    rng = random.Random(seed)
+    parts = []
+    for s in range(slides):
+        body = [f"<h1>Slide {s + 1}</h1>", f"<p>{sentence(rng)}</p>"]
+        body.append("<ul>" + "".join(f"<li>{sentence(rng, 6)}</li>" for _ in range(4)) + "</ul>")
+        if table_rows:
+            header = "".join(f"<th>Col {c + 1}</th>" for c in range(table_cols))
+            rows = "".join(
+                "<tr>" + "".join(f"<td>{rng.randint(0, 9999)}</td>" for _ in range(table_cols)) + "</tr>"
+                for _ in range(table_rows)
+            )
+            body.append(f"<table><tr>{header}</tr>{rows}</table>")
+        if images:
+            body.append(f'<img src="{images[s % len(images)]}" width="4" height="3">')
+        parts.append(f'<div class="slide">{"".join(body)}</div>')
+    return "\n".join(parts)
+
+def sqlite_database(path: str, rows: int = 10000, cols: int = 8, seed: int = 1) -> str:
+    """SQLite file with a `results` table of `rows` x `cols` mixed-type values; returns its SQLAlchemy URL"""
+    if not os.path.exists(path):
+        rng = random.Random(seed)
+        conn = sqlite3.connect(path)
+        columns = ["id INTEGER PRIMARY KEY"] + [
+            f"c{c} {('REAL', 'TEXT', 'INTEGER')[c % 3]}" for c in range(1, cols)
+        ]
+        conn.execute(f"CREATE TABLE results ({', '.join(columns)})")
+        values = lambda i: [i] + [
+            (rng.random() * 1000, rng.choice(WORDS), rng.randint(0, 10 ** 6))[c % 3] for c in range(1, cols)
+        ]
+        conn.executemany(
+            f"INSERT INTO results VALUES ({', '.join('?' * cols)})", (values(i) for i in range(rows))
+        )
+        conn.commit()
+        conn.close()
+    return f"sqlite:///{os.path.abspath(path)}"
@@ -0,0 +1,113 @@
+"""In-memory stand-in for the parts of the MinIO client that MinioHandler uses"""
+import hashlib
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional
+from minio.deleteobjects import DeleteError
+from minio.error import S3Error
+
+class FakeObject:
+    def __init__(self, bucket_name: str, object_name: str, data: bytes, content_type: str,
+                 metadata: Optional[Dict[str, str]]):
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.data = data
+        self.size = len(data)
+        self.etag = hashlib.md5(data).hexdigest()
+        self.content_type = content_type
+        self.metadata = dict(metadata or {})
+        self.last_modified = datetime.now(timezone.utc)
+        self.is_dir = False
+
+class FakeResponse:
+    """Body of a GET, shaped like the urllib3 response the MinIO client returns"""
+    def __init__(self, data: bytes):
+        self._data = data
+        self._position = 0
+    
+    def read(self, amt: Optional[int] = None) -> bytes:
+        end = len(self._data) if amt is None else self._position + amt
+        chunk = self._data[self._position:end]
+        self._position += len(chunk)
+        return chunk
+    
+    def stream(self, amt: int = 65536) -> Iterator[bytes]:
+        while True:
+            chunk = self.read(amt)
+            if not chunk:
+                return
+            yield chunk
+    
+    def close(self):
+        pass
+    
+    def release_conn(self):
+        pass
+
+class InMemoryS3:
+    """
+    Thread-safe, process-local object store with the Minio client's method signatures.
+    Good enough to run the app without a MinIO server; nothing is persisted.
+    """
+    def __init__(self, endpoint: str = "fake-s3.local"):
+        self.endpoint = endpoint
+        self._buckets: Dict[str, Dict[str, FakeObject]] = {}
+        self._lock = threading.Lock()
+    
+    def _error(self, code: str, message: str, bucket_name: str, object_name: Optional[str] = None):
+        return S3Error(code, message, f"/{bucket_name}/{object_name or ''}", "fake", "fake", None,
+                       bucket_name, object_name)
+    
+    def _bucket(self, bucket_name: str) -> Dict[str, FakeObject]:
+        bucket = self._buckets.get(bucket_name)
+        if bucket is None:
+            raise self._error("NoSuchBucket", "The specified bucket does not exist", bucket_name)
+        return bucket
+    
+    def _object(self, bucket_name: str, object_name: str) -> FakeObject:
+        with self._lock:
+            obj = self._bucket(bucket_name).get(object_name)
+        if obj is None:
+            raise self._error("NoSuchKey", "The specified key does not exist", bucket_name, object_name)
+        return obj
+    
+    def bucket_exists(self, bucket_name: str) -> bool:
+        return bucket_name in self._buckets
+    
+    def make_bucket(self, bucket_name: str, location: Optional[str] = None):
+        with self._lock:
+            self._buckets.setdefault(bucket_name, {})
+    
+    def put_object(self, bucket_name: str, object_name: str, data, length: int, content_type: str = "application/octet-stream",
+                   metadata: Optional[Dict[str, str]] = None, part_size: int = 0, num_parallel_uploads: int = 3, **kwargs):
+        body = data.read() if length < 0 else data.read(length)
+        obj = FakeObject(bucket_name, object_name, body, content_type, metadata)
+        with self._lock:
+            self._bucket(bucket_name)[object_name] = obj
+        return obj
+    
+    def get_object(self, bucket_name: str, object_name: str, offset: int = 0, length: int = 0, **kwargs) -> FakeResponse:
+        data = self._object(bucket_name, object_name).data
+        return FakeResponse(data[offset:offset + length] if length else data[offset:])
+    
+    def stat_object(self, bucket_name: str, object_name: str, **kwargs) -> FakeObject:
+        return self._object(bucket_name, object_name)
+    
+    def presigned_get_object(self, bucket_name: str, object_name: str, expires=None, **kwargs) -> str:
+        return f"http://{self.endpoint}/{bucket_name}/{object_name}"
+    
+    def list_objects(self, bucket_name: str, prefix: Optional[str] = None, recursive: bool = False, **kwargs):
+        with self._lock:
+            objects = sorted(self._bucket(bucket_name).values(), key=lambda obj: obj.object_name)
+        return iter([obj for obj in objects if obj.object_name.startswith(prefix or "")])
+    
+    def remove_object(self, bucket_name: str, object_name: str, **kwargs):
+        with self._lock:
+            self._bucket(bucket_name).pop(object_name, None)
+    
+    def remove_objects(self, bucket_name: str, delete_object_list, **kwargs) -> Iterator[DeleteError]:
+        with self._lock:
+            bucket = self._bucket(bucket_name)
+            for delete_object in delete_object_list:
+                bucket.pop(delete_object._name, None)
+        return iter(())
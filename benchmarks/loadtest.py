@@ -0,0 +1,455 @@
+"""
+Load test of the whole app (app.py + router.py) under mixed concurrent traffic, without real services.
+
+    python -m benchmarks.loadtest                                    # in-process, 10 req/s for 30 s
+    python -m benchmarks.loadtest --rate 40 --duration 60 --mix document=4,excel=2,presentation=2,sql=1
+    python -m benchmarks.loadtest --uvicorn --workers 4 --s3 moto    # real server processes, moto as S3
+    python -m benchmarks.loadtest --param sql.rows=50000 --storage local,minio
+
+SQL exports run against a synthetic SQLite database (DB_URL), MinIO is replaced by an in-memory
+fake (--s3 memory, in-process only), a `moto_server` started for the run (--s3 moto) or any
+S3-compatible endpoint (--s3 host:port). Requests arrive at a fixed rate whether or not earlier ones
+finished (open loop), and latency counts from the scheduled send time so a stalled server shows up
+in the percentiles instead of silently lowering the offered load.
+
+Reported: achieved RPS, latency percentiles overall and per request type, errors by status code
+and RSS (current and peak) of every worker process.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# request type -> (endpoint, corpus parameters)
+REQUESTS = {
+    "document": ("/api/v1/generate-document", {"paragraphs": 100}),
+    "excel": ("/api/v1/generate-excel", {"rows": 200, "cols": 8}),
+    "presentation": ("/api/v1/generate-presentation", {"slides": 10}),
+    "sql": ("/api/v1/execute-sql-excel", {"rows": 2000, "cols": 8}),
+}
+DEFAULT_MIX = "document=4,excel=2,presentation=2,sql=1"
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for item in text.split(","):
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in REQUESTS:
+            raise SystemExit(f"Unknown request type in --mix: {kind} (expected one of {', '.join(REQUESTS)})")
+        mix[kind] = float(weight or 1)
+    return mix
+
+def parse_params(items) -> Dict[str, Dict[str, int]]:
+    """`sql.rows=50000` style overrides of the corpus parameters"""
+    params = {kind: dict(defaults) for kind, (_, defaults) in REQUESTS.items()}
+    for item in items or ():
+        key, _, value = item.partition("=")
+        kind, _, name = key.strip().partition(".")
+        if kind not in params or not name:
+            raise SystemExit(f"--param expects <type>.<name>=<int>, got {item}")
+        params[kind][name] = int(value)
+    return params
+
+def build_payloads(params: Dict[str, Dict[str, int]], work_dir: str) -> Tuple[Dict[str, dict], str]:
+    """Request body per type, plus the SQLAlchemy URL of the database the sql requests read"""
+    from benchmarks import corpora
+    sql = params["sql"]
+    db_url = corpora.sqlite_database(
+        os.path.join(work_dir, f"results_{sql['rows']}x{sql['cols']}.sqlite3"), sql["rows"], sql["cols"]
+    )
+    payloads = {
+        "document": {"content": corpora.docx_markdown(**params["document"])},
+        "excel": {"content": corpora.excel_content(**params["excel"])},
+        "presentation": {"content": corpora.presentation_html(**params["presentation"])},
+        "sql": {"query": "SELECT * FROM results"},
+    }
+    return payloads, db_url
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing is listening on port {port} after {timeout:.0f}s")
+
+def start_moto(work_dir: str) -> Tuple[subprocess.Popen, str]:
+    """Start a moto S3 server for the run and return it with its endpoint"""
+    command = shutil.which("moto_server")
+    if command is None:
+        raise SystemExit("--s3 moto needs `pip install 'moto[server]'`; or pass --s3 host:port of another S3 stand-in")
+    port = free_port()
+    log = open(os.path.join(work_dir, "moto.log"), "w")
+    process = subprocess.Popen([command, "-H", "127.0.0.1", "-p", str(port)], stdout=log, stderr=subprocess.STDOUT)
+    wait_for_port(port, 30)
+    return process, f"127.0.0.1:{port}"
+
+def s3_environment(endpoint: str) -> Dict[str, str]:
+    return {
+        "MINIO_ENDPOINT": endpoint,
+        "MINIO_SECURE": "False",
+        "MINIO_REGION": os.environ.get("MINIO_REGION") or "us-east-1",
+        "MINIO_ACCESS_KEY": os.environ.get("MINIO_ACCESS_KEY") or "loadtest",
+        "MINIO_SECRET_KEY": os.environ.get("MINIO_SECRET_KEY") or "loadtest-secret",
+    }
+
+def _status_kib(pid: int, field: str) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _children(pid: int) -> List[int]:
+    children = []
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else ():
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name can contain spaces; the parent pid follows the closing parenthesis
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except (OSError, IndexError, ValueError):
+            continue
+        if parent == pid and b"resource_tracker" not in cmdline:
+            children.append(int(entry))
+    return children
+
+def worker_memory(pids: List[int]) -> List[dict]:
+    """Current and peak RSS of each process, from /proc (Linux) or getrusage for this process"""
+    report = []
+    for pid in pids:
+        rss, peak = _status_kib(pid, "VmRSS"), _status_kib(pid, "VmHWM")
+        if peak is None and pid == os.getpid():
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak = peak // 1024 if sys.platform == "darwin" else peak
+        report.append({
+            "pid": pid,
+            "rss_mb": rss / 1024 if rss is not None else None,
+            "peak_rss_mb": peak / 1024 if peak is not None else None,
+        })
+    return report
+
+class InProcessTransport:
+    """Calls the ASGI app directly in this event loop, no sockets involved"""
+    def __init__(self, app):
+        self.app = app
+    
+    async def request(self, method: str, path: str, body: Optional[dict] = None) -> Tuple[int, bytes]:
+        payload = json.dumps(body).encode() if body is not None else b""
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": b"", "root_path": "",
+            "headers": [(b"host", b"loadtest"), (b"content-type", b"application/json"),
+                        (b"content-length", str(len(payload)).encode())],
+            "client": ("127.0.0.1", 0), "server": ("loadtest", 80),
+        }
+        finished = asyncio.Event()
+        sent = False
+        status, chunks = 0, []
+        
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": payload, "more_body": False}
+            await finished.wait()
+            return {"type": "http.disconnect"}
+        
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    finished.set()
+        
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            finished.set()
+        return status, b"".join(chunks)
+    
+    def close(self):
+        pass
+
+class HTTPTransport:
+    """Blocking `requests` sessions, one per thread, run off the event loop"""
+    def __init__(self, base_url: str, max_in_flight: int):
+        self.base_url = base_url
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="loadtest")
+    
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            session = self._local.session = requests.Session()
+        return session
+    
+    def _call(self, method: str, path: str, body: Optional[dict]) -> Tuple[int, bytes]:
+        response = self._session().request(method, self.base_url + path, json=body, timeout=600)
+        return response.status_code, response.content
+    
+    async def request(self, method: str, path: str, body: Optional[dict] = None) -> Tuple[int, bytes]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, method, path, body)
+    
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+async def wait_until_ready(transport, timeout: float):
+    deadline = time.monotonic() + timeout
+    status, body = 0, b""
+    while time.monotonic() < deadline:
+        try:
+            status, body = await transport.request("GET", "/api/v1/ready")
+        except Exception as e:
+            body = str(e).encode()
+        if status == 200:
+            return
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"App not ready after {timeout:.0f}s (last status {status}): {body[:500]!r}")
+
+async def drive(transport, payloads: Dict[str, dict], mix: Dict[str, float], storages: List[str],
+                rate: float, duration: float, max_in_flight: int, unique: bool, seed: int) -> dict:
+    """Send requests at `rate` per second for `duration` seconds and collect one sample per request"""
+    rng = random.Random(seed)
+    kinds, weights = list(mix), list(mix.values())
+    samples: List[dict] = []
+    in_flight = set()
+    dropped = 0
+    
+    async def one(index: int, kind: str, scheduled: float):
+        endpoint = REQUESTS[kind][0]
+        body = dict(payloads[kind], storage=rng.choice(storages))
+        if unique:
+            # A distinct filename gives a distinct request hash, so nothing is coalesced or reused
+            body["filename"] = f"loadtest-{seed}-{index}"
+        try:
+            status, _ = await transport.request("POST", endpoint, body)
+        except Exception as e:
+            status = type(e).__name__
+        samples.append({
+            "kind": kind, "status": status, "latency": time.perf_counter() - scheduled,
+            "ok": isinstance(status, int) and status < 400,
+        })
+    
+    started = time.perf_counter()
+    total = int(rate * duration)
+    for index in range(total):
+        scheduled = started + index / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            dropped += 1
+            continue
+        task = asyncio.create_task(one(index, rng.choices(kinds, weights)[0], scheduled))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.wait(set(in_flight))
+    return {"samples": samples, "elapsed": time.perf_counter() - started, "offered": total, "dropped": dropped}
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def latency_summary(latencies: List[float]) -> dict:
+    if not latencies:
+        return {"count": 0}
+    return {
+        "count": len(latencies),
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+def summarize(run: dict, rate: float, workers: List[dict]) -> dict:
+    samples = run["samples"]
+    ok = [s for s in samples if s["ok"]]
+    errors: Dict[str, int] = {}
+    for sample in samples:
+        if not sample["ok"]:
+            errors[str(sample["status"])] = errors.get(str(sample["status"]), 0) + 1
+    return {
+        "offered_rate": rate,
+        "offered": run["offered"],
+        "completed": len(samples),
+        "dropped": run["dropped"],
+        "elapsed_s": run["elapsed"],
+        "rps": len(samples) / run["elapsed"] if run["elapsed"] else 0.0,
+        "ok_rps": len(ok) / run["elapsed"] if run["elapsed"] else 0.0,
+        "error_rate": (len(samples) - len(ok)) / len(samples) if samples else 0.0,
+        "errors": errors,
+        "latency": latency_summary([s["latency"] for s in ok]),
+        "by_type": {
+            kind: {
+                **latency_summary([s["latency"] for s in ok if s["kind"] == kind]),
+                "errors": sum(1 for s in samples if s["kind"] == kind and not s["ok"]),
+            }
+            for kind in sorted({s["kind"] for s in samples})
+        },
+        "workers": workers,
+    }
+
+def print_summary(summary: dict):
+    print(f"offered {summary['offered']} requests at {summary['offered_rate']:g}/s, "
+          f"completed {summary['completed']} in {summary['elapsed_s']:.1f}s, dropped {summary['dropped']}")
+    print(f"throughput {summary['rps']:.2f} req/s ({summary['ok_rps']:.2f} ok/s), "
+          f"error rate {summary['error_rate'] * 100:.2f}%"
+          + (f" {summary['errors']}" if summary["errors"] else ""))
+    print(f"\n{'type':<14}{'ok':>7}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    failed = summary["completed"] - summary["latency"].get("count", 0)
+    rows = list(summary["by_type"].items()) + [("all", dict(summary["latency"], errors=failed))]
+    for kind, stats in rows:
+        if not stats.get("count"):
+            print(f"{kind:<14}{0:>7}{stats['errors']:>8}")
+            continue
+        print(f"{kind:<14}{stats['count']:>7}{stats['errors']:>8}{stats['p50_ms']:>10.1f}"
+              f"{stats['p90_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    print(f"\n{'worker pid':<14}{'RSS MB':>10}{'peak RSS MB':>13}")
+    for worker in summary["workers"]:
+        rss = f"{worker['rss_mb']:.1f}" if worker["rss_mb"] is not None else "n/a"
+        peak = f"{worker['peak_rss_mb']:.1f}" if worker["peak_rss_mb"] is not None else "n/a"
+        print(f"{worker['pid']:<14}{rss:>10}{peak:>13}")
+
+def app_environment(work_dir: str, db_url: str, storages: List[str]) -> Dict[str, str]:
+    return {
+        "DB_URL": db_url,
+        "DOCUMENT_LOCATION": os.path.join(work_dir, "documents"),
+        "ARTIFACT_INDEX_PATH": os.path.join(work_dir, "artifact_index.sqlite3"),
+        "DEFAULT_STORAGE": storages[0],
+    }
+
+async def run_in_process(args, payloads, mix, storages, env) -> dict:
+    os.environ.update(env)
+    sys.path.insert(0, ROOT)
+    # Settings are read at import time, so the app is imported only after the environment is set
+    from app import app
+    if args.s3 == "memory":
+        from benchmarks.fake_s3 import InMemoryS3
+        from services.minio_handler import MinioHandler, set_minio_handler
+        set_minio_handler(MinioHandler(client=InMemoryS3()))
+    
+    transport = InProcessTransport(app)
+    async with app.router.lifespan_context(app):
+        await wait_until_ready(transport, args.ready_timeout)
+        run = await drive(transport, payloads, mix, storages, args.rate, args.duration,
+                          args.max_in_flight, not args.repeat_payloads, args.seed)
+        return summarize(run, args.rate, worker_memory([os.getpid()]))
+
+async def run_uvicorn(args, payloads, mix, storages, env) -> dict:
+    port = args.port or free_port()
+    command = [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(args.workers), "--log-level", "warning"]
+    server = subprocess.Popen(command, cwd=ROOT, env=dict(os.environ, **env))
+    transport = HTTPTransport(f"http://127.0.0.1:{port}", args.max_in_flight)
+    try:
+        wait_for_port(port, args.ready_timeout)
+        # Each worker warms up on its own; poll until enough of them answered ready
+        for _ in range(args.workers):
+            await wait_until_ready(transport, args.ready_timeout)
+        run = await drive(transport, payloads, mix, storages, args.rate, args.duration,
+                          args.max_in_flight, not args.repeat_payloads, args.seed)
+        pids = _children(server.pid) or [server.pid]
+        return summarize(run, args.rate, worker_memory(pids))
+    finally:
+        transport.close()
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=10.0, help="requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of traffic")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted request types (default {DEFAULT_MIX})")
+    parser.add_argument("--param", action="append", help="corpus parameter, e.g. document.paragraphs=500")
+    parser.add_argument("--storage", default="minio", help="comma-separated storage choices sent with requests")
+    parser.add_argument("--s3", default=None,
+                        help="memory (in-process fake), moto (start moto_server) or host:port of an S3 endpoint; "
+                             "default memory in-process, moto with --uvicorn")
+    parser.add_argument("--uvicorn", action="store_true", help="run the app under uvicorn instead of in-process")
+    parser.add_argument("--workers", type=int, default=2, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--max-in-flight", type=int, default=512,
+                        help="outstanding requests before new arrivals are dropped")
+    parser.add_argument("--repeat-payloads", action="store_true",
+                        help="send identical bodies so single-flight and artifact reuse kick in")
+    parser.add_argument("--ready-timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--work-dir", help="folder for the database, documents and index (default: a temp dir)")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+    
+    mix = parse_mix(args.mix)
+    storages = [storage.strip() for storage in args.storage.split(",") if storage.strip()]
+    args.s3 = args.s3 or ("moto" if args.uvicorn else "memory")
+    if args.s3 == "memory" and args.uvicorn and "minio" in storages:
+        raise SystemExit("--s3 memory only works in-process; use --s3 moto or --s3 host:port with --uvicorn")
+    
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="forjinn-loadtest-")
+    os.makedirs(work_dir, exist_ok=True)
+    sys.path.insert(0, ROOT)
+    payloads, db_url = build_payloads(parse_params(args.param), work_dir)
+    env = app_environment(work_dir, db_url, storages)
+    
+    moto = None
+    try:
+        if args.s3 == "moto":
+            moto, endpoint = start_moto(work_dir)
+            env.update(s3_environment(endpoint))
+        elif args.s3 != "memory":
+            env.update(s3_environment(args.s3))
+        runner = run_uvicorn if args.uvicorn else run_in_process
+        summary = asyncio.run(runner(args, payloads, mix, storages, env))
+    finally:
+        if moto is not None:
+            moto.terminate()
+            moto.wait(timeout=15)
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    summary.update(mode="uvicorn" if args.uvicorn else "in-process", s3=args.s3, mix=mix, storage=storages)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Benchmarks for the document creators on synthetic corpora.
+
+    python -m benchmarks.run                          # every case with default sizes
+    python -m benchmarks.run -k docx -k sql           # cases whose name contains docx or sql
+    python -m benchmarks.run --param rows=50000       # override a corpus parameter
+    python -m benchmarks.run --save main              # write benchmarks/baselines/main.json
+    python -m benchmarks.run --compare main           # diff against a saved baseline
+
+Each case runs in a fresh process so its peak RSS is its own. Reported per case:
+latency percentiles, throughput (renders/s), peak RSS and output size.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(ROOT, "benchmarks", "baselines")
+WORK_DIR = os.path.join(tempfile.gettempdir(), "forjinn-benchmarks")
+
+# name -> (creator, corpus parameters)
+CASES = {
+    "docx_paragraphs": ("docx", {"paragraphs": 1000}),
+    "docx_tables": ("docx", {"paragraphs": 50, "tables": 10, "rows": 50, "cols": 6}),
+    "excel_table": ("excel", {"rows": 2000, "cols": 8}),
+    "excel_sheets": ("excel", {"sheets": 5, "rows": 200, "cols": 8}),
+    "pptx_slides": ("pptx", {"slides": 50}),
+    "pptx_tables": ("pptx", {"slides": 20, "table_rows": 10, "table_cols": 5}),
+    "pptx_images": ("pptx", {"slides": 20, "images": 3}),
+    "sql_rows": ("sql", {"rows": 20000, "cols": 8}),
+}
+
+def _peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def build_case(creator: str, params: dict):
+    """Return (input_bytes, render) for one case; render(output) writes one file"""
+    from benchmarks import corpora
+    if creator == "docx":
+        from services.docx.docx_creator import DocxCreator
+        content = corpora.docx_markdown(**params)
+        docx_creator = DocxCreator()
+        return len(content), lambda output: docx_creator.create_document(content, output=output)
+    if creator == "excel":
+        from services.excel.excel_creator import ExcelCreator
+        content = corpora.excel_content(**params)
+        excel_creator = ExcelCreator()
+        return len(content), lambda output: excel_creator.create_excel_from_content(content, output=output)
+    if creator == "pptx":
+        from services.powerpoint.ppt_creator import PresentationCreator
+        params = dict(params)
+        images = corpora.write_images(os.path.join(WORK_DIR, "images"), params.pop("images", 0))
+        content = corpora.presentation_html(images=images if images else (), **params)
+        presentation_creator = PresentationCreator()
+        return len(content), lambda output: presentation_creator.create_presentation(content, output=output)
+    if creator == "sql":
+        from sqlalchemy import create_engine
+        from services.SQL.sql_to_excel import SQLToExcelService
+        rows, cols = params.get("rows", 10000), params.get("cols", 8)
+        url = corpora.sqlite_database(os.path.join(WORK_DIR, f"results_{rows}x{cols}.sqlite3"), rows, cols)
+        sql_service = SQLToExcelService(engine=create_engine(url))
+        query = "SELECT * FROM results"
+        return len(query), lambda output: sql_service.execute_query_to_excel(query, output=output)
+    raise ValueError(f"Unknown creator: {creator}")
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_case(name: str, creator: str, params: dict, repeat: int, warmup: int) -> dict:
+    """Run one case in this process and return its measurements"""
+    sys.path.insert(0, ROOT)
+    os.makedirs(WORK_DIR, exist_ok=True)
+    rss_before = _peak_rss_bytes()
+    input_bytes, render = build_case(creator, params)
+    
+    output_bytes = 0
+    for _ in range(warmup):
+        render(BytesIO())
+    
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        output = BytesIO()
+        render_started = time.perf_counter()
+        render(output)
+        latencies.append(time.perf_counter() - render_started)
+        output_bytes = output.getbuffer().nbytes
+    total = time.perf_counter() - started
+    
+    return {
+        "case": name,
+        "creator": creator,
+        "params": params,
+        "repeat": repeat,
+        "input_bytes": input_bytes,
+        "output_bytes": output_bytes,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "throughput_per_s": repeat / total if total else 0.0,
+        "peak_rss_mb": _peak_rss_bytes() / 2 ** 20,
+        "startup_rss_mb": rss_before / 2 ** 20,
+    }
+
+def run_isolated(name: str, creator: str, params: dict, repeat: int, warmup: int) -> dict:
+    """Run a case in a fresh interpreter so peak RSS is not shared between cases"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_case, name, creator, params, repeat, warmup).result()
+
+def parse_params(items) -> dict:
+    params = {}
+    for item in items or ():
+        key, _, value = item.partition("=")
+        params[key.strip()] = int(value)
+    return params
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def print_results(results):
+    print(f"{'case':<18}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'ops/s':>9}{'peak RSS MB':>13}{'output KB':>11}")
+    for result in results:
+        print(
+            f"{result['case']:<18}{result['p50_ms']:>10.1f}{result['p90_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+            f"{result['throughput_per_s']:>9.2f}{result['peak_rss_mb']:>13.1f}{result['output_bytes'] / 1024:>11.1f}"
+        )
+
+# metric -> True when higher is better
+COMPARED = {"p50_ms": False, "p90_ms": False, "throughput_per_s": True, "peak_rss_mb": False, "output_bytes": False}
+
+def compare(results, baseline: dict, threshold: float) -> int:
+    """Print the change against a baseline; return how many metrics regressed past the threshold"""
+    previous = {result["case"]: result for result in baseline["results"]}
+    regressions = 0
+    print(f"\nCompared with baseline '{baseline['name']}' ({baseline.get('commit') or 'unknown commit'}, {baseline['created_at']})")
+    for result in results:
+        base = previous.get(result["case"])
+        if base is None:
+            print(f"{result['case']:<18} (not in baseline)")
+            continue
+        if base["params"] != result["params"]:
+            print(f"{result['case']:<18} (parameters differ from baseline, skipped)")
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED.items():
+            if not base[metric]:
+                continue
+            change = (result[metric] - base[metric]) / base[metric] * 100
+            worse = -change if higher_is_better else change
+            flag = " REGRESSION" if worse > threshold else ""
+            regressions += bool(flag)
+            changes.append(f"{metric} {change:+.1f}%{flag}")
+        print(f"{result['case']:<18} " + ", ".join(changes))
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="filters", action="append", help="run cases whose name contains this text")
+    parser.add_argument("--param", action="append", help="override a corpus parameter, e.g. rows=50000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--save", metavar="NAME", help="save results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args(argv)
+    
+    overrides = parse_params(args.param)
+    results = []
+    for name, (creator, params) in CASES.items():
+        if args.filters and not any(text in name for text in args.filters):
+            continue
+        params = {**params, **{key: value for key, value in overrides.items() if key in params}}
+        results.append(run_isolated(name, creator, params, args.repeat, args.warmup))
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+    
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        baseline = {
+            "name": args.save,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        with open(path, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nSaved baseline to {path}")
+    
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Import-time and RSS report for worker startup.
+
+    python -m benchmarks.startup              # cold `import app`, then app plus each format's creator
+    python -m benchmarks.startup --top 15     # also list the slowest top-level imports per scenario
+
+Every scenario runs in a fresh interpreter with `-X importtime`, so numbers are cold-start
+costs of this tree: wall time of the imports, their cumulative import time and peak RSS.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import resource, sys, time
+started = time.perf_counter()
+import app
+{load}
+elapsed = time.perf_counter() - started
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, peak if sys.platform == "darwin" else peak * 1024)
+"""
+
+def scenarios():
+    from services.creators import CREATORS
+    yield "app", ""
+    for fmt in CREATORS:
+        yield f"app+{fmt}", f"from services.creators import get_creator; get_creator({fmt!r})"
+    yield "app+all", "from services.creators import CREATORS, get_creator\nfor fmt in CREATORS: get_creator(fmt)"
+
+def parse_importtime(stderr: str):
+    """(module, self_us, cumulative_us, depth) for every line of -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+def measure(name: str, load: str, enabled_formats: str):
+    env = dict(os.environ, ENABLED_FORMATS=enabled_formats, PYTHONDONTWRITEBYTECODE="1")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(load=load)],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{name} failed:\n{completed.stderr[-2000:]}")
+    elapsed, peak_rss = completed.stdout.split()[-2:]
+    modules = parse_importtime(completed.stderr)
+    top_level = sorted((m for m in modules if m[3] == 1), key=lambda m: m[2], reverse=True)
+    return {
+        "scenario": name,
+        "import_seconds": float(elapsed),
+        "modules_imported": len(modules),
+        "peak_rss_mb": int(peak_rss) / 2 ** 20,
+        "slowest_imports": [{"module": m[0], "cumulative_ms": m[2] / 1000} for m in top_level],
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=0, help="show the N slowest top-level imports per scenario")
+    parser.add_argument("--formats", default="document,excel,presentation,sql",
+                        help="ENABLED_FORMATS for the probes")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    
+    sys.path.insert(0, ROOT)
+    results = [measure(name, load, args.formats) for name, load in scenarios()]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    
+    print(f"{'scenario':<18}{'import s':>10}{'modules':>9}{'peak RSS MB':>13}")
+    for result in results:
+        print(f"{result['scenario']:<18}{result['import_seconds']:>10.3f}"
+              f"{result['modules_imported']:>9}{result['peak_rss_mb']:>13.1f}")
+        for entry in result["slowest_imports"][:args.top]:
+            print(f"    {entry['module']:<40}{entry['cumulative_ms']:>10.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
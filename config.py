@@ -17,16 +17,136 @@ class Settings:
     MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minioadmin")
     MINIO_SECURE = os.getenv("MINIO_SECURE", "False").lower() == "true"
     MINIO_BUCKET_NAME = os.getenv("MINIO_BUCKET_NAME", "documents")
+    MINIO_REGION = os.getenv("MINIO_REGION", "")
+    MINIO_POOL_MAXSIZE = int(os.getenv("MINIO_POOL_MAXSIZE", 32))
+    MINIO_CONNECT_TIMEOUT = float(os.getenv("MINIO_CONNECT_TIMEOUT", 5))
+    MINIO_READ_TIMEOUT = float(os.getenv("MINIO_READ_TIMEOUT", 120))
+    MINIO_BUCKET_REVALIDATE_SECONDS = int(os.getenv("MINIO_BUCKET_REVALIDATE_SECONDS", 300))
+    MINIO_PART_SIZE = int(os.getenv("MINIO_PART_SIZE", 16 * 1024 * 1024))
+    MINIO_PARALLEL_UPLOADS = int(os.getenv("MINIO_PARALLEL_UPLOADS", 4))
+    MINIO_PRESIGNED_EXPIRY_HOURS = int(os.getenv("MINIO_PRESIGNED_EXPIRY_HOURS", 168))
+    MINIO_DOWNLOAD_CHUNK_SIZE = int(os.getenv("MINIO_DOWNLOAD_CHUNK_SIZE", 1024 * 1024))
+    MINIO_DELETE_CONCURRENCY = int(os.getenv("MINIO_DELETE_CONCURRENCY", 4))
     
     # Document Settings
     DEFAULT_FONT_NAME = os.getenv("DEFAULT_FONT_NAME", "Calibri")
     DEFAULT_FONT_SIZE = int(os.getenv("DEFAULT_FONT_SIZE", 11))
 
     DOCUMENT_LOCATION = os.getenv("DOCUMENT_LOCATION","generated_documents")
+    # Where generated files are persisted by default: "local" or "minio"
+    DEFAULT_STORAGE = os.getenv("DEFAULT_STORAGE", "local")
+    # Formats this deployment serves; creators and their libraries are only imported for these
+    ENABLED_FORMATS = os.getenv("ENABLED_FORMATS", "document,excel,presentation,sql")
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "True").lower() == "true"
+    # Also hold back readiness when optional steps (SQL database, MinIO when not the default storage) fail
+    WARMUP_STRICT = os.getenv("WARMUP_STRICT", "False").lower() == "true"
+    # Failed required warm-up steps are retried in the background, backing off from the first
+    # delay up to the maximum, until they pass and the worker reports ready
+    WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", 1))
+    WARMUP_RETRY_MAX_SECONDS = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", 60))
+    RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", os.cpu_count() or 4))
+    # Hash-prefix shard folders under each YYYY/MM/DD folder: levels and hex characters per level
+    STORAGE_SHARD_DEPTH = int(os.getenv("STORAGE_SHARD_DEPTH", 1))
+    STORAGE_SHARD_WIDTH = int(os.getenv("STORAGE_SHARD_WIDTH", 2))
+    # Hand large downloads to the front proxy: "" (serve from Python), "x-accel-redirect" (nginx) or "x-sendfile"
+    DOWNLOAD_OFFLOAD = os.getenv("DOWNLOAD_OFFLOAD", "").lower()
+    # nginx `internal` location aliased to DOCUMENT_LOCATION, used with x-accel-redirect
+    DOWNLOAD_ACCEL_PREFIX = os.getenv("DOWNLOAD_ACCEL_PREFIX", "/protected-documents/")
+    # Retention of generated files on local disk (0 / empty disables a limit)
+    RETENTION_MAX_TOTAL_BYTES = int(os.getenv("RETENTION_MAX_TOTAL_BYTES", 0))
+    # Maximum age in days per artifact type, e.g. "docx=30,xlsx=14,*=90"
+    RETENTION_MAX_AGE_DAYS = os.getenv("RETENTION_MAX_AGE_DAYS", "")
+    RETENTION_INTERVAL_SECONDS = int(os.getenv("RETENTION_INTERVAL_SECONDS", 600))
+    RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", 200))
+    RETENTION_BATCH_PAUSE_SECONDS = float(os.getenv("RETENTION_BATCH_PAUSE_SECONDS", 0.05))
+    # Files per pass the directory walk checks for files the artifact index does not know (0 = no walk)
+    RETENTION_SCAN_FILES = int(os.getenv("RETENTION_SCAN_FILES", 5000))
+    # Directories written by older releases, outside the index; their files are expired by modification time
+    RETENTION_LEGACY_DIRS = os.getenv("RETENTION_LEGACY_DIRS", "generated_presentations")
+    # SQLite index of generated artifacts (kept outside DOCUMENT_LOCATION)
+    ARTIFACT_INDEX_PATH = os.getenv("ARTIFACT_INDEX_PATH", "artifact_index.sqlite3")
+    # Identical concurrent generate requests share one render
+    SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "True").lower() == "true"
+    # Directory for per-request lock files that extend single-flight across workers ("" = this process only)
+    SINGLE_FLIGHT_LOCK_DIR = os.getenv("SINGLE_FLIGHT_LOCK_DIR", "")
+    IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", 24))
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "True").lower() == "true"
+    # Render capacity per endpoint in weight units, e.g. "document=16,sql=4"; others get the default
+    ADMISSION_LIMITS = os.getenv("ADMISSION_LIMITS", "")
+    ADMISSION_DEFAULT_CAPACITY = int(os.getenv("ADMISSION_DEFAULT_CAPACITY", RENDER_WORKERS * 2))
+    ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 32))
+    ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", 30))
+    # One weight unit per this many bytes of content / rows of SQL result
+    ADMISSION_WEIGHT_BYTES = int(os.getenv("ADMISSION_WEIGHT_BYTES", 256 * 1024))
+    ADMISSION_WEIGHT_ROWS = int(os.getenv("ADMISSION_WEIGHT_ROWS", 20000))
+    # Fraction of renders profiled automatically; admins can also send X-Profile-Token
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+    # "cpu", "memory" or "cpu,memory"
+    PROFILE_MODES = os.getenv("PROFILE_MODES", "cpu,memory")
+    # Defaults to a "profiles" folder next to the artifact index
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+    PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", 200))
+    # Span exporter: "" (tracing off), "jsonl" (local file) or "otlp" (OTLP/HTTP JSON collector)
+    TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "")
+    # Fraction of requests traced when the caller did not send a sampled traceparent
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0.01))
+    TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "traces.jsonl")
+    TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    # Extra OTLP request headers, e.g. "Authorization=Bearer abc,X-Tenant=docs"
+    TRACE_OTLP_HEADERS = os.getenv("TRACE_OTLP_HEADERS", "")
+    TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "forjinn-tools")
+    # Finished spans waiting for export; spans beyond this are dropped rather than slowing requests
+    TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", 4096))
+    TRACE_EXPORT_BATCH_SIZE = int(os.getenv("TRACE_EXPORT_BATCH_SIZE", 512))
+    TRACE_EXPORT_INTERVAL_SECONDS = float(os.getenv("TRACE_EXPORT_INTERVAL_SECONDS", 5))
+    # Render buffers stay in memory up to this size, then move to a temp file in RENDER_SPOOL_DIR
+    RENDER_SPOOL_MAX_BYTES = int(os.getenv("RENDER_SPOOL_MAX_BYTES", 8 * 1024 * 1024))
+    RENDER_SPOOL_DIR = os.getenv("RENDER_SPOOL_DIR", "")
+    # Memory a single render may add to its worker before it is stopped with a 413 (0 = unlimited)
+    RENDER_MEMORY_BUDGET_MB = int(os.getenv("RENDER_MEMORY_BUDGET_MB", 1024))
+    # Per-generator overrides in MiB, e.g. "sql=2048,presentation=512"
+    RENDER_MEMORY_BUDGETS = os.getenv("RENDER_MEMORY_BUDGETS", "")
+    # "rss" (process RSS growth, cheap) or "tracemalloc" (traced Python allocations, slower renders);
+    # either way the worker's growth is shared out between concurrent renders by their CPU time
+    RENDER_MEMORY_BUDGET_MODE = os.getenv("RENDER_MEMORY_BUDGET_MODE", "rss")
+    RENDER_MEMORY_CHECK_INTERVAL_MS = int(os.getenv("RENDER_MEMORY_CHECK_INTERVAL_MS", 20))
+    # SQL results are fetched in chunks of this many rows, checking the memory budget in between
+    SQL_FETCH_CHUNK_ROWS = int(os.getenv("SQL_FETCH_CHUNK_ROWS", 10000))
+    # Stop renders and SQL statements whose client disconnected; the connection is checked this often
+    CANCEL_ON_DISCONNECT = os.getenv("CANCEL_ON_DISCONNECT", "True").lower() == "true"
+    DISCONNECT_POLL_MS = int(os.getenv("DISCONNECT_POLL_MS", 250))
+    # Raw /generate-*/raw bodies: largest decoded size accepted, and how much is decompressed per step
+    INGEST_MAX_BYTES = int(os.getenv("INGEST_MAX_BYTES", 256 * 1024 * 1024))
+    INGEST_CHUNK_BYTES = int(os.getenv("INGEST_CHUNK_BYTES", 256 * 1024))
+    # Assumed expansion of gzip/zstd bodies when weighing them for admission by Content-Length
+    INGEST_COMPRESSION_RATIO = int(os.getenv("INGEST_COMPRESSION_RATIO", 5))
+    # Supervisor mode (python supervisor.py): worker processes sharing one listening socket
+    SUPERVISOR_WORKERS = int(os.getenv("SUPERVISOR_WORKERS", 2))
+    # Recycle a worker after this many renders (0 = never); each worker gets +/- RECYCLE_JITTER of it
+    RECYCLE_AFTER_RENDERS = int(os.getenv("RECYCLE_AFTER_RENDERS", 0))
+    RECYCLE_JITTER = float(os.getenv("RECYCLE_JITTER", 0.1))
+    # Recycle a worker whose RSS is above this many MiB (0 = never)
+    RECYCLE_RSS_MB = int(os.getenv("RECYCLE_RSS_MB", 0))
+    SUPERVISOR_POLL_SECONDS = float(os.getenv("SUPERVISOR_POLL_SECONDS", 2))
+    # How long a replacement may take to warm up before the recycle is abandoned and retried
+    SUPERVISOR_READY_TIMEOUT_SECONDS = float(os.getenv("SUPERVISOR_READY_TIMEOUT_SECONDS", 120))
+    # In-flight requests get this long to finish when a worker is recycled or stopped
+    WORKER_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("WORKER_GRACEFUL_TIMEOUT_SECONDS", 60))
+    # Set by the supervisor for each worker it starts
+    WORKER_STATS_FILE = os.getenv("WORKER_STATS_FILE", "")
+    # Rendered slides kept per worker for presentation re-renders, by total size (0 = off);
+    # entries expire after SLIDE_CACHE_TTL_SECONDS so images behind unchanged URLs are fetched again
+    SLIDE_CACHE_MAX_BYTES = int(os.getenv("SLIDE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    SLIDE_CACHE_TTL_SECONDS = int(os.getenv("SLIDE_CACHE_TTL_SECONDS", 3600))
+    # Longest a presentation waits for one remote image: to connect, between reads and for the whole download
+    IMAGE_FETCH_TIMEOUT_SECONDS = float(os.getenv("IMAGE_FETCH_TIMEOUT_SECONDS", 10))
     DB_HOST = os.getenv("DB_HOST", "localhost")
     DB_PORT = os.getenv("DB_PORT", "3306")
     DB_USER = os.getenv("DB_USER", "root")
     DB_PASSWORD = os.getenv("DB_PASSWORD", "")
     DB_NAME = os.getenv("DB_NAME", "your_database")
+    # Full SQLAlchemy URL (e.g. sqlite:///bench.db); overrides the DB_* MySQL settings when set
+    DB_URL = os.getenv("DB_URL", "")
 
 settings = Settings()
\ No newline at end of file
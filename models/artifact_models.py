@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+class ArtifactRecord(BaseModel):
+    storage: str
+    object_name: str
+    path: str
+    filename: str
+    artifact_type: str
+    generator: str
+    size: int
+    sha256: Optional[str] = None
+    created_at: datetime
+    render_ms: Optional[float] = None
+    request_hash: Optional[str] = None
+
+class ArtifactListResponse(BaseModel):
+    artifacts: List[ArtifactRecord]
+    count: int
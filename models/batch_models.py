@@ -0,0 +1,37 @@
+from pydantic import BaseModel, model_validator
+from typing import Optional, Literal, List
+from datetime import datetime
+
+class BatchItem(BaseModel):
+    type: Literal["document", "excel", "presentation", "sql"]
+    content: Optional[str] = None  # markdown / HTML for document, excel and presentation items
+    query: Optional[str] = None  # SQL for sql items
+    filename: Optional[str] = None
+    
+    @model_validator(mode="after")
+    def check_input(self):
+        if self.type == "sql" and not self.query:
+            raise ValueError("sql items need a query")
+        if self.type != "sql" and self.content is None:
+            raise ValueError(f"{self.type} items need content")
+        return self
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    # "zip" streams one archive back; "manifest" stores every file and returns download URLs
+    mode: Literal["zip", "manifest"] = "zip"
+    storage: Optional[Literal["local", "minio"]] = None  # manifest mode; defaults to settings.DEFAULT_STORAGE
+    archive_name: Optional[str] = None
+
+class BatchItemResult(BaseModel):
+    type: str
+    status: str
+    filename: Optional[str] = None
+    object_name: Optional[str] = None
+    download_url: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    status: str
+    items: List[BatchItemResult]
+    created_at: datetime
@@ -1,10 +1,16 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Literal, List
 from datetime import datetime
 
 class DocumentRequest(BaseModel):
     content: str
     filename: Optional[str] = None
+    storage: Optional[Literal["local", "minio"]] = None  # defaults to settings.DEFAULT_STORAGE
+
+class DocumentAppendRequest(BaseModel):
+    object_name: str  # the document to extend, rewritten in place
+    content: str
+    storage: Optional[Literal["local", "minio"]] = None  # defaults to settings.DEFAULT_STORAGE
 
 class DocumentResponse(BaseModel):
     status: str
@@ -16,4 +22,14 @@ class DocumentResponse(BaseModel):
 
 class DocumentListResponse(BaseModel):
     documents: list
-    count: int
\ No newline at end of file
+    count: int
+
+class BulkDeleteRequest(BaseModel):
+    object_names: Optional[List[str]] = None
+    prefix: Optional[str] = None  # e.g. "2026/10/" purges every object under that path
+    storage: Optional[Literal["local", "minio"]] = None  # defaults to settings.DEFAULT_STORAGE
+
+class BulkDeleteResponse(BaseModel):
+    status: str
+    deleted: int
+    errors: list
\ No newline at end of file
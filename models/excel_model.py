@@ -1,10 +1,16 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Literal
 from datetime import datetime
 
 class ExcelRequest(BaseModel):
     content: str
     filename: Optional[str] = None
+    storage: Optional[Literal["local", "minio"]] = None  # defaults to settings.DEFAULT_STORAGE
+
+class ExcelAppendRequest(BaseModel):
+    object_name: str  # the workbook to extend, rewritten in place
+    content: str
+    storage: Optional[Literal["local", "minio"]] = None  # defaults to settings.DEFAULT_STORAGE
 
 class ExcelResponse(BaseModel):
     status: str
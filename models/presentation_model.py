@@ -1,10 +1,11 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Literal
 from datetime import datetime
 
 class PresentationRequest(BaseModel):
     content: str  # HTML content string
     filename: Optional[str] = None
+    storage: Optional[Literal["local", "minio"]] = None  # defaults to settings.DEFAULT_STORAGE
 
 class PresentationResponse(BaseModel):
     status: str
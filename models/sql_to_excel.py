@@ -1,10 +1,11 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, Literal, List
 from datetime import datetime
 
 class SQLQueryRequest(BaseModel):
     query: str
     filename: Optional[str] = None
+    storage: Optional[Literal["local", "minio"]] = None  # defaults to settings.DEFAULT_STORAGE
 
 class SQLQueryResponse(BaseModel):
     status: str
@@ -1,35 +1,282 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
-from fastapi.responses import FileResponse
-from models.document_models import DocumentRequest, DocumentResponse, DocumentListResponse
-from models.excel_model import ExcelRequest, ExcelResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from models.document_models import (
+    DocumentRequest, DocumentAppendRequest, DocumentResponse, DocumentListResponse, BulkDeleteRequest, BulkDeleteResponse
+)
+from models.excel_model import ExcelRequest, ExcelAppendRequest, ExcelResponse
 from models.presentation_model import PresentationResponse, PresentationRequest
-from services.docx.docx_creator import DocxCreator
-from services.minio_handler import MinioHandler
-from services.excel.excel_creator import ExcelCreator
-from services.powerpoint.ppt_creator import PresentationCreator
-from datetime import datetime
-from typing import Optional
+from services.minio_handler import MinioHandler, get_minio_handler
+from services.local_store import LocalDocumentStore
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, BinaryIO, Callable, Iterator, Literal, Optional, Union
+from contextlib import asynccontextmanager, contextmanager
 import socket, os
+import json
+import asyncio
+import hashlib
+import stat
+import tempfile
+import weakref
+from urllib.parse import quote
 from config import settings
 from models.sql_to_excel import SQLQueryRequest, SQLQueryResponse
-from services.SQL.sql_to_excel import SQLToExcelService
+from services.artifact_index import ArtifactIndex, get_artifact_index, request_hash
+from services.artifact_sink import (
+    MemorySink, StoredArtifact, artifact_from_record, get_artifact_sink, get_content_type, persist_artifact, resolve_storage
+)
+from models.artifact_models import ArtifactRecord, ArtifactListResponse
+from models.batch_models import BatchItem, BatchItemResult, BatchRequest, BatchResponse
+from services.zip_stream import ZipStreamWriter
+from services.single_flight import file_lock, fcntl, get_single_flight
+from services.admission import AdmissionTicket, admission_snapshot, admit, content_weight, rows_weight
+from services.metrics import ADMISSION_IN_USE, ADMISSION_QUEUED, CACHE_LOOKUPS, RENDER_INPUT_BYTES, render_metrics
+from services.profiling import RenderProfiler, is_admin, list_profiles, load_profile, profile_path, should_profile
+from services.tracing import span
+from services.cancellation import CancelToken, cancel_scope, cancellable, watch_disconnect
+from services.body_stream import BodyStream
+from services.render_memory import spooled_buffer
+from services.creators import enabled_formats, get_creator
+from services.warmup import state as warmup_state
+from services.retention import RetentionManager, get_retention_manager
+from services.http_ranges import (
+    content_disposition, file_validators, http_date, if_range_allows, is_not_modified, parse_range_header, quote_etag
+)
+
+if TYPE_CHECKING:
+    # Creators pull in pandas, openpyxl, python-docx, python-pptx...; they are imported on first use
+    from services.docx.docx_creator import DocxCreator
+    from services.excel.excel_creator import ExcelCreator
+    from services.powerpoint.ppt_creator import PresentationCreator
+    from services.SQL.sql_to_excel import SQLToExcelService
 
 router = APIRouter()
 
-def get_docx_creator():
-    return DocxCreator()
+def get_docx_creator() -> "DocxCreator":
+    return get_creator("document")
+
+def get_local_store():
+    return LocalDocumentStore()
+
+def get_excel_creator() -> "ExcelCreator":
+    return get_creator("excel")
+
+def get_presentation_creator() -> "PresentationCreator":
+    return get_creator("presentation")
+
+def get_sql_service() -> "SQLToExcelService":
+    return get_creator("sql")
+
+async def generate_artifact(render, filename: str, object_name: str, generator: str, request,
+                            idempotency_key: Optional[str] = None,
+                            weight: Union[int, Callable[[], Awaitable[int]]] = 1,
+                            profile_token: Optional[str] = None, coalesce: bool = True) -> StoredArtifact:
+    """
+    Render a generated file into the request's storage, index it and attach its download URL.
+    Identical concurrent requests share one render (unless `coalesce` is off), and a repeated
+    Idempotency-Key gets the artifact its first request produced. Renders are admitted against
+    the generator's capacity with `weight` units, and sampled or admin-requested renders are profiled.
+    `weight` may be a coroutine function, awaited only when a render actually starts (not for
+    replays or coalesced duplicates).
+    """
+    storage = resolve_storage(request.storage)
+    request_key = request_hash(generator, request.model_dump_json())
+    index = get_artifact_index()
+    
+    if idempotency_key:
+        with span("idempotency.lookup"):
+            artifact = await run_in_threadpool(replay_idempotency_key, index, idempotency_key, request_key)
+        CACHE_LOOKUPS.labels("idempotency", "miss" if artifact is None else "hit").inc()
+        if artifact is not None:
+            return artifact
+    
+    async def render_and_persist():
+        render_weight = await weight() if callable(weight) else weight
+        return await render_into_storage(render, filename, object_name, generator, storage, request_key, render_weight, profile_token)
+    
+    def rendered_by_other_worker(since: datetime) -> Optional[StoredArtifact]:
+        record = index.find_by_request(request_key, storage, since)
+        if record is None:
+            return None
+        artifact = artifact_from_record(record)
+        artifact.download_url = build_download_url(artifact)
+        return artifact
+    
+    with span(f"{generator}.generate", storage=storage):
+        if settings.SINGLE_FLIGHT_ENABLED and coalesce:
+            artifact = await get_single_flight().do(request_key, render_and_persist, rendered_by_other_worker)
+        else:
+            artifact = await render_and_persist()
+    
+    if idempotency_key:
+        await run_in_threadpool(
+            index.save_idempotency_key, idempotency_key, request_key, artifact.storage, artifact.object_name
+        )
+    return artifact
+
+async def render_into_storage(render, filename: str, object_name: str, generator: str, storage: str,
+                              request_key: Optional[str] = None, weight: int = 1,
+                              profile_token: Optional[str] = None) -> StoredArtifact:
+    """Admit and render one file into `storage`, profiling it when sampled, and attach its download URL"""
+    profiler = RenderProfiler(generator) if should_profile(profile_token) else None
+    with span("admission", generator=generator, weight=weight):
+        # A request whose client left while it was queued never takes capacity
+        ticket = await cancellable(admit(generator, weight))
+    async with ticket:
+        try:
+            artifact = await persist_artifact(
+                get_artifact_sink(storage), profiler.wrap(render) if profiler else render,
+                object_name, filename, generator, request_key
+            )
+        except Exception as e:
+            if profiler:
+                await run_in_threadpool(profiler.save, object_name, str(e))
+            raise
+    if profiler:
+        await run_in_threadpool(profiler.save, artifact.object_name)
+    artifact.download_url = build_download_url(artifact)
+    return artifact
+
+async def generate_streamed_artifact(render, body: BodyStream, filename: str, object_name: str, generator: str,
+                                     requested_filename: Optional[str], storage: Optional[str],
+                                     idempotency_key: Optional[str] = None,
+                                     profile_token: Optional[str] = None) -> StoredArtifact:
+    """
+    Render a generated file from a raw request body while the body is still arriving.
+    The request hash covers the decoded content, which is only known once the body has been
+    read, so identical concurrent requests are not coalesced here; a repeated Idempotency-Key
+    has the body spooled and hashed first so the artifact of its first request can be replayed.
+    """
+    storage = resolve_storage(storage)
+    index = get_artifact_index()
+    
+    def request_key() -> str:
+        return request_hash(generator, json.dumps(
+            {"filename": requested_filename, "storage": storage, "content_sha256": body.sha256}, sort_keys=True
+        ))
+    
+    if idempotency_key:
+        with span("idempotency.lookup"):
+            cutoff = datetime.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+            artifact = None
+            if await run_in_threadpool(index.get_idempotency_key, idempotency_key, cutoff) is not None:
+                await body.spool()
+                artifact = await run_in_threadpool(replay_idempotency_key, index, idempotency_key, request_key())
+        CACHE_LOOKUPS.labels("idempotency", "miss" if artifact is None else "hit").inc()
+        if artifact is not None:
+            return artifact
+    
+    with span(f"{generator}.generate", storage=storage, streamed=True):
+        artifact = await render_into_storage(
+            render, filename, object_name, generator, storage,
+            weight=content_weight(body.size_hint()), profile_token=profile_token
+        )
+    await body.drain()
+    RENDER_INPUT_BYTES.labels(generator).observe(body.size)
+    
+    if idempotency_key:
+        await run_in_threadpool(
+            index.save_idempotency_key, idempotency_key, request_key(), artifact.storage, artifact.object_name
+        )
+    return artifact
+
+_append_locks: "weakref.WeakValueDictionary[tuple, asyncio.Lock]" = weakref.WeakValueDictionary()
 
-def get_minio_handler():
-    return MinioHandler()
+@contextmanager
+def open_stored_file(storage: str, object_name: str) -> Iterator[BinaryIO]:
+    """A stored file opened for reading in a render thread; MinIO objects are fetched into a spooled buffer first"""
+    if storage == "minio":
+        source = spooled_buffer()
+        try:
+            for chunk in get_minio_handler().stream_document(object_name):
+                source.write(chunk)
+            source.seek(0)
+            yield source
+        finally:
+            source.close()
+    else:
+        with open(LocalDocumentStore().resolve(object_name), 'rb') as source:
+            yield source
 
-def get_excel_creator():
-    return ExcelCreator()
+async def append_to_artifact(append: Callable[[BinaryIO, BinaryIO], object], request, generator: str,
+                             extension: str, idempotency_key: Optional[str] = None,
+                             profile_token: Optional[str] = None) -> StoredArtifact:
+    """
+    Rewrite a stored file in place with `append(source, output)`. Appends to the same file are
+    applied one after another, also across workers: besides an asyncio lock within this worker
+    they hold a lock file in SINGLE_FLIGHT_LOCK_DIR (the temp directory if unset, which only
+    covers workers on this host; MinIO served from several hosts needs a shared directory).
+    Appends are never coalesced with each other; a repeated Idempotency-Key returns the file
+    without appending again.
+    """
+    storage = resolve_storage(request.storage)
+    object_name = request.object_name
+    if not object_name.lower().endswith(extension):
+        raise HTTPException(status_code=422, detail=f"Only {extension} files can be appended to with this endpoint")
+    
+    record = await run_in_threadpool(get_artifact_index().get, object_name, storage)
+    if storage == "minio":
+        await run_in_threadpool(get_minio_handler().stat_document, object_name)
+    elif not os.path.isfile(LocalDocumentStore().resolve(object_name)):
+        raise HTTPException(status_code=404, detail=f"File not found: {object_name}")
+    filename = record["filename"] if record else object_name.split('/')[-1]
+    
+    def render(output):
+        with open_stored_file(storage, object_name) as source:
+            append(source, output)
+    
+    key = (storage, object_name)
+    lock = _append_locks.get(key)
+    if lock is None:
+        lock = _append_locks[key] = asyncio.Lock()
+    async with lock, append_lock(storage, object_name):
+        return await generate_artifact(
+            render,
+            filename=filename,
+            object_name=object_name,
+            generator=generator,
+            request=request,
+            idempotency_key=idempotency_key,
+            profile_token=profile_token,
+            weight=content_weight(len(request.content)),
+            coalesce=False
+        )
 
-def get_presentation_creator():
-    return PresentationCreator()
+@asynccontextmanager
+async def append_lock(storage: str, object_name: str) -> AsyncIterator[None]:
+    """Cross-worker lock on one stored file for the duration of an append"""
+    if fcntl is None:
+        # No flock on this platform: appends are serialised within this worker only
+        yield
+        return
+    key = "append-" + hashlib.sha256(f"{storage}\0{object_name}".encode("utf-8")).hexdigest()
+    async with file_lock(settings.SINGLE_FLIGHT_LOCK_DIR or tempfile.gettempdir(), key):
+        yield
 
-def get_sql_service():
-    return SQLToExcelService()
+def replay_idempotency_key(index: ArtifactIndex, idempotency_key: str, request_key: str) -> Optional[StoredArtifact]:
+    """Artifact a still-fresh Idempotency-Key already produced, or None to render a new one"""
+    now = datetime.now()
+    index.purge_idempotency_keys(now - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS))
+    previous = index.get_idempotency_key(idempotency_key, now - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS))
+    if previous is None:
+        return None
+    if previous["request_hash"] != request_key:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    record = index.get(previous["object_name"], previous["storage"])
+    if record is None:
+        # The original file has since been deleted; render it again under the same key
+        return None
+    artifact = artifact_from_record(record)
+    artifact.download_url = build_download_url(artifact)
+    return artifact
+
+def build_download_url(artifact: StoredArtifact) -> str:
+    """Presigned URL for MinIO objects, this server's /download route for local files"""
+    if artifact.storage == "minio":
+        return get_minio_handler().get_presigned_url(artifact.object_name)
+    server_ip = get_server_ip()
+    return f"http://{server_ip}:{settings.PORT}/api/v1/download/{artifact.object_name}"
 
 def get_server_ip():
     """Get server IP address"""
@@ -45,73 +292,232 @@ def get_server_ip():
 @router.post("/generate-document", response_model=DocumentResponse)
 async def generate_document(
     request: DocumentRequest,
-    docx_creator: DocxCreator = Depends(get_docx_creator)
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    x_profile_token: Optional[str] = Header(None),
+    docx_creator: "DocxCreator" = Depends(get_docx_creator)
 ):
     try:
-        # Create date-based folder structure
-        today = datetime.now()
-        folder_path = os.path.join(
-            settings.DOCUMENT_LOCATION,
-            today.strftime('%Y'),
-            today.strftime('%m'),
-            today.strftime('%d')
-        )
-        os.makedirs(folder_path, exist_ok=True)
-        
         # Generate filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = request.filename or f"document_{timestamp}"
-        if not filename.endswith('.docx'):
-            filename += '.docx'
-        
-        # Full file path
-        filepath = os.path.join(folder_path, filename)
+        filename = docx_creator.generate_filename(request.filename)
         
-        # Create document
-        doc_stream = docx_creator.create_document(request.content, filename)
+        # Render straight into the chosen storage (local disk or MinIO); stopped if the client disconnects
+        async with watch_disconnect(http_request):
+            artifact = await generate_artifact(
+                lambda output: docx_creator.create_document(request.content, filename, output=output),
+                filename=filename,
+                object_name=docx_creator.generate_object_name(filename),
+                generator="document",
+                request=request,
+                idempotency_key=idempotency_key,
+                profile_token=x_profile_token,
+                weight=content_weight(len(request.content))
+            )
         
-        # Save to local file system
-        with open(filepath, 'wb') as f:
-            f.write(doc_stream.read())
+        return DocumentResponse(
+            status="success",
+            message="Document generated successfully",
+            filename=artifact.filename,
+            object_name=artifact.object_name,
+            download_url=artifact.download_url,
+            created_at=artifact.created_at
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/generate-document/raw", response_model=DocumentResponse)
+async def generate_document_raw(
+    request: Request,
+    filename: Optional[str] = None,
+    storage: Optional[Literal["local", "minio"]] = None,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    x_profile_token: Optional[str] = Header(None),
+    docx_creator: "DocxCreator" = Depends(get_docx_creator)
+):
+    """
+    Same as /generate-document, with the markdown as the raw request body (text/markdown or text/plain,
+    optionally gzip/deflate/zstd Content-Encoding), parsed line by line as it arrives
+    """
+    try:
+        body = BodyStream(request)
+        filename = docx_creator.generate_filename(filename)
         
-        # Generate download URL (include the /api/v1 prefix)
-        server_ip = get_server_ip()
-        relative_path = filepath.replace(settings.DOCUMENT_LOCATION + os.sep, '').replace(os.sep, '/')
-        download_url = f"http://{server_ip}:{settings.PORT}/api/v1/download/{relative_path}"
+        async with watch_disconnect(request):
+            artifact = await generate_streamed_artifact(
+                lambda output: docx_creator.create_document(body, filename, output=output),
+                body,
+                filename=filename,
+                object_name=docx_creator.generate_object_name(filename),
+                generator="document",
+                requested_filename=request.query_params.get("filename"),
+                storage=storage,
+                idempotency_key=idempotency_key,
+                profile_token=x_profile_token
+            )
         
         return DocumentResponse(
             status="success",
             message="Document generated successfully",
-            filename=filename,
-            object_name=relative_path,
-            download_url=download_url,
-            created_at=datetime.now()
+            filename=artifact.filename,
+            object_name=artifact.object_name,
+            download_url=artifact.download_url,
+            created_at=artifact.created_at
         )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/append-document", response_model=DocumentResponse)
+async def append_document(
+    request: DocumentAppendRequest,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    x_profile_token: Optional[str] = Header(None),
+    docx_creator: "DocxCreator" = Depends(get_docx_creator)
+):
+    """Add content to the end of a generated Word document, keeping its object name and download URL"""
+    try:
+        async with watch_disconnect(http_request):
+            artifact = await append_to_artifact(
+                lambda source, output: docx_creator.append_to_document(source, request.content, output=output),
+                request,
+                generator="document",
+                extension=".docx",
+                idempotency_key=idempotency_key,
+                profile_token=x_profile_token
+            )
         
+        return DocumentResponse(
+            status="success",
+            message="Document appended successfully",
+            filename=artifact.filename,
+            object_name=artifact.object_name,
+            download_url=artifact.download_url,
+            created_at=artifact.created_at
+        )
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/download/{path:path}")
-async def download_file(path: str):
-    """Download generated document using path structure YYYY/MM/DD/filename"""
+def offload_headers(filepath: str, local_store: LocalDocumentStore) -> Optional[dict]:
+    """Headers that let the front proxy send the file itself, or None to serve it from Python"""
+    if settings.DOWNLOAD_OFFLOAD == "x-sendfile":
+        return {'X-Sendfile': os.path.abspath(filepath)}
+    if settings.DOWNLOAD_OFFLOAD == "x-accel-redirect":
+        path = os.path.abspath(filepath)
+        if path.startswith(local_store.root + os.sep):
+            return {'X-Accel-Redirect': settings.DOWNLOAD_ACCEL_PREFIX.rstrip('/') + '/' + quote(local_store.to_object_name(path))}
+    return None
+
+@router.api_route("/download/{path:path}", methods=["GET", "HEAD"])
+async def download_file(
+    path: str,
+    request: Request,
+    local_store: LocalDocumentStore = Depends(get_local_store),
+    artifact_index: ArtifactIndex = Depends(get_artifact_index)
+):
+    """Download generated document by object name (YYYY/MM/DD/<shard>/<id>.<ext>)"""
     try:
-        # Reconstruct the full file path
-        filepath = os.path.join(settings.DOCUMENT_LOCATION, path)
+        # Indexed artifacts know their real location and friendly filename
+        artifact = await run_in_threadpool(artifact_index.get, path, "local")
+        filepath = artifact["path"] if artifact else local_store.resolve(path)
+        filename = artifact["filename"] if artifact else path.split('/')[-1]
+        
+        # A single stat both checks existence and feeds the validators
+        try:
+            stat_result = await run_in_threadpool(os.stat, filepath)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="File not found")
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPException(status_code=404, detail="File not found")
         
-        if not os.path.exists(filepath):
-            raise HTTPException(status_code=421, detail="File not found")
+        etag, last_modified = file_validators(stat_result)
+        headers = {
+            'ETag': etag,
+            'Last-Modified': last_modified,
+            'Accept-Ranges': 'bytes',
+            'Content-Disposition': content_disposition(filename)
+        }
+        modified_at = datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc)
+        if is_not_modified(request.headers, etag, modified_at):
+            return Response(status_code=304, headers=headers)
         
-        # Extract filename from path
-        filename = path.split('/')[-1]
+        if artifact:
+            await run_in_threadpool(artifact_index.touch, path, "local")
         
+        media_type = get_content_type(filename)
+        offload = offload_headers(filepath, local_store)
+        if offload:
+            # The proxy handles Range and streaming; no Python worker stays tied to the transfer
+            headers.update(offload)
+            return Response(headers=headers, media_type=media_type)
+        
+        # FileResponse answers Range / If-Range requests with 206 (or 416) itself
         return FileResponse(
             filepath,
-            media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            filename=filename
+            media_type=media_type,
+            headers=headers,
+            stat_result=stat_result
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.api_route("/download-object/{object_name:path}", methods=["GET", "HEAD"])
+async def download_object(
+    object_name: str,
+    request: Request,
+    minio_handler: MinioHandler = Depends(get_minio_handler),
+    artifact_index: ArtifactIndex = Depends(get_artifact_index)
+):
+    """Stream a document from MinIO in chunks, honouring Range and conditional request headers"""
+    try:
+        object_stat = await run_in_threadpool(minio_handler.stat_document, object_name)
+        artifact = await run_in_threadpool(artifact_index.get, object_name, "minio")
+        filename = artifact["filename"] if artifact else object_name.split('/')[-1]
+        headers = {
+            'ETag': quote_etag(object_stat.etag),
+            'Accept-Ranges': 'bytes',
+            'Content-Disposition': content_disposition(filename)
+        }
+        if object_stat.last_modified:
+            headers['Last-Modified'] = http_date(object_stat.last_modified)
+        
+        # Revalidation: the client's copy is still current
+        if is_not_modified(request.headers, object_stat.etag, object_stat.last_modified):
+            return Response(status_code=304, headers=headers)
+        
+        # Resumable downloads: forward a single byte range as a ranged GET
+        status_code, offset, length = 200, 0, 0
+        byte_range = None
+        if if_range_allows(request.headers, object_stat.etag, object_stat.last_modified):
+            byte_range = parse_range_header(request.headers.get('range'), object_stat.size)
+        if byte_range:
+            start, end = byte_range
+            status_code, offset, length = 206, start, end - start + 1
+            headers['Content-Range'] = f'bytes {start}-{end}/{object_stat.size}'
+        headers['Content-Length'] = str(length or object_stat.size)
+        
+        media_type = object_stat.content_type or get_content_type(filename)
+        if request.method == 'HEAD':
+            return Response(status_code=status_code, headers=headers, media_type=media_type)
+        
+        body = await run_in_threadpool(minio_handler.stream_document, object_name, offset, length)
+        if artifact:
+            await run_in_threadpool(artifact_index.touch, object_name, "minio")
+        return StreamingResponse(body, status_code=status_code, headers=headers, media_type=media_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/list-documents", response_model=DocumentListResponse)
 async def list_documents(
@@ -120,11 +526,120 @@ async def list_documents(
 ):
     """List all documents in MinIO"""
     try:
-        documents = minio_handler.list_documents(prefix or "")
+        documents = await run_in_threadpool(minio_handler.list_documents, prefix or "")
         return DocumentListResponse(documents=documents, count=len(documents))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/artifacts", response_model=ArtifactListResponse)
+async def list_artifacts(
+    artifact_type: Optional[str] = None,
+    generator: Optional[str] = None,
+    storage: Optional[str] = None,
+    prefix: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    artifact_index: ArtifactIndex = Depends(get_artifact_index)
+):
+    """List generated artifacts from the local index, filtered by type, generator, storage, prefix or date"""
+    try:
+        artifacts = await run_in_threadpool(
+            artifact_index.list,
+            artifact_type=artifact_type,
+            generator=generator,
+            storage=storage,
+            prefix=prefix,
+            since=since,
+            until=until,
+            limit=limit,
+            offset=offset
+        )
+        return ArtifactListResponse(artifacts=artifacts, count=len(artifacts))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.api_route("/artifacts/{object_name:path}", methods=["GET", "HEAD"], response_model=ArtifactRecord)
+async def get_artifact(
+    object_name: str,
+    storage: Optional[str] = None,
+    artifact_index: ArtifactIndex = Depends(get_artifact_index)
+):
+    """Metadata of one generated artifact; 404 doubles as a cheap existence check"""
+    artifact = await run_in_threadpool(artifact_index.get, object_name, storage)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return artifact
+
+@router.get("/retention")
+async def retention_status(retention_manager: RetentionManager = Depends(get_retention_manager)):
+    """Retention limits, current local usage and the report of the last pass"""
+    return {
+        "max_total_bytes": retention_manager.max_total_bytes,
+        "max_age_days": {
+            artifact_type: max_age.total_seconds() / 86400
+            for artifact_type, max_age in retention_manager.max_ages.items()
+        },
+        "used_bytes": await run_in_threadpool(retention_manager.artifact_index.total_size, retention_manager.storage),
+        "last_report": retention_manager.last_report
+    }
+
+@router.post("/retention/run")
+async def run_retention(retention_manager: RetentionManager = Depends(get_retention_manager)):
+    """Run a retention pass now and report how much it reclaimed"""
+    try:
+        return await run_in_threadpool(retention_manager.run_once)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/ready")
+async def ready():
+    """Readiness probe: 200 once this worker has warmed up, 503 until then"""
+    report = jsonable_encoder(warmup_state.report())
+    if not warmup_state.ready:
+        raise HTTPException(status_code=503, detail=report, headers={"Retry-After": "1"})
+    return report
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Render pipeline metrics in the Prometheus text format"""
+    for endpoint, snapshot in admission_snapshot().items():
+        ADMISSION_IN_USE.labels(endpoint).set(snapshot["in_use"])
+        ADMISSION_QUEUED.labels(endpoint).set(snapshot["queued"])
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def require_profile_admin(x_profile_token: Optional[str] = Header(None)):
+    """Only callers with PROFILE_ADMIN_TOKEN may read profiles"""
+    if not is_admin(x_profile_token):
+        raise HTTPException(status_code=403, detail="Profiling admin token required")
+
+@router.get("/admin/profiles", dependencies=[Depends(require_profile_admin)])
+async def get_profiles(
+    generator: Optional[str] = None,
+    object_name: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """List stored render profiles, newest first"""
+    profiles = await run_in_threadpool(list_profiles, generator, object_name, limit)
+    return {"profiles": profiles, "count": len(profiles)}
+
+@router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_profile_admin)])
+async def get_profile(profile_id: str):
+    """Summary of one profile: wall time, peak memory, top allocators and hottest functions"""
+    profile = await run_in_threadpool(load_profile, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {profile_id}")
+    return profile
+
+@router.get("/admin/profiles/{profile_id}/pstats", dependencies=[Depends(require_profile_admin)])
+async def download_profile_stats(profile_id: str):
+    """Raw cProfile stats of a profile, for pstats or snakeviz"""
+    path = profile_path(profile_id, '.pstats')
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile stats not found: {profile_id}")
+    return FileResponse(path, media_type='application/octet-stream', filename=f"{profile_id}.pstats")
+
 @router.delete("/delete-document/{object_name:path}")
 async def delete_document(
     object_name: str,
@@ -132,146 +647,435 @@ async def delete_document(
 ):
     """Delete a document from MinIO"""
     try:
-        success = minio_handler.delete_document(object_name)
+        success = await run_in_threadpool(minio_handler.delete_document, object_name)
+        await run_in_threadpool(get_artifact_index().delete, [object_name], "minio")
         return {"status": "success", "message": "Document deleted successfully" if success else "Failed to delete document"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/delete-documents", response_model=BulkDeleteResponse)
+async def delete_documents(
+    request: BulkDeleteRequest,
+    local_store: LocalDocumentStore = Depends(get_local_store)
+):
+    """Delete many documents at once, by object name or by prefix, from MinIO or local storage"""
+    if not request.object_names and not request.prefix:
+        raise HTTPException(status_code=400, detail="Provide object_names or a non-empty prefix")
+    
+    try:
+        storage = resolve_storage(request.storage)
+        store = get_minio_handler() if storage == "minio" else local_store
+        artifact_index = get_artifact_index()
+        deleted, errors = 0, []
+        if request.object_names:
+            deleted, errors = await run_in_threadpool(store.delete_documents, request.object_names)
+            failed = {error["object_name"] for error in errors}
+            await run_in_threadpool(
+                artifact_index.delete, [name for name in request.object_names if name not in failed], storage
+            )
+        if request.prefix:
+            prefix_deleted, prefix_errors = await run_in_threadpool(store.delete_prefix, request.prefix)
+            deleted += prefix_deleted
+            errors.extend(prefix_errors)
+            if not prefix_errors:
+                await run_in_threadpool(artifact_index.delete_prefix, request.prefix, storage)
+        
+        return BulkDeleteResponse(
+            status="success" if not errors else "partial",
+            deleted=deleted,
+            errors=errors
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/generate-excel", response_model=ExcelResponse)
 async def generate_excel(
     request: ExcelRequest,
-    excel_creator: ExcelCreator = Depends(get_excel_creator)
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    x_profile_token: Optional[str] = Header(None),
+    excel_creator: "ExcelCreator" = Depends(get_excel_creator)
 ):
     try:
-        # Create date-based folder structure
-        today = datetime.now()
-        folder_path = os.path.join(
-            settings.DOCUMENT_LOCATION,
-            today.strftime('%Y'),
-            today.strftime('%m'),
-            today.strftime('%d')
-        )
-        os.makedirs(folder_path, exist_ok=True)
-        
         # Generate filename
         filename = excel_creator.generate_filename(request.filename)
         
-        # Full file path
-        filepath = os.path.join(folder_path, filename)
-        
-        # Create Excel file from content
-        excel_stream = excel_creator.create_excel_from_content(request.content, filename)
+        # Render straight into the chosen storage (local disk or MinIO); stopped if the client disconnects
+        async with watch_disconnect(http_request):
+            artifact = await generate_artifact(
+                lambda output: excel_creator.create_excel_from_content(request.content, filename, output=output),
+                filename=filename,
+                object_name=excel_creator.generate_object_name(filename),
+                generator="excel",
+                request=request,
+                idempotency_key=idempotency_key,
+                profile_token=x_profile_token,
+                weight=content_weight(len(request.content))
+            )
         
-        # Save to local file system
-        with open(filepath, 'wb') as f:
-            f.write(excel_stream.read())
+        return ExcelResponse(
+            status="success",
+            message="Excel file generated successfully",
+            filename=artifact.filename,
+            object_name=artifact.object_name,
+            download_url=artifact.download_url,
+            created_at=artifact.created_at
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/generate-excel/raw", response_model=ExcelResponse)
+async def generate_excel_raw(
+    request: Request,
+    filename: Optional[str] = None,
+    storage: Optional[Literal["local", "minio"]] = None,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    x_profile_token: Optional[str] = Header(None),
+    excel_creator: "ExcelCreator" = Depends(get_excel_creator)
+):
+    """
+    Same as /generate-excel, with the markdown as the raw request body (text/markdown or text/plain,
+    optionally gzip/deflate/zstd Content-Encoding), parsed line by line as it arrives
+    """
+    try:
+        body = BodyStream(request)
+        filename = excel_creator.generate_filename(filename)
         
-        # Generate download URL
-        server_ip = get_server_ip()
-        relative_path = filepath.replace(settings.DOCUMENT_LOCATION + os.sep, '').replace(os.sep, '/')
-        download_url = f"http://{server_ip}:{settings.PORT}/api/v1/download/{relative_path}"
+        async with watch_disconnect(request):
+            artifact = await generate_streamed_artifact(
+                lambda output: excel_creator.create_excel_from_content(body, filename, output=output),
+                body,
+                filename=filename,
+                object_name=excel_creator.generate_object_name(filename),
+                generator="excel",
+                requested_filename=request.query_params.get("filename"),
+                storage=storage,
+                idempotency_key=idempotency_key,
+                profile_token=x_profile_token
+            )
         
         return ExcelResponse(
             status="success",
             message="Excel file generated successfully",
-            filename=filename,
-            object_name=relative_path,
-            download_url=download_url,
-            created_at=datetime.now()
+            filename=artifact.filename,
+            object_name=artifact.object_name,
+            download_url=artifact.download_url,
+            created_at=artifact.created_at
         )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/append-excel", response_model=ExcelResponse)
+async def append_excel(
+    request: ExcelAppendRequest,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    x_profile_token: Optional[str] = Header(None),
+    excel_creator: "ExcelCreator" = Depends(get_excel_creator)
+):
+    """
+    Add rows to a generated workbook: sections whose "# Sheet" heading names an existing sheet
+    continue below its last row, others become new sheets
+    """
+    try:
+        async with watch_disconnect(http_request):
+            artifact = await append_to_artifact(
+                lambda source, output: excel_creator.append_to_workbook(source, request.content, output=output),
+                request,
+                generator="excel",
+                extension=".xlsx",
+                idempotency_key=idempotency_key,
+                profile_token=x_profile_token
+            )
         
+        return ExcelResponse(
+            status="success",
+            message="Excel file appended successfully",
+            filename=artifact.filename,
+            object_name=artifact.object_name,
+            download_url=artifact.download_url,
+            created_at=artifact.created_at
+        )
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/generate-presentation", response_model=PresentationResponse)
 async def generate_presentation(
     request: PresentationRequest,
-    presentation_creator: PresentationCreator = Depends(get_presentation_creator)
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    x_profile_token: Optional[str] = Header(None),
+    presentation_creator: "PresentationCreator" = Depends(get_presentation_creator)
 ):
     try:
-        # Create date-based folder structure
-        today = datetime.now()
-        folder_path = os.path.join(
-            "generated_presentations",
-            today.strftime('%Y'),
-            today.strftime('%m'),
-            today.strftime('%d')
-        )
-        os.makedirs(folder_path, exist_ok=True)
-        
         # Generate filename
         filename = presentation_creator.generate_filename(request.filename)
         
-        # Full file path
-        filepath = os.path.join(folder_path, filename)
+        # Render straight into the chosen storage (local disk or MinIO); stopped if the client disconnects
+        async with watch_disconnect(http_request):
+            artifact = await generate_artifact(
+                lambda output: presentation_creator.create_presentation(request.content, filename, output=output),
+                filename=filename,
+                object_name=presentation_creator.generate_object_name(filename),
+                generator="presentation",
+                request=request,
+                idempotency_key=idempotency_key,
+                profile_token=x_profile_token,
+                weight=content_weight(len(request.content))
+            )
         
-        # Create presentation
-        presentation_stream = presentation_creator.create_presentation(request.content, filename)
-        
-        # Save to local file system
-        with open(filepath, 'wb') as f:
-            f.write(presentation_stream.read())
+        return PresentationResponse(
+            status="success",
+            message="Presentation generated successfully",
+            filename=artifact.filename,
+            object_name=artifact.object_name,
+            download_url=artifact.download_url,
+            created_at=artifact.created_at
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/generate-presentation/raw", response_model=PresentationResponse)
+async def generate_presentation_raw(
+    request: Request,
+    filename: Optional[str] = None,
+    storage: Optional[Literal["local", "minio"]] = None,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    x_profile_token: Optional[str] = Header(None),
+    presentation_creator: "PresentationCreator" = Depends(get_presentation_creator)
+):
+    """
+    Same as /generate-presentation, with the HTML as the raw request body (text/html,
+    optionally gzip/deflate/zstd Content-Encoding); decompressed as it arrives and parsed once complete
+    """
+    try:
+        body = BodyStream(request)
+        filename = presentation_creator.generate_filename(filename)
         
-        # Generate download URL
-        server_ip = get_server_ip()
-        relative_path = filepath.replace("generated_presentations" + os.sep, '').replace(os.sep, '/')
-        download_url = f"http://{server_ip}:{settings.PORT}/api/v1/download/{relative_path}"
+        async with watch_disconnect(request):
+            artifact = await generate_streamed_artifact(
+                lambda output: presentation_creator.create_presentation(body, filename, output=output),
+                body,
+                filename=filename,
+                object_name=presentation_creator.generate_object_name(filename),
+                generator="presentation",
+                requested_filename=request.query_params.get("filename"),
+                storage=storage,
+                idempotency_key=idempotency_key,
+                profile_token=x_profile_token
+            )
         
         return PresentationResponse(
             status="success",
             message="Presentation generated successfully",
-            filename=filename,
-            object_name=relative_path,
-            download_url=download_url,
-            created_at=datetime.now()
+            filename=artifact.filename,
+            object_name=artifact.object_name,
+            download_url=artifact.download_url,
+            created_at=artifact.created_at
         )
-        
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/execute-sql-excel", response_model=SQLQueryResponse)
 async def execute_sql_query(
     request: SQLQueryRequest,
-    sql_service: SQLToExcelService = Depends(get_sql_service)
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    x_profile_token: Optional[str] = Header(None),
+    sql_service: "SQLToExcelService" = Depends(get_sql_service)
 ):
     try:
-        # Create date-based folder structure
-        today = datetime.now()
-        folder_path = os.path.join(
-            settings.DOCUMENT_LOCATION,
-            today.strftime('%Y'),
-            today.strftime('%m'),
-            today.strftime('%d')
-        )
-        os.makedirs(folder_path, exist_ok=True)
-        
         # Generate filename
         filename = sql_service.generate_filename(request.filename)
         
-        # Full file path
-        filepath = os.path.join(folder_path, filename)
-        
-        # Execute query and create Excel file
-        excel_stream = sql_service.execute_query_to_excel(request.query, filename)
+        async def estimate_weight() -> int:
+            # Only worth a round trip to the database when the weight decides admission
+            if not settings.ADMISSION_ENABLED:
+                return rows_weight(None)
+            return rows_weight(await run_in_threadpool(sql_service.estimate_rows, request.query))
         
-        # Save to local file system
-        with open(filepath, 'wb') as f:
-            f.write(excel_stream.read())
-        
-        # Generate download URL
-        server_ip = get_server_ip()
-        relative_path = filepath.replace(settings.DOCUMENT_LOCATION + os.sep, '').replace(os.sep, '/')
-        download_url = f"http://{server_ip}:{settings.PORT}/api/v1/download/{relative_path}"
+        # Render straight into the chosen storage (local disk or MinIO); stopped if the client disconnects
+        async with watch_disconnect(http_request):
+            artifact = await generate_artifact(
+                lambda output: sql_service.execute_query_to_excel(request.query, filename, output=output),
+                filename=filename,
+                object_name=sql_service.generate_object_name(filename),
+                generator="sql",
+                request=request,
+                idempotency_key=idempotency_key,
+                profile_token=x_profile_token,
+                weight=estimate_weight
+            )
         
         return SQLQueryResponse(
             status="success",
             message="SQL query executed and Excel file generated successfully",
-            filename=filename,
-            object_name=relative_path,
-            download_url=download_url,
-            created_at=datetime.now()
+            filename=artifact.filename,
+            object_name=artifact.object_name,
+            download_url=artifact.download_url,
+            created_at=artifact.created_at
         )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def batch_render(item: BatchItem):
+    """Filename, object name and render function for one item of a batch"""
+    if item.type == "document":
+        creator = get_docx_creator()
+        filename = creator.generate_filename(item.filename)
+        render = lambda output: creator.create_document(item.content, filename, output=output)
+    elif item.type == "excel":
+        creator = get_excel_creator()
+        filename = creator.generate_filename(item.filename)
+        render = lambda output: creator.create_excel_from_content(item.content, filename, output=output)
+    elif item.type == "presentation":
+        creator = get_presentation_creator()
+        filename = creator.generate_filename(item.filename)
+        render = lambda output: creator.create_presentation(item.content, filename, output=output)
+    else:
+        creator = get_sql_service()
+        filename = creator.generate_filename(item.filename)
+        render = lambda output: creator.execute_query_to_excel(item.query, filename, output=output)
+    return filename, creator.generate_object_name(filename), render
+
+async def render_batch_item(index: int, item: BatchItem, sink):
+    """Render one batch item into a sink; failures are returned instead of raised"""
+    try:
+        filename, object_name, render = batch_render(item)
+        request_key = request_hash(item.type, item.model_dump_json())
+        artifact = await persist_artifact(sink, render, object_name, filename, item.type, request_key)
+        return index, artifact, None
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        return index, None, detail
+
+def batch_weight(items) -> int:
+    """Admission weight of a whole batch"""
+    return sum(rows_weight(None) if item.type == "sql" else content_weight(len(item.content)) for item in items)
+
+class TicketStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that releases an admission ticket however the response ends, including
+    a client that is gone before the first byte is sent (when neither the body generator's
+    finally nor a background task would run)
+    """
+    def __init__(self, content, ticket: AdmissionTicket, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.ticket.release()
+
+async def stream_batch_zip(items, ticket: AdmissionTicket) -> AsyncIterator[bytes]:
+    """Zip each render as soon as it finishes (in completion order) and stream the archive out"""
+    sink = MemorySink()
+    # The renders inherit this token, so those still running when the client goes away stop too
+    token = CancelToken()
+    with cancel_scope(token):
+        tasks = [asyncio.ensure_future(render_batch_item(index, item, sink)) for index, item in enumerate(items)]
+    writer = ZipStreamWriter()
+    results = [None] * len(items)
+    try:
+        for finished in asyncio.as_completed(tasks):
+            index, artifact, error = await finished
+            if artifact is None:
+                results[index] = BatchItemResult(type=items[index].type, status="error", error=error)
+                continue
+            for chunk in writer.add(artifact.filename, artifact.data):
+                yield chunk
+            # Same-named files get "a (1).docx" in the archive; the manifest names the entry itself
+            results[index] = BatchItemResult(type=items[index].type, status="success", filename=writer.last_name)
+            # Drop the rendered buffer (and its spill file) as soon as it is in the archive
+            artifact.data.close()
+            artifact.data = None
+        
+        yield writer.add_json("manifest.json", [result.model_dump() for result in results])
+        yield writer.close()
+    finally:
+        # Client went away: stop the remaining renders and stop waiting for them
+        if not all(task.done() for task in tasks):
+            token.cancel("client disconnected")
+        for task in tasks:
+            task.cancel()
+        ticket.release()
+
+@router.post("/generate-batch")
+async def generate_batch(request: BatchRequest, http_request: Request):
+    """
+    Render a bundle of mixed documents in parallel on the render pool.
+    mode="zip" streams one archive (plus manifest.json) while renders finish;
+    mode="manifest" stores each file and returns their download URLs.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="Batch has no items")
+    
+    # Resolved before admission, so an unknown or unreachable storage never holds capacity
+    sink = get_artifact_sink(request.storage) if request.mode != "zip" else None
+    
+    # The whole batch is admitted up front so an overloaded server answers 429/503 before streaming
+    ticket = await admit("batch", batch_weight(request.items))
+    
+    if request.mode == "zip":
+        archive_name = request.archive_name or f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        if not archive_name.endswith('.zip'):
+            archive_name += '.zip'
+        return TicketStreamingResponse(
+            stream_batch_zip(request.items, ticket),
+            ticket,
+            media_type="application/zip",
+            headers={'Content-Disposition': content_disposition(archive_name)}
+        )
+    
+    try:
+        async with ticket, watch_disconnect(http_request):
+            rendered = await asyncio.gather(*[
+                render_batch_item(index, item, sink) for index, item in enumerate(request.items)
+            ])
+        results = []
+        for index, artifact, error in rendered:
+            item = request.items[index]
+            if artifact is None:
+                results.append(BatchItemResult(type=item.type, status="error", error=error))
+                continue
+            results.append(BatchItemResult(
+                type=item.type,
+                status="success",
+                filename=artifact.filename,
+                object_name=artifact.object_name,
+                download_url=build_download_url(artifact)
+            ))
         
+        failed = sum(result.status == "error" for result in results)
+        return BatchResponse(
+            status="success" if not failed else ("error" if failed == len(results) else "partial"),
+            items=results,
+            created_at=datetime.now()
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -283,9 +1087,20 @@ async def root():
         "version": "2.0.0",
         "endpoints": {
             "generate": "/generate-document (POST)",
-            "download": "/download/{object_name:path} (GET)",
+            "generate_raw": "/generate-document/raw, /generate-excel/raw, /generate-presentation/raw (POST, text body)",
+            "generate_batch": "/generate-batch (POST)",
+            "append": "/append-document, /append-excel (POST)",
+            "download": "/download/{object_name:path} (GET, HEAD)",
+            "download_object": "/download-object/{object_name:path} (GET, HEAD)",
             "list": "/list-documents (GET)",
-            "delete": "/delete-document/{object_name:path} (DELETE)"
+            "delete": "/delete-document/{object_name:path} (DELETE)",
+            "bulk_delete": "/delete-documents (POST)",
+            "artifacts": "/artifacts (GET), /artifacts/{object_name:path} (GET, HEAD)",
+            "retention": "/retention (GET), /retention/run (POST)",
+            "ready": "/ready (GET)",
+            "metrics": "/metrics (GET)",
+            "profiles": "/admin/profiles (GET), /admin/profiles/{profile_id} (GET), /admin/profiles/{profile_id}/pstats (GET)"
         },
+        "formats": sorted(enabled_formats()),
         "server_ip": get_server_ip()
     }
\ No newline at end of file
@@ -1,61 +1,167 @@
 import pandas as pd
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
 from io import BytesIO
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List
+from typing import Callable, Iterator, List, BinaryIO, Optional
+import threading
 from config import settings
+from services.storage_layout import build_object_name
+from services.metrics import RENDER_INPUT_BYTES, SQL_ROWS, stage
+from services.tracing import instrument_engine
+from services.render_memory import checkpoint, spooled_buffer
+from services.cancellation import current_token, raise_if_cancelled
+from fastapi import HTTPException
 
 class SQLToExcelService:
-    def __init__(self):
-        # Initialize database connection
-        self.db_connection_string = (
+    def __init__(self, engine: Optional[Engine] = None):
+        # Initialize database connection (an engine can be injected, e.g. SQLite for benchmarks)
+        self.db_connection_string = settings.DB_URL or (
             f"mysql+mysqlconnector://{settings.DB_USER}:{settings.DB_PASSWORD}@"
             f"{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
         )
-        self.engine = create_engine(self.db_connection_string)
+        self.engine = instrument_engine(engine or create_engine(self.db_connection_string))
     
-    def execute_query_to_excel(self, query: str, filename: str = None) -> BytesIO:
+    def execute_query_to_excel(self, query: str, filename: str = None, output: BinaryIO = None) -> BinaryIO:
         """
-        Execute SQL query and return results as Excel file in BytesIO format
+        Execute SQL query and return results as Excel file in BytesIO format,
+        or write the file into `output` (file, pipe, upload) when given
         """
         try:
-            # Execute the query and get results
-            df = pd.read_sql_query(text(query), self.engine)
+            RENDER_INPUT_BYTES.labels("sql").observe(len(query))
             
-            # Create a BytesIO object to store the Excel file
-            excel_stream = BytesIO()
+            # Buffer for the Excel file unless the caller gave an output; it spills to disk when large
+            excel_stream = output if output is not None else spooled_buffer()
+            writer = pd.ExcelWriter(excel_stream, engine='openpyxl')
             
-            # Use ExcelWriter to write to the BytesIO object
-            with pd.ExcelWriter(excel_stream, engine='openpyxl') as writer:
-                # Write the query text first
-                df_query_text = pd.DataFrame({'Query Executed': [query]})
-                df_query_text.to_excel(
-                    writer, 
-                    sheet_name='Results', 
-                    startrow=0, 
-                    startcol=0, 
-                    index=False, 
-                    header=True
-                )
-                
-                # Write the results table below the query text
-                df.to_excel(
-                    writer, 
-                    sheet_name='Results', 
-                    startrow=2,  # Start 2 rows below the query text
-                    startcol=0, 
-                    index=False, 
-                    header=True
-                )
+            # Write the query text first
+            df_query_text = pd.DataFrame({'Query Executed': [query]})
+            df_query_text.to_excel(
+                writer, 
+                sheet_name='Results', 
+                startrow=0, 
+                startcol=0, 
+                index=False, 
+                header=True
+            )
+            
+            # Execute the query and write the results table below the query text as the rows arrive
+            with self.engine.connect() as conn, self.cancel_on_disconnect(conn):
+                with stage("sql", "query"):
+                    result = conn.execute(text(query))
+                columns = list(result.keys())
+                # Fetching and filling the sheet happen in one pass: each chunk becomes a small
+                # DataFrame written at the next free row, so neither the raw rows nor a DataFrame
+                # of the whole result exist next to the sheet
+                with stage("sql", "fetch"):
+                    row_count = 0
+                    while True:
+                        chunk = result.fetchmany(settings.SQL_FETCH_CHUNK_ROWS)
+                        if chunk or not row_count:
+                            pd.DataFrame.from_records(chunk, columns=columns, coerce_float=True).to_excel(
+                                writer, 
+                                sheet_name='Results', 
+                                # 2 rows below the query text, then right after the previous chunk
+                                startrow=2 + (row_count + 1 if row_count else 0), 
+                                startcol=0, 
+                                index=False, 
+                                header=not row_count
+                            )
+                        checkpoint("fetch")
+                        if not chunk:
+                            break
+                        row_count += len(chunk)
+            SQL_ROWS.labels().observe(row_count)
+            
+            with stage("sql", "serialize"):
+                writer.close()
             
             # Reset the stream position to the beginning
-            excel_stream.seek(0)
+            if output is None:
+                excel_stream.seek(0)
             
             return excel_stream
             
+        except HTTPException:
+            raise
         except Exception as e:
+            # A statement killed because the client went away fails with a driver error
+            raise_if_cancelled("query")
             raise Exception(f"Error executing SQL query: {str(e)}")
     
+    @contextmanager
+    def cancel_on_disconnect(self, conn) -> Iterator[None]:
+        """Kill the statement running on `conn` on the database server if the request is cancelled"""
+        token = current_token()
+        interrupt = self.statement_interrupter(conn) if token is not None else None
+        if interrupt is None:
+            # Nothing to interrupt; the fetch loop still stops at its next checkpoint
+            yield
+            return
+        unregister = token.on_cancel(
+            # Cancelled from the event loop; the kill opens a connection of its own, so it runs in a thread
+            lambda: threading.Thread(target=self._interrupt, args=(interrupt,), name="sql-kill", daemon=True).start()
+        )
+        try:
+            yield
+        finally:
+            unregister()
+            if token.cancelled:
+                # A kill may still be on its way; never hand this connection to another query
+                conn.invalidate()
+    
+    def statement_interrupter(self, conn) -> Optional[Callable[[], None]]:
+        """Function that stops the statement currently running on `conn`, or None if the driver can't"""
+        dbapi_connection = conn.connection.dbapi_connection
+        dialect = conn.dialect.name
+        if dialect == "mysql":
+            info = conn.connection.info
+            if "connection_id" not in info:
+                # Stable for the life of the pooled connection, so it is looked up once
+                info["connection_id"] = conn.exec_driver_sql("SELECT CONNECTION_ID()").scalar()
+            connection_id = int(info["connection_id"])
+            
+            def kill_query():
+                with self.engine.connect() as killer:
+                    killer.exec_driver_sql(f"KILL QUERY {connection_id}")
+            return kill_query
+        if dialect == "sqlite":
+            # sqlite3's interrupt() is safe to call from another thread
+            return dbapi_connection.interrupt
+        # psycopg and others expose a server-side cancel on the connection
+        return getattr(dbapi_connection, "cancel", None)
+    
+    def _interrupt(self, interrupt: Callable[[], None]):
+        try:
+            interrupt()
+            print("Killed the SQL statement of a cancelled request")
+        except Exception as e:
+            print(f"Could not kill the SQL statement of a cancelled request: {e}")
+    
+    def estimate_rows(self, query: str) -> Optional[int]:
+        """
+        Rough result size from the database's query plan (MySQL/MariaDB and PostgreSQL),
+        or None for other databases and for plans that cannot be read
+        """
+        dialect = self.engine.dialect.name
+        if dialect not in ("mysql", "mariadb", "postgresql"):
+            return None
+        try:
+            with self.engine.connect() as conn:
+                if dialect == "postgresql":
+                    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}")).scalar()
+                    return int(plan[0]["Plan"]["Plan Rows"])
+                plan = conn.execute(text(f"EXPLAIN {query}")).mappings().all()
+        except SQLAlchemyError as e:
+            print(f"Could not estimate the result size of a SQL query: {e}")
+            return None
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+        rows = [int(row["rows"]) for row in plan if row.get("rows") is not None]
+        return max(rows) if rows else None
+    
     def execute_multiple_queries_to_excel(self, queries: List[str], filename: str = None) -> BytesIO:
         """
         Execute multiple SQL queries and return results as Excel file with proper spacing
@@ -115,6 +221,5 @@ class SQLToExcelService:
         return filename
     
     def generate_object_name(self, filename: str) -> str:
-        """Generate object name with date-based folder structure"""
-        today = datetime.now()
-        return f"{today.strftime('%Y')}/{today.strftime('%m')}/{today.strftime('%d')}/{filename}"
\ No newline at end of file
+        """Generate a unique, sharded object name under the date-based folder structure"""
+        return build_object_name(filename)
\ No newline at end of file
@@ -0,0 +1,176 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from fastapi import HTTPException
+from config import settings
+from services.metrics import ADMISSION_DECISIONS
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """Parse "document=16,excel=8,sql=4" into capacity per endpoint"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        endpoint, _, capacity = item.partition('=')
+        limits[endpoint.strip()] = int(capacity)
+    return limits
+
+def content_weight(size: int) -> int:
+    """Weight of a render whose input is `size` bytes/characters"""
+    return 1 + size // max(1, settings.ADMISSION_WEIGHT_BYTES)
+
+def rows_weight(rows: Optional[int]) -> int:
+    """Weight of a SQL export expected to return `rows` rows (an unknown count weighs 2)"""
+    if rows is None:
+        return 2
+    return 1 + rows // max(1, settings.ADMISSION_WEIGHT_ROWS)
+
+class AdmissionTicket:
+    """Capacity held by one admitted render; release() is safe to call more than once"""
+    def __init__(self, controller: "AdmissionController", weight: int):
+        self.controller = controller
+        self.weight = weight
+        self.started = time.monotonic()
+        self.released = False
+    
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller._release(self.weight, time.monotonic() - self.started)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+class AdmissionController:
+    """
+    Weighted semaphore with a bounded FIFO wait queue for one endpoint.
+    Renders take `weight` units of `capacity`; when the queue is full new requests are
+    rejected at once with 429, and requests that wait longer than `queue_timeout` get 503.
+    Both carry a Retry-After estimated from recent render times.
+    """
+    def __init__(self, name: str, capacity: int, max_queue: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.max_queue = settings.ADMISSION_MAX_QUEUE if max_queue is None else max_queue
+        self.queue_timeout = settings.ADMISSION_QUEUE_TIMEOUT_SECONDS if queue_timeout is None else queue_timeout
+        self.in_use = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters = deque()
+        # Moving average of seconds a unit of capacity is held, for Retry-After
+        self._avg_hold = 1.0
+    
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+    
+    async def admit(self, weight: int = 1) -> AdmissionTicket:
+        """Wait for `weight` units of capacity (oversized requests take all of it)"""
+        weight = max(1, min(weight, self.capacity))
+        if not self._waiters and self.in_use + weight <= self.capacity:
+            return self._grant(weight)
+        
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            ADMISSION_DECISIONS.labels(self.name, "rejected").inc()
+            raise HTTPException(
+                status_code=429,
+                detail=f"Too many {self.name} requests in progress, retry later",
+                headers={"Retry-After": self.retry_after()}
+            )
+        
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (weight, waiter)
+        self._waiters.append(entry)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Capacity was granted just as we gave up; hand it back
+                self._release(weight, 0)
+            else:
+                self._waiters.remove(entry)
+                self._wake()
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                ADMISSION_DECISIONS.labels(self.name, "timed_out").inc()
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Server is busy with {self.name} requests, retry later",
+                    headers={"Retry-After": self.retry_after()}
+                )
+            raise
+        task = asyncio.current_task()
+        if task is not None and task.cancelling():
+            # Before Python 3.12 wait_for returns instead of raising when the grant and a cancel race
+            self._release(weight, 0)
+            raise asyncio.CancelledError
+        self.admitted += 1
+        ADMISSION_DECISIONS.labels(self.name, "queued").inc()
+        return AdmissionTicket(self, weight)
+    
+    def _grant(self, weight: int) -> AdmissionTicket:
+        self.in_use += weight
+        self.admitted += 1
+        ADMISSION_DECISIONS.labels(self.name, "admitted").inc()
+        return AdmissionTicket(self, weight)
+    
+    def _release(self, weight: int, held: float):
+        self.in_use -= weight
+        if held > 0:
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+        self._wake()
+    
+    def _wake(self):
+        """Admit queued requests in order while the head of the queue fits"""
+        while self._waiters:
+            weight, waiter = self._waiters[0]
+            if waiter.done():
+                self._waiters.popleft()
+                continue
+            if self.in_use + weight > self.capacity:
+                return
+            self._waiters.popleft()
+            self.in_use += weight
+            waiter.set_result(None)
+    
+    def retry_after(self) -> str:
+        """Seconds until the current backlog should have drained"""
+        backlog = self.in_use + sum(weight for weight, _ in self._waiters)
+        return str(max(1, math.ceil(self._avg_hold * backlog / self.capacity)))
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+_controllers: Dict[str, AdmissionController] = {}
+
+def get_admission_controller(endpoint: str) -> AdmissionController:
+    """Return this worker's AdmissionController for an endpoint"""
+    controller = _controllers.get(endpoint)
+    if controller is None:
+        capacity = parse_limits(settings.ADMISSION_LIMITS).get(endpoint, settings.ADMISSION_DEFAULT_CAPACITY)
+        controller = _controllers[endpoint] = AdmissionController(endpoint, capacity)
+    return controller
+
+async def admit(endpoint: str, weight: int = 1) -> AdmissionTicket:
+    """Admit one render on an endpoint, or a no-op ticket when admission control is off"""
+    controller = get_admission_controller(endpoint)
+    if not settings.ADMISSION_ENABLED:
+        return AdmissionTicket(controller, 0)
+    return await controller.admit(weight)
+
+def admission_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Current state of every endpoint's admission controller"""
+    return {endpoint: controller.snapshot() for endpoint, controller in _controllers.items()}
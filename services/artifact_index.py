@@ -0,0 +1,294 @@
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterable, BinaryIO, Set
+from config import settings
+from services.render_memory import checkpoint
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    storage TEXT NOT NULL,
+    object_name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    artifact_type TEXT NOT NULL,
+    generator TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    created_at TEXT NOT NULL,
+    render_ms REAL,
+    request_hash TEXT,
+    last_accessed_at TEXT,
+    PRIMARY KEY (storage, object_name)
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_created_at ON artifacts (created_at);
+CREATE INDEX IF NOT EXISTS idx_artifacts_type_created_at ON artifacts (artifact_type, created_at);
+CREATE INDEX IF NOT EXISTS idx_artifacts_request_hash ON artifacts (request_hash);
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idempotency_key TEXT PRIMARY KEY,
+    request_hash TEXT NOT NULL,
+    storage TEXT NOT NULL,
+    object_name TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys (created_at);
+"""
+
+# Columns added after the first release, applied to existing index files on open
+MIGRATIONS = {
+    "last_accessed_at": "ALTER TABLE artifacts ADD COLUMN last_accessed_at TEXT",
+}
+
+LATE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_artifacts_storage_accessed ON artifacts (storage, last_accessed_at);
+"""
+
+COLUMNS = (
+    "storage", "object_name", "path", "filename", "artifact_type", "generator",
+    "size", "sha256", "created_at", "render_ms", "request_hash", "last_accessed_at"
+)
+
+def request_hash(generator: str, payload: str) -> str:
+    """Stable hash identifying a generate request (generator + canonical request body)"""
+    return hashlib.sha256(f"{generator}\0{payload}".encode("utf-8")).hexdigest()
+
+class DigestWriter(io.RawIOBase):
+    """
+    Write-through wrapper that counts bytes and hashes them on the way to `stream`.
+    It reports itself as unseekable so zip writers never seek back over hashed bytes.
+    """
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        # Serializing is often where a render peaks, so the memory budget is checked here too
+        checkpoint("serialize")
+        self._sha256.update(data)
+        self.size += len(data)
+        self.stream.write(data)
+        return len(data)
+    
+    def flush(self):
+        if not self.stream.closed:
+            self.stream.flush()
+    
+    def close(self):
+        # The wrapped stream is owned by the caller
+        super().close()
+    
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+class ArtifactIndex:
+    """Embedded SQLite index of every generated artifact, wherever it is stored"""
+    def __init__(self, path: str = None):
+        self.path = path or settings.ARTIFACT_INDEX_PATH
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+    
+    def _migrate(self, conn: sqlite3.Connection):
+        """Add columns introduced since the index file was created"""
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(artifacts)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in existing:
+                conn.execute(statement)
+        conn.execute("UPDATE artifacts SET last_accessed_at = created_at WHERE last_accessed_at IS NULL")
+        conn.executescript(LATE_INDEXES)
+    
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers proceed while a render records its artifact"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def record(self, storage: str, object_name: str, path: str, filename: str, generator: str,
+               size: int, sha256: Optional[str] = None, render_ms: Optional[float] = None,
+               request_hash: Optional[str] = None, created_at: Optional[datetime] = None):
+        """Insert or replace the metadata of one artifact"""
+        artifact_type = os.path.splitext(filename)[1].lstrip('.').lower()
+        created = (created_at or datetime.now()).isoformat()
+        row = (
+            storage, object_name, path, filename, artifact_type, generator, size, sha256,
+            created, render_ms, request_hash, created
+        )
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO artifacts ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                row
+            )
+    
+    def get(self, object_name: str, storage: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Metadata for one artifact, or None if it was never recorded"""
+        query = "SELECT * FROM artifacts WHERE object_name = ?"
+        params = [object_name]
+        if storage:
+            query += " AND storage = ?"
+            params.append(storage)
+        row = self._connection().execute(query + " LIMIT 1", params).fetchone()
+        return dict(row) if row else None
+    
+    def exists(self, object_name: str, storage: Optional[str] = None) -> bool:
+        """Whether an artifact with this object name has been recorded"""
+        return self.get(object_name, storage) is not None
+    
+    def known(self, object_names: Iterable[str], storage: str) -> Set[str]:
+        """The object names among `object_names` that have been recorded in a storage"""
+        object_names = list(object_names)
+        if not object_names:
+            return set()
+        rows = self._connection().execute(
+            f"SELECT object_name FROM artifacts WHERE storage = ? AND object_name IN ({', '.join('?' * len(object_names))})",
+            [storage, *object_names]
+        )
+        return {row[0] for row in rows}
+    
+    def list(self, artifact_type: Optional[str] = None, generator: Optional[str] = None,
+             storage: Optional[str] = None, prefix: Optional[str] = None,
+             since: Optional[datetime] = None, until: Optional[datetime] = None,
+             limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Artifacts matching the filters, newest first"""
+        clauses, params = [], []
+        if artifact_type:
+            clauses.append("artifact_type = ?")
+            params.append(artifact_type.lstrip('.').lower())
+        if generator:
+            clauses.append("generator = ?")
+            params.append(generator)
+        if storage:
+            clauses.append("storage = ?")
+            params.append(storage)
+        if prefix:
+            # Range scan instead of LIKE so '%' and '_' in names are not wildcards
+            clauses.append("object_name >= ? AND object_name < ?")
+            params.extend([prefix, prefix + '\uffff'])
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since.isoformat())
+        if until:
+            clauses.append("created_at < ?")
+            params.append(until.isoformat())
+        
+        query = "SELECT * FROM artifacts"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        return [dict(row) for row in self._connection().execute(query, params)]
+    
+    def find_by_request(self, request_hash: str, storage: str, since: datetime) -> Optional[Dict[str, Any]]:
+        """Newest artifact rendered for a request hash since a point in time"""
+        row = self._connection().execute(
+            "SELECT * FROM artifacts WHERE request_hash = ? AND storage = ? AND created_at >= ? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (request_hash, storage, since.isoformat())
+        ).fetchone()
+        return dict(row) if row else None
+    
+    def get_idempotency_key(self, idempotency_key: str, since: datetime) -> Optional[Dict[str, Any]]:
+        """The request and artifact an Idempotency-Key was first used for, if still fresh"""
+        row = self._connection().execute(
+            "SELECT * FROM idempotency_keys WHERE idempotency_key = ? AND created_at >= ?",
+            (idempotency_key, since.isoformat())
+        ).fetchone()
+        return dict(row) if row else None
+    
+    def save_idempotency_key(self, idempotency_key: str, request_hash: str, storage: str, object_name: str):
+        """Remember which artifact answered an Idempotency-Key"""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency_keys "
+                "(idempotency_key, request_hash, storage, object_name, created_at) VALUES (?, ?, ?, ?, ?)",
+                (idempotency_key, request_hash, storage, object_name, datetime.now().isoformat())
+            )
+    
+    def purge_idempotency_keys(self, before: datetime) -> int:
+        """Drop Idempotency-Keys older than their retention window"""
+        with self._connection() as conn:
+            return conn.execute(
+                "DELETE FROM idempotency_keys WHERE created_at < ?", (before.isoformat(),)
+            ).rowcount
+    
+    def touch(self, object_name: str, storage: str):
+        """Mark an artifact as just downloaded (drives LRU retention)"""
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE artifacts SET last_accessed_at = ? WHERE storage = ? AND object_name = ?",
+                (datetime.now().isoformat(), storage, object_name)
+            )
+    
+    def total_size(self, storage: str) -> int:
+        """Total bytes of all artifacts in a storage"""
+        row = self._connection().execute(
+            "SELECT COALESCE(SUM(size), 0) FROM artifacts WHERE storage = ?", (storage,)
+        ).fetchone()
+        return row[0]
+    
+    def created_before(self, storage: str, before: datetime, limit: int, artifact_type: Optional[str] = None,
+                       exclude_types: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """Oldest artifacts created before a cutoff, optionally of one type or excluding some types"""
+        query = "SELECT * FROM artifacts WHERE storage = ? AND created_at < ?"
+        params = [storage, before.isoformat()]
+        if artifact_type:
+            query += " AND artifact_type = ?"
+            params.append(artifact_type)
+        exclude_types = list(exclude_types)
+        if exclude_types:
+            query += f" AND artifact_type NOT IN ({', '.join('?' * len(exclude_types))})"
+            params.extend(exclude_types)
+        query += " ORDER BY created_at LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self._connection().execute(query, params)]
+    
+    def least_recently_used(self, storage: str, limit: int) -> List[Dict[str, Any]]:
+        """Artifacts that have gone longest without a download"""
+        return [dict(row) for row in self._connection().execute(
+            "SELECT * FROM artifacts WHERE storage = ? ORDER BY last_accessed_at LIMIT ?",
+            (storage, limit)
+        )]
+    
+    def delete(self, object_names: Iterable[str], storage: str):
+        """Forget artifacts that were deleted from storage"""
+        with self._connection() as conn:
+            conn.executemany(
+                "DELETE FROM artifacts WHERE storage = ? AND object_name = ?",
+                ((storage, name) for name in object_names)
+            )
+    
+    def delete_prefix(self, prefix: str, storage: str):
+        """Forget every artifact under a prefix"""
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM artifacts WHERE storage = ? AND object_name >= ? AND object_name < ?",
+                (storage, prefix, prefix + '\uffff')
+            )
+
+_index: Optional[ArtifactIndex] = None
+_index_lock = threading.Lock()
+
+def get_artifact_index() -> ArtifactIndex:
+    """Return the ArtifactIndex shared by this worker, opening it on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ArtifactIndex()
+    return _index
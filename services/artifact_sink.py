@@ -0,0 +1,215 @@
+import os
+import time
+from abc import ABC, abstractmethod
+import uuid
+from contextlib import suppress
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple
+import aiofiles
+import aiofiles.os
+from config import settings
+from services.artifact_index import DigestWriter, get_artifact_index
+from services.http_ranges import content_disposition
+from services.local_store import LocalDocumentStore
+from services.cancellation import RenderCancelled
+from services.metrics import (
+    RENDER_ERRORS, RENDER_OUTPUT_BYTES, RENDER_STAGE_SECONDS, RENDERS_CANCELLED, RENDERS_IN_FLIGHT, stage
+)
+from services.minio_handler import MinioHandler, get_minio_handler
+from services.render_memory import memory_budget, spooled_buffer
+from services.render_pool import run_render
+from services.tracing import span
+from services.worker_stats import get_worker_stats
+
+# A render writes one complete file into the stream it is given
+Render = Callable[[BinaryIO], Any]
+
+class StoredArtifact:
+    """A generated file after it has been written to a sink"""
+    def __init__(self, storage: str, object_name: str, path: str, filename: str,
+                 size: int, sha256: str, render_ms: float, data: Optional[BinaryIO] = None):
+        self.storage = storage
+        self.object_name = object_name
+        self.path = path
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.render_ms = render_ms
+        self.data = data
+        # Time spent storing the file after (or, for MinIO, beyond) the render itself
+        self.persist_ms = None
+        self.created_at = datetime.now()
+        self.download_url = None
+
+def _render_to_buffer(render: Render) -> Tuple[BinaryIO, int, str]:
+    """Render into a spooled buffer (memory, then disk past RENDER_SPOOL_MAX_BYTES), hashing on the way in"""
+    stream = spooled_buffer()
+    digest = DigestWriter(stream)
+    try:
+        render(digest)
+    except BaseException:
+        stream.close()
+        raise
+    stream.seek(0)
+    return stream, digest.size, digest.sha256
+
+def _render_to_file(render: Render, path: str) -> Tuple[int, str]:
+    """Render straight into a file, hashing on the way in, so the output is never held in memory"""
+    with open(path, 'wb') as f:
+        digest = DigestWriter(f)
+        render(digest)
+    return digest.size, digest.sha256
+
+def artifact_from_record(record: Dict[str, Any]) -> StoredArtifact:
+    """Rebuild a StoredArtifact from its artifact index row"""
+    artifact = StoredArtifact(
+        record["storage"], record["object_name"], record["path"], record["filename"],
+        record["size"], record["sha256"], record["render_ms"]
+    )
+    artifact.created_at = datetime.fromisoformat(record["created_at"])
+    return artifact
+
+class ArtifactSink(ABC):
+    """Destination that creators render generated files into"""
+    storage = None
+    indexed = True
+    
+    @abstractmethod
+    async def write(self, render: Render, object_name: str, filename: str) -> StoredArtifact:
+        """Render one file into this destination"""
+
+class LocalDiskSink(ArtifactSink):
+    """Files under settings.DOCUMENT_LOCATION, written asynchronously and atomically"""
+    storage = "local"
+    
+    def __init__(self, store: Optional[LocalDocumentStore] = None):
+        self.store = store or LocalDocumentStore()
+    
+    async def write(self, render: Render, object_name: str, filename: str) -> StoredArtifact:
+        path = self.store.resolve(object_name)
+        folder_path = os.path.dirname(path)
+        await aiofiles.os.makedirs(folder_path, exist_ok=True)
+        
+        # Render into a temp file next to the target, then rename it into place
+        temp_path = os.path.join(folder_path, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+        try:
+            started = time.perf_counter()
+            size, sha256 = await run_render(_render_to_file, render, temp_path)
+            rendered = time.perf_counter()
+            render_ms = (rendered - started) * 1000
+            await aiofiles.os.replace(temp_path, path)
+        except BaseException:
+            with suppress(OSError):
+                await aiofiles.os.remove(temp_path)
+            raise
+        
+        artifact = StoredArtifact(self.storage, object_name, path, filename, size, sha256, render_ms)
+        artifact.persist_ms = (time.perf_counter() - rendered) * 1000
+        return artifact
+
+class MinioSink(ArtifactSink):
+    """Objects in the MinIO bucket, uploaded in parallel parts while the file renders"""
+    storage = "minio"
+    
+    def __init__(self, minio_handler: Optional[MinioHandler] = None):
+        self.minio_handler = minio_handler or get_minio_handler()
+    
+    async def write(self, render: Render, object_name: str, filename: str) -> StoredArtifact:
+        digests, rendered = [], []
+        
+        def render_with_digest(output):
+            # Size and hash are taken on the way into the upload pipe
+            digest = DigestWriter(output)
+            digests.append(digest)
+            render(digest)
+            rendered.append(time.perf_counter())
+        
+        started = time.perf_counter()
+        await run_render(
+            self.minio_handler.upload_rendered,
+            render_with_digest,
+            object_name,
+            get_content_type(filename),
+            # Presigned downloads keep the friendly filename even though the key is an id
+            {"Content-Disposition": content_disposition(filename)}
+        )
+        finished = time.perf_counter()
+        artifact = StoredArtifact(
+            self.storage, object_name, object_name, filename, digests[0].size, digests[0].sha256,
+            (finished - started) * 1000
+        )
+        # Upload overlaps the render, so only the tail after the last byte was written counts
+        artifact.persist_ms = (finished - rendered[0]) * 1000
+        return artifact
+
+class MemorySink(ArtifactSink):
+    """Keeps the rendered file in a spooled buffer (artifact.data) for callers that send it on themselves"""
+    storage = "memory"
+    indexed = False
+    
+    async def write(self, render: Render, object_name: str, filename: str) -> StoredArtifact:
+        started = time.perf_counter()
+        stream, size, sha256 = await run_render(_render_to_buffer, render)
+        render_ms = (time.perf_counter() - started) * 1000
+        return StoredArtifact(self.storage, object_name, "", filename, size, sha256, render_ms, data=stream)
+
+CONTENT_TYPES = {
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+}
+
+def get_content_type(filename: str) -> str:
+    """Media type for a generated file, based on its extension"""
+    return CONTENT_TYPES.get(os.path.splitext(filename)[1].lower(), 'application/octet-stream')
+
+def resolve_storage(storage: Optional[str]) -> str:
+    """Storage name for a request, falling back to settings.DEFAULT_STORAGE"""
+    return storage or settings.DEFAULT_STORAGE
+
+def get_artifact_sink(storage: Optional[str] = None) -> ArtifactSink:
+    """Sink for a request's storage choice"""
+    storage = resolve_storage(storage)
+    if storage == "minio":
+        return MinioSink()
+    if storage == "memory":
+        return MemorySink()
+    return LocalDiskSink()
+
+async def persist_artifact(sink: ArtifactSink, render: Render, object_name: str, filename: str,
+                           generator: str, request_key: Optional[str] = None) -> StoredArtifact:
+    """Render a file into a sink and record it in the artifact index"""
+    try:
+        with span(f"{generator}.write", storage=sink.storage, object_name=object_name) as write_span, \
+                RENDERS_IN_FLIGHT.track(generator), memory_budget(generator):
+            artifact = await sink.write(render, object_name, filename)
+            if write_span is not None:
+                write_span.set("size", artifact.size)
+                write_span.set("render_ms", artifact.render_ms)
+    except RenderCancelled:
+        RENDERS_CANCELLED.labels(generator).inc()
+        raise
+    except Exception:
+        RENDER_ERRORS.labels(generator).inc()
+        raise
+    RENDER_OUTPUT_BYTES.labels(generator).observe(artifact.size)
+    worker_stats = get_worker_stats()
+    if worker_stats is not None:
+        worker_stats.record_render()
+    if artifact.persist_ms is not None:
+        RENDER_STAGE_SECONDS.labels(generator, "persist").observe(artifact.persist_ms / 1000)
+    if sink.indexed:
+        with stage(generator, "index"):
+            get_artifact_index().record(
+                storage=artifact.storage,
+                object_name=artifact.object_name,
+                path=artifact.path,
+                filename=artifact.filename,
+                generator=generator,
+                size=artifact.size,
+                sha256=artifact.sha256,
+                render_ms=artifact.render_ms,
+                request_hash=request_key,
+                created_at=artifact.created_at
+            )
+    return artifact
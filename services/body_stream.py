@@ -0,0 +1,200 @@
+import asyncio
+import codecs
+import hashlib
+import zlib
+from typing import AsyncIterator, Iterator, Optional
+from fastapi import HTTPException, Request
+from starlette.requests import ClientDisconnect
+from config import settings
+from services.render_memory import spooled_buffer
+
+try:
+    import zstandard
+except ImportError:
+    # zstd-encoded bodies are refused with 415 until zstandard is installed
+    zstandard = None
+
+TEXT_TYPES = {"text/markdown", "text/x-markdown", "text/plain", "text/html"}
+
+def content_encodings() -> list:
+    """Content-Encoding values the raw endpoints accept"""
+    return ["identity", "gzip", "deflate"] + (["zstd"] if zstandard is not None else [])
+
+class _Inflater:
+    """gzip / deflate decompressor that hands out at most INGEST_CHUNK_BYTES per step"""
+    def __init__(self):
+        # 32 + MAX_WBITS detects the gzip or zlib header by itself
+        self._decompressor = zlib.decompressobj(32 + zlib.MAX_WBITS)
+    
+    def decompress(self, data: bytes) -> Iterator[bytes]:
+        while data:
+            if self._decompressor.eof:
+                # Concatenated gzip members, as `cat a.gz b.gz` produces
+                data = self._decompressor.unused_data + data
+                self._decompressor = zlib.decompressobj(32 + zlib.MAX_WBITS)
+            yield self._decompressor.decompress(data, settings.INGEST_CHUNK_BYTES)
+            data = self._decompressor.unconsumed_tail
+    
+    def finish(self) -> Iterator[bytes]:
+        if not self._decompressor.eof:
+            raise HTTPException(status_code=400, detail="Compressed request body is truncated")
+        yield self._decompressor.flush()
+
+class _Unzstd:
+    def __init__(self):
+        self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+    
+    def decompress(self, data: bytes) -> Iterator[bytes]:
+        yield self._decompressor.decompress(data)
+    
+    def finish(self) -> Iterator[bytes]:
+        yield self._decompressor.flush()
+
+class _Identity:
+    def decompress(self, data: bytes) -> Iterator[bytes]:
+        yield data
+    
+    def finish(self) -> Iterator[bytes]:
+        return iter(())
+
+def make_decompressor(encoding: str):
+    """Decompressor for a Content-Encoding header; 415 for encodings this server can't read"""
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return _Identity()
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        return _Inflater()
+    if encoding == "zstd" and zstandard is not None:
+        return _Unzstd()
+    raise HTTPException(
+        status_code=415,
+        detail=f"Unsupported Content-Encoding: {encoding}",
+        headers={"Accept-Encoding": ", ".join(content_encodings())}
+    )
+
+def make_text_decoder(content_type: Optional[str]) -> codecs.IncrementalDecoder:
+    """Incremental decoder for a text/markdown, text/plain or text/html body (UTF-8 unless a charset is given)"""
+    media_type, _, params = (content_type or "text/plain").partition(";")
+    media_type = media_type.strip().lower()
+    if media_type not in TEXT_TYPES:
+        raise HTTPException(status_code=415, detail=f"Expected one of {', '.join(sorted(TEXT_TYPES))}, got {media_type}")
+    charset = "utf-8"
+    for param in params.split(";"):
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset" and value.strip():
+            charset = value.strip().strip('"')
+    try:
+        return codecs.getincrementaldecoder(charset)("strict")
+    except LookupError:
+        raise HTTPException(status_code=415, detail=f"Unsupported charset: {charset}")
+
+class BodyStream:
+    """
+    A raw request body, decompressed and decoded into text chunks as it arrives, for a creator
+    that parses it in a render thread. Each chunk the render thread asks for is read from the
+    connection on the event loop, so a slow parser holds back the upload instead of buffering it.
+    The decoded size and SHA-256 are known once the body has been read to the end.
+    """
+    def __init__(self, request: Request):
+        self._request = request
+        self._loop = asyncio.get_running_loop()
+        self._decompressor = make_decompressor(request.headers.get("content-encoding"))
+        self._decoder = make_text_decoder(request.headers.get("content-type"))
+        self.compressed = not isinstance(self._decompressor, _Identity)
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.done = False
+        self._chunks = self._read()
+        self._spool = None
+    
+    @property
+    def sha256(self) -> str:
+        if not self.done:
+            raise RuntimeError("The request body has not been read to the end yet")
+        return self._hash.hexdigest()
+    
+    def size_hint(self) -> int:
+        """Expected decoded size, for admission weight; compressed bodies are assumed to shrink by INGEST_COMPRESSION_RATIO"""
+        try:
+            length = int(self._request.headers.get("content-length") or 0)
+        except ValueError:
+            length = 0
+        return length * settings.INGEST_COMPRESSION_RATIO if self.compressed else length
+    
+    def _accept(self, data: bytes) -> str:
+        self.size += len(data)
+        if self.size > settings.INGEST_MAX_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Request content is larger than {settings.INGEST_MAX_BYTES / 2 ** 20:.0f} MiB once decompressed"
+            )
+        self._hash.update(data)
+        try:
+            return self._decoder.decode(data)
+        except UnicodeDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Request body is not valid text: {e}")
+    
+    async def _read(self) -> AsyncIterator[str]:
+        try:
+            async for raw in self._request.stream():
+                for data in self._decompressor.decompress(raw):
+                    text = self._accept(data)
+                    if text:
+                        yield text
+        except ClientDisconnect:
+            raise HTTPException(status_code=400, detail="Client disconnected before the request body was complete")
+        except zlib.error as e:
+            raise HTTPException(status_code=400, detail=f"Request body could not be decompressed: {e}")
+        except Exception as e:
+            if zstandard is not None and isinstance(e, zstandard.ZstdError):
+                raise HTTPException(status_code=400, detail=f"Request body could not be decompressed: {e}")
+            raise
+        tail = "".join(self._accept(data) for data in self._decompressor.finish())
+        try:
+            tail += self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Request body is not valid text: {e}")
+        self.done = True
+        if tail:
+            yield tail
+    
+    async def _next_chunk(self) -> Optional[str]:
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+    
+    def __iter__(self) -> Iterator[str]:
+        """Text chunks for the render thread; must not be called from the event loop"""
+        if self._spool is not None:
+            yield from self._iter_spool()
+            return
+        while True:
+            chunk = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result()
+            if chunk is None:
+                return
+            yield chunk
+    
+    async def spool(self):
+        """Read the whole body into a spooled buffer now (so its hash is known) and iterate from there later"""
+        self._spool = spooled_buffer()
+        async for text in self._chunks:
+            self._spool.write(text.encode("utf-8"))
+        self._spool.seek(0)
+    
+    async def drain(self):
+        """Read whatever the creator left unread, so size and hash cover the whole body"""
+        async for _ in self._chunks:
+            pass
+    
+    def _iter_spool(self) -> Iterator[str]:
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        try:
+            while True:
+                data = self._spool.read(settings.INGEST_CHUNK_BYTES)
+                if not data:
+                    break
+                yield decoder.decode(data)
+            yield decoder.decode(b"", final=True)
+        finally:
+            self._spool.close()
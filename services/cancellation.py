@@ -0,0 +1,173 @@
+import asyncio
+import contextvars
+import threading
+from contextlib import asynccontextmanager, contextmanager, suppress
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, List, Optional
+from fastapi import HTTPException, Request
+from config import settings
+
+class RenderCancelled(HTTPException):
+    """The render was stopped because nobody is waiting for its result any more"""
+    def __init__(self, reason: Optional[str], where: str = ""):
+        self.reason = reason
+        self.where = where
+        # 499: client closed request (nginx); the client will not see it, logs and metrics will
+        super().__init__(
+            status_code=499,
+            detail=f"Render cancelled{f' during {where}' if where else ''}: {reason or 'cancelled'}"
+        )
+
+class CancelToken:
+    """
+    Cancellation flag shared by a request handler and the render threads working for it.
+    Render loops poll it at their checkpoints; blocking calls (a running SQL statement)
+    register a callback that interrupts them. Callbacks run in the thread that cancels.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], Any]] = []
+        self.reason: Optional[str] = None
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+    
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Cancellation callback failed: {e}")
+    
+    def on_cancel(self, callback: Callable[[], Any]) -> Callable[[], None]:
+        """Call `callback` once cancelled (at once if already cancelled); returns a function that unregisters it"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                
+                def remove():
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+                return remove
+        callback()
+        return lambda: None
+    
+    def raise_if_cancelled(self, where: str = ""):
+        if self._event.is_set():
+            raise RenderCancelled(self.reason, where)
+    
+    async def wait(self):
+        """Wait on the event loop until the token is cancelled"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        def wake():
+            loop.call_soon_threadsafe(lambda: None if future.done() else future.set_result(None))
+        remove = self.on_cancel(wake)
+        try:
+            await future
+        finally:
+            remove()
+
+class SharedCancelToken(CancelToken):
+    """
+    Token of one render that several requests wait on (single-flight): cancelled only once
+    every request that joined it has been cancelled. A request without a token of its own
+    keeps the render alive.
+    """
+    def __init__(self):
+        super().__init__()
+        self._members = 0
+        self._pinned = False
+    
+    def join(self, token: Optional[CancelToken]) -> Callable[[], None]:
+        """Add a waiting request; returns a function to call once it stops waiting"""
+        with self._lock:
+            self._members += 1
+            if token is None:
+                self._pinned = True
+        if token is None:
+            return lambda: None
+        
+        def leave():
+            with self._lock:
+                self._members -= 1
+                abandoned = self._members == 0 and not self._pinned
+            if abandoned:
+                self.cancel(token.reason or "every waiting client disconnected")
+        return token.on_cancel(leave)
+
+_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar("cancel_token", default=None)
+
+def current_token() -> Optional[CancelToken]:
+    return _token.get()
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]) -> Iterator[Optional[CancelToken]]:
+    """Make `token` the one renders started in this block (and the threads they use) check"""
+    reset = _token.set(token)
+    try:
+        yield token
+    finally:
+        _token.reset(reset)
+
+def raise_if_cancelled(where: str = ""):
+    """Raise RenderCancelled if the current request was cancelled"""
+    token = _token.get()
+    if token is not None:
+        token.raise_if_cancelled(where)
+
+async def cancellable(awaitable: Awaitable[Any]) -> Any:
+    """Await `awaitable`, giving up with RenderCancelled as soon as the current request is cancelled"""
+    token = _token.get()
+    if token is None:
+        return await awaitable
+    token.raise_if_cancelled()
+    task = asyncio.ensure_future(awaitable)
+    waiter = asyncio.ensure_future(token.wait())
+    try:
+        await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        waiter.cancel()
+        if not task.done():
+            task.cancel()
+    if task.done() and not task.cancelled():
+        return task.result()
+    # Let the awaited code clean up (e.g. leave the admission queue) before giving up
+    with suppress(asyncio.CancelledError):
+        await task
+    raise RenderCancelled(token.reason)
+
+@asynccontextmanager
+async def watch_disconnect(request: Request) -> AsyncIterator[Optional[CancelToken]]:
+    """
+    Cancel the renders started in this block once the client disconnects. Render threads
+    and tasks inherit the token, which is checked at their checkpoints; a SQL statement
+    still running is killed on the database server.
+    """
+    if not settings.CANCEL_ON_DISCONNECT:
+        yield None
+        return
+    token = CancelToken()
+    
+    async def watch():
+        while not token.cancelled:
+            await asyncio.sleep(settings.DISCONNECT_POLL_MS / 1000)
+            # Until the body is read, receive() hands out body chunks that must not be swallowed here
+            if getattr(request, "_stream_consumed", True) and await request.is_disconnected():
+                token.cancel("client disconnected")
+    
+    watcher = asyncio.ensure_future(watch())
+    try:
+        with cancel_scope(token):
+            yield token
+    finally:
+        watcher.cancel()
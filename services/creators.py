@@ -0,0 +1,39 @@
+import importlib
+import threading
+from typing import Any, Dict, Set
+from fastapi import HTTPException
+from config import settings
+
+# Format -> (module, class); modules are imported on first use so workers only load what they serve
+CREATORS = {
+    "document": ("services.docx.docx_creator", "DocxCreator"),
+    "excel": ("services.excel.excel_creator", "ExcelCreator"),
+    "presentation": ("services.powerpoint.ppt_creator", "PresentationCreator"),
+    "sql": ("services.SQL.sql_to_excel", "SQLToExcelService"),
+}
+
+_creators: Dict[str, Any] = {}
+_creators_lock = threading.Lock()
+
+def enabled_formats() -> Set[str]:
+    """Formats this deployment serves, from settings.ENABLED_FORMATS"""
+    formats = {fmt.strip() for fmt in settings.ENABLED_FORMATS.split(',') if fmt.strip()}
+    return {fmt for fmt in CREATORS if fmt in formats}
+
+def is_loaded(fmt: str) -> bool:
+    """Whether a format's creator (and its dependencies) has been imported yet"""
+    return fmt in _creators
+
+def get_creator(fmt: str):
+    """Return this worker's creator for a format, importing it on first use"""
+    creator = _creators.get(fmt)
+    if creator is not None:
+        return creator
+    if fmt not in enabled_formats():
+        raise HTTPException(status_code=404, detail=f"Format '{fmt}' is not enabled on this server")
+    with _creators_lock:
+        creator = _creators.get(fmt)
+        if creator is None:
+            module_name, class_name = CREATORS[fmt]
+            creator = _creators[fmt] = getattr(importlib.import_module(module_name), class_name)()
+    return creator
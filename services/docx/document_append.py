@@ -0,0 +1,68 @@
+"""
+Appending to a generated Word document without loading it into python-docx.
+
+Only the appended content is rendered with python-docx, into a document of its own built from
+the same template. Its body is spliced into word/document.xml in front of the closing section
+properties; every other part of the original file is copied as its compressed bytes.
+"""
+import io
+import re
+from typing import BinaryIO
+from docx import Document
+from fastapi import HTTPException
+from services.metrics import stage
+from services.ooxml_package import PackageReader, PackageWriter, find_insertion, spliced_chunks
+
+DOCUMENT_PART = "word/document.xml"
+
+def _body_end(data: bytes):
+    """Where new body content goes: before the body-level sectPr, or before </w:body>"""
+    body_end = data.rfind(b"</w:body>")
+    if body_end < 0:
+        return None
+    section = data.rfind(b"<w:sectPr", 0, body_end)
+    # Section properties inside a paragraph end a section mid-body; only a sectPr right before </w:body> closes it
+    if section >= 0 and re.fullmatch(rb'<w:sectPr\b(?:[^>]*/>|.*</w:sectPr>)\s*', data[section:body_end], re.S):
+        return section
+    return body_end
+
+def _body_content(document: bytes) -> bytes:
+    """The paragraphs and tables of a rendered document, without its section properties"""
+    start = document.index(b">", document.index(b"<w:body")) + 1
+    return document[start:_body_end(document)]
+
+def append_to_document(creator, source: BinaryIO, content: str, output: BinaryIO):
+    """Append `content` (the markdown generate-document takes) to the end of the document in `source`"""
+    reader = PackageReader(source)
+    try:
+        if DOCUMENT_PART not in reader.names:
+            raise HTTPException(status_code=422, detail="The artifact is not a Word document")
+        
+        with stage("document", "build"):
+            # Styles and numbering come from the default template, which the target was built from too
+            doc = Document()
+            creator.parse_and_format_content(doc, content)
+            buffer = io.BytesIO()
+            doc.save(buffer)
+            delta = PackageReader(buffer)
+            body = _body_content(delta.read(DOCUMENT_PART))
+            
+            part = reader.extract(DOCUMENT_PART)
+            position = find_insertion(part, _body_end)
+            if position is None:
+                part.close()
+                raise HTTPException(status_code=422, detail=f"{DOCUMENT_PART} has no body")
+        
+        with stage("document", "serialize"):
+            try:
+                writer = PackageWriter(output)
+                for info in reader.infos:
+                    if info.filename == DOCUMENT_PART:
+                        writer.write_stream(DOCUMENT_PART, spliced_chunks(part, position, body))
+                    else:
+                        writer.copy(reader, info)
+                writer.close()
+            finally:
+                part.close()
+    finally:
+        reader.close()
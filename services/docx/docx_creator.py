@@ -6,28 +6,66 @@ from docx.oxml import OxmlElement
 from docx.table import _Cell
 import re
 from datetime import datetime
-from io import BytesIO
+from typing import BinaryIO, Iterable, Union
 from config import settings
+from services.storage_layout import build_object_name
+from services.metrics import RENDER_INPUT_BYTES, stage
+from services.render_memory import checkpoint, spooled_buffer
+from services.line_reader import LineReader
+from services.docx.document_append import append_to_document
 
 class DocxCreator:
     def __init__(self):
         self.default_font_name = settings.DEFAULT_FONT_NAME
         self.default_font_size = settings.DEFAULT_FONT_SIZE
     
-    def create_document(self, content: str, filename: str = None) -> BytesIO:
-        """Create a Word document from string content and return as BytesIO"""
-        # Create document
-        doc = Document()
+    def create_document(self, content: Union[str, Iterable[str]], filename: str = None, output: BinaryIO = None) -> BinaryIO:
+        """
+        Create a Word document from string content (or text chunks still arriving) and return it
+        in a spooled buffer, or write it into `output`
+        """
+        if isinstance(content, str):
+            # Streamed bodies are measured by the endpoint that reads them
+            RENDER_INPUT_BYTES.labels("document").observe(len(content))
+        
+        # Parsing the markdown and building the document happen in one pass
+        with stage("document", "build"):
+            # Create document
+            doc = Document()
+            
+            # Parse and add content
+            self.parse_and_format_content(doc, content)
+            
+            # Add page numbers
+            self.add_page_number(doc)
+        
+        # Stream straight into the caller's output (file, pipe, upload) when given
+        if output is not None:
+            with stage("document", "serialize"):
+                doc.save(output)
+            return output
         
-        # Parse and add content
-        self.parse_and_format_content(doc, content)
+        # Save to a buffer that moves to a temp file once it gets large
+        doc_stream = spooled_buffer()
+        with stage("document", "serialize"):
+            doc.save(doc_stream)
+        doc_stream.seek(0)
         
-        # Add page numbers
-        self.add_page_number(doc)
+        return doc_stream
+    
+    def append_to_document(self, source: BinaryIO, content: str, output: BinaryIO = None) -> BinaryIO:
+        """
+        Append content to the end of the document in `source` (a seekable file) and return the
+        result in a spooled buffer, or write it into `output`. Only the appended content is built
+        with python-docx.
+        """
+        RENDER_INPUT_BYTES.labels("document").observe(len(content))
+        if output is not None:
+            append_to_document(self, source, content, output)
+            return output
         
-        # Save to BytesIO instead of file
-        doc_stream = BytesIO()
-        doc.save(doc_stream)
+        doc_stream = spooled_buffer()
+        append_to_document(self, source, content, doc_stream)
         doc_stream.seek(0)
         
         return doc_stream
@@ -41,9 +79,8 @@ class DocxCreator:
         return filename
     
     def generate_object_name(self, filename: str) -> str:
-        """Generate MinIO object name with date-based folder structure"""
-        today = datetime.now()
-        return f"{today.strftime('%Y')}/{today.strftime('%m')}/{today.strftime('%d')}/{filename}"
+        """Generate a unique, sharded object name under the date-based folder structure"""
+        return build_object_name(filename)
     
     def add_page_number(self, doc):
         """Add page numbers to document footer"""
@@ -121,6 +158,7 @@ class DocxCreator:
         
         # Add data rows
         for row_data in data_rows:
+            checkpoint("build")
             row_cells = table.add_row().cells
             for i, cell_data in enumerate(row_data):
                 if i < len(row_cells):
@@ -162,15 +200,14 @@ class DocxCreator:
         [SIZE:16]Text with custom size[/SIZE]
         |Header1|Header2| for tables
         """
-        lines = content.split('\n')
-        i = 0
+        lines = LineReader(content)
         
-        while i < len(lines):
-            line = lines[i].strip()
+        for line in lines:
+            checkpoint("build")
+            line = line.strip()
             
             if not line:
                 doc.add_paragraph()
-                i += 1
                 continue
             
             # Extract font settings for this paragraph
@@ -184,15 +221,12 @@ class DocxCreator:
             if clean_line.startswith('|') and '|' in clean_line[1:]:
                 # Collect all table lines
                 table_lines = [line]
-                j = i + 1
-                while j < len(lines) and lines[j].strip().startswith('|'):
-                    table_lines.append(lines[j].strip())
-                    j += 1
+                while lines.peek() is not None and lines.peek().strip().startswith('|'):
+                    table_lines.append(next(lines).strip())
                 
                 # Create table
                 table_content = '\n'.join(table_lines)
                 self.create_table_from_markdown(doc, table_content, current_font_name, current_font_size)
-                i = j
                 continue
             
             # Handle headings
@@ -233,8 +267,6 @@ class DocxCreator:
             else:
                 para = doc.add_paragraph()
                 self.process_inline_formatting(para, clean_line, current_font_name, current_font_size)
-            
-            i += 1
     
     def process_inline_formatting(self, para, text, default_font, default_size):
         """Process inline formatting like bold, italic, custom fonts and sizes"""
@@ -3,8 +3,13 @@ from openpyxl.styles import Font, Border, Side, Alignment, PatternFill
 from openpyxl.utils import get_column_letter
 import re
 from datetime import datetime
-from io import BytesIO
+from typing import BinaryIO, Iterable, Union
 from config import settings
+from services.storage_layout import build_object_name
+from services.metrics import RENDER_INPUT_BYTES, stage
+from services.render_memory import checkpoint, spooled_buffer
+from services.line_reader import LineReader
+from services.excel.workbook_append import append_to_workbook
 import os
 
 class ExcelCreator:
@@ -12,26 +17,58 @@ class ExcelCreator:
         self.default_font_name = settings.DEFAULT_FONT_NAME
         self.default_font_size = settings.DEFAULT_FONT_SIZE
     
-    def create_excel_from_content(self, content: str, filename: str = None) -> BytesIO:
-        """Create an Excel workbook from string content and return as BytesIO"""
-        # Create workbook
-        wb = Workbook()
-        
-        # Remove default sheet
-        if 'Sheet' in wb.sheetnames:
-            wb.remove(wb.active)
+    def create_excel_from_content(self, content: Union[str, Iterable[str]], filename: str = None, output: BinaryIO = None) -> BinaryIO:
+        """
+        Create an Excel workbook from string content (or text chunks still arriving) and return it
+        in a spooled buffer, or write it into `output`
+        """
+        if isinstance(content, str):
+            # Streamed bodies are measured by the endpoint that reads them
+            RENDER_INPUT_BYTES.labels("excel").observe(len(content))
+        
+        # Parsing the content and filling the sheets happen in one pass
+        with stage("excel", "build"):
+            # Create workbook
+            wb = Workbook()
+            
+            # Remove default sheet
+            if 'Sheet' in wb.sheetnames:
+                wb.remove(wb.active)
+            
+            # Parse content and create sheets
+            self.parse_and_format_content(wb, content)
+        
+        # Stream straight into the caller's output (file, pipe, upload) when given
+        if output is not None:
+            with stage("excel", "serialize"):
+                wb.save(output)
+            return output
+        
+        # Save to a buffer that moves to a temp file once it gets large
+        excel_stream = spooled_buffer()
+        with stage("excel", "serialize"):
+            wb.save(excel_stream)
+        excel_stream.seek(0)
         
-        # Parse content and create sheets
-        self.parse_and_format_content(wb, content)
+        return excel_stream
+    
+    def append_to_workbook(self, source: BinaryIO, content: str, output: BinaryIO = None) -> BinaryIO:
+        """
+        Append content to the workbook in `source` (a seekable file) and return the result in a
+        spooled buffer, or write it into `output`. Only the appended content is built with openpyxl.
+        """
+        RENDER_INPUT_BYTES.labels("excel").observe(len(content))
+        if output is not None:
+            append_to_workbook(self, source, content, output)
+            return output
         
-        # Save to BytesIO
-        excel_stream = BytesIO()
-        wb.save(excel_stream)
+        excel_stream = spooled_buffer()
+        append_to_workbook(self, source, content, excel_stream)
         excel_stream.seek(0)
         
         return excel_stream
     
-    def parse_and_format_content(self, wb, content):
+    def parse_and_format_content(self, wb, content, default_sheet: str = "Sheet1"):
         """
         Parse content string and create Excel sheets
         Supports:
@@ -44,41 +81,37 @@ class ExcelCreator:
         [BORDER]Text with border[/BORDER]
         [COLOR:RRGGBB]Colored text[/COLOR]
         [ALIGN:left|center|right]Aligned text[/ALIGN]
+        Lines before the first sheet heading go to `default_sheet`.
         """
-        lines = content.split('\n')
-        i = 0
+        lines = LineReader(content)
         current_ws = None
         
-        while i < len(lines):
-            line = lines[i].strip()
+        for line in lines:
+            checkpoint("build")
+            line = line.strip()
             
             if not line:
-                i += 1
                 continue
             
             # Check if this is a sheet name (starts with #)
             if line.startswith('#'):
                 sheet_name = line.replace('#', '').strip()
                 current_ws = wb.create_sheet(title=sheet_name)
-                i += 1
                 continue
             
             # If no sheet has been created yet, create a default one
             if current_ws is None:
-                current_ws = wb.create_sheet(title="Sheet1")
+                current_ws = wb.create_sheet(title=default_sheet)
             
             # Check if this is a table
             if line.startswith('|') and '|' in line[1:]:
                 # Collect all table lines
                 table_lines = [line]
-                j = i + 1
-                while j < len(lines) and lines[j].strip().startswith('|'):
-                    table_lines.append(lines[j].strip())
-                    j += 1
+                while lines.peek() is not None and lines.peek().strip().startswith('|'):
+                    table_lines.append(next(lines).strip())
                 
                 # Create table
                 self.create_table_from_markdown(current_ws, table_lines)
-                i = j
                 continue
             
             # Handle regular text
@@ -91,8 +124,6 @@ class ExcelCreator:
                 row = current_ws.max_row + 1
                 cell = current_ws.cell(row=row, column=1)
                 self.process_cell_formatting(cell, line)
-            
-            i += 1
     
     def create_table_from_markdown(self, ws, table_lines):
         """
@@ -130,6 +161,7 @@ class ExcelCreator:
         
         # Add data rows
         for row_idx, row_data in enumerate(data_rows):
+            checkpoint("build")
             for col_idx, cell_data in enumerate(row_data):
                 cell = ws.cell(row=start_row + row_idx + 1, column=col_idx+1)
                 self.process_cell_formatting(cell, cell_data)
@@ -209,6 +241,5 @@ class ExcelCreator:
         return filename
     
     def generate_object_name(self, filename: str) -> str:
-        """Generate MinIO object name with date-based folder structure"""
-        today = datetime.now()
-        return f"{today.strftime('%Y')}/{today.strftime('%m')}/{today.strftime('%d')}/{filename}"
\ No newline at end of file
+        """Generate a unique, sharded object name under the date-based folder structure"""
+        return build_object_name(filename)
\ No newline at end of file
@@ -0,0 +1,272 @@
+"""
+Appending to a generated workbook without loading it into openpyxl.
+
+Only the appended content is rendered with openpyxl, into a small workbook of its own. Its rows
+are spliced into the existing worksheet XML (or become new worksheet parts) and its cell styles
+are merged into styles.xml. Every other part of the original file is copied as its compressed
+bytes, so the work grows with the appended data, not with the size of the workbook.
+"""
+import copy
+import io
+import posixpath
+import re
+from typing import BinaryIO, Callable, Dict, List, Tuple
+from fastapi import HTTPException
+from lxml import etree
+from openpyxl import Workbook
+from openpyxl.utils import column_index_from_string, get_column_letter
+from services.metrics import stage
+from services.ooxml_package import PackageReader, PackageWriter, find_insertion, find_last, spliced_chunks
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+WORKSHEET_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+
+WORKBOOK_PART = "xl/workbook.xml"
+WORKBOOK_RELS_PART = "xl/_rels/workbook.xml.rels"
+STYLES_PART = "xl/styles.xml"
+CONTENT_TYPES_PART = "[Content_Types].xml"
+
+_ROW_NUMBER = re.compile(rb'<row\b[^>]*?\sr="(\d+)"')
+_DIMENSION = re.compile(rb'<dimension ref="([A-Z]+\d+)(?::([A-Z]+)(\d+))?"\s*/>')
+_CELL_REF = re.compile(r'([A-Z]+)(\d+)')
+
+def _q(tag: str, namespace: str = MAIN_NS) -> str:
+    return f"{{{namespace}}}{tag}"
+
+def _xml(element: etree._Element) -> bytes:
+    return etree.tostring(element, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+def worksheet_parts(reader: PackageReader) -> List[Tuple[str, str]]:
+    """(sheet name, part name) of every worksheet, in workbook order"""
+    if WORKBOOK_PART not in reader.names or WORKBOOK_RELS_PART not in reader.names:
+        raise HTTPException(status_code=422, detail="The artifact is not an Excel workbook")
+    targets = {}
+    for relationship in etree.fromstring(reader.read(WORKBOOK_RELS_PART)):
+        target = relationship.get("Target")
+        targets[relationship.get("Id")] = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+    return [
+        (sheet.get("name"), targets[sheet.get(_q("id", REL_NS))])
+        for sheet in etree.fromstring(reader.read(WORKBOOK_PART)).find(_q("sheets"))
+    ]
+
+def merge_styles(target: bytes, delta: bytes) -> Tuple[bytes, Dict[int, int]]:
+    """
+    Add the cell formats of the appended workbook to the target's styles.xml, reusing identical
+    fonts, fills, borders, number formats and formats. Returns the new styles.xml and the index
+    each appended cell format has in it.
+    """
+    target_root, delta_root = etree.fromstring(target), etree.fromstring(delta)
+    id_maps = {}
+    for collection in ("fonts", "fills", "borders"):
+        target_items, delta_items = target_root.find(_q(collection)), delta_root.find(_q(collection))
+        known = {etree.tostring(item): index for index, item in enumerate(target_items)}
+        id_maps[collection] = mapping = {}
+        for index, item in enumerate(delta_items if delta_items is not None else ()):
+            key = etree.tostring(item)
+            if key not in known:
+                target_items.append(copy.deepcopy(item))
+                known[key] = len(target_items) - 1
+            mapping[index] = known[key]
+        target_items.set("count", str(len(target_items)))
+    
+    # Built-in number formats (below 164) mean the same everywhere; custom ones are matched by code
+    number_formats = target_root.find(_q("numFmts"))
+    if number_formats is None:
+        number_formats = etree.Element(_q("numFmts"))
+        target_root.insert(0, number_formats)
+    known_codes = {item.get("formatCode"): int(item.get("numFmtId")) for item in number_formats}
+    id_maps["numFmts"] = number_format_map = {}
+    delta_formats = delta_root.find(_q("numFmts"))
+    for item in delta_formats if delta_formats is not None else ():
+        code = item.get("formatCode")
+        if code not in known_codes:
+            known_codes[code] = max([163, *known_codes.values()]) + 1
+            etree.SubElement(number_formats, _q("numFmt"), numFmtId=str(known_codes[code]), formatCode=code)
+        number_format_map[int(item.get("numFmtId"))] = known_codes[code]
+    number_formats.set("count", str(len(number_formats)))
+    
+    target_formats = target_root.find(_q("cellXfs"))
+    known = {etree.tostring(item): index for index, item in enumerate(target_formats)}
+    format_map = {}
+    for index, item in enumerate(delta_root.find(_q("cellXfs"))):
+        item = copy.deepcopy(item)
+        for attribute, collection in (("fontId", "fonts"), ("fillId", "fills"), ("borderId", "borders"), ("numFmtId", "numFmts")):
+            if item.get(attribute) is not None:
+                value = int(item.get(attribute))
+                item.set(attribute, str(id_maps[collection].get(value, value)))
+        key = etree.tostring(item)
+        if key not in known:
+            target_formats.append(item)
+            known[key] = len(target_formats) - 1
+        format_map[index] = known[key]
+    target_formats.set("count", str(len(target_formats)))
+    return _xml(target_root), format_map
+
+def _restyle(worksheet: etree._Element, format_map: Dict[int, int], shared_strings: List[etree._Element]):
+    """Point an appended worksheet's cells at the merged styles and inline its shared strings"""
+    for element in worksheet.iter(_q("c"), _q("row")):
+        if element.get("s") is not None:
+            element.set("s", str(format_map.get(int(element.get("s")), 0)))
+    for column in worksheet.iter(_q("col")):
+        if column.get("style") is not None:
+            column.set("style", str(format_map.get(int(column.get("style")), 0)))
+    for cell in worksheet.iter(_q("c")):
+        if cell.get("t") == "s":
+            # The target's sharedStrings.xml stays untouched; appended text is stored inline
+            value = cell.find(_q("v"))
+            inline = etree.SubElement(cell, _q("is"))
+            inline.extend(copy.deepcopy(child) for child in shared_strings[int(value.text)])
+            cell.remove(value)
+            cell.set("t", "inlineStr")
+
+def _shift_rows(sheet_data: etree._Element, offset: int) -> Tuple[int, int]:
+    """Move appended rows below the existing ones; returns the last row and column they use"""
+    last_row, last_column = 0, 0
+    for row in sheet_data:
+        number = int(row.get("r")) + offset
+        row.set("r", str(number))
+        # Spans are an optional hint and would no longer describe the row
+        row.attrib.pop("spans", None)
+        for cell in row:
+            column = _CELL_REF.match(cell.get("r")).group(1)
+            cell.set("r", f"{column}{number}")
+            last_column = max(last_column, column_index_from_string(column))
+        last_row = max(last_row, number)
+    return last_row, last_column
+
+def _rows_xml(sheet_data: etree._Element) -> bytes:
+    """The <row> elements of a sheetData, without repeating the namespace on each"""
+    serialized = etree.tostring(sheet_data)
+    if serialized.endswith(b"/>"):
+        return b""
+    return serialized[serialized.index(b">") + 1:serialized.rindex(b"</")]
+
+def _sheet_data_end(data: bytes):
+    position = data.rfind(b"</sheetData>")
+    if position >= 0:
+        return position
+    position = data.rfind(b"<sheetData/>")
+    return position if position >= 0 else None
+
+def _append_rows(reader: PackageReader, part_name: str, sheet_data: etree._Element) -> Callable[[PackageWriter], None]:
+    """Writer of an existing worksheet with the appended rows after its last row"""
+    part = reader.extract(part_name)
+    position = find_insertion(part, _sheet_data_end)
+    if position is None:
+        part.close()
+        raise HTTPException(status_code=422, detail=f"Worksheet {part_name} has no sheetData")
+    part.seek(position)
+    empty = part.read(len(b"<sheetData/>")) == b"<sheetData/>"
+    last_row = int(find_last(part, _ROW_NUMBER, position) or 0)
+    new_last_row, new_last_column = _shift_rows(sheet_data, last_row)
+    rows = _rows_xml(sheet_data)
+    
+    def rewrite_dimension(head: bytes) -> bytes:
+        def widen(match):
+            last_column = max(column_index_from_string(match.group(2).decode()) if match.group(2) else 1, new_last_column)
+            return b'<dimension ref="%s:%s%d"/>' % (match.group(1), get_column_letter(last_column).encode(), new_last_row)
+        return _DIMENSION.sub(widen, head, count=1)
+    
+    def write(writer: PackageWriter):
+        try:
+            if empty:
+                chunks = spliced_chunks(part, position, b"<sheetData>" + rows + b"</sheetData>",
+                                        replace=len(b"<sheetData/>"), rewrite_head=rewrite_dimension)
+            else:
+                chunks = spliced_chunks(part, position, rows, rewrite_head=rewrite_dimension)
+            writer.write_stream(part_name, chunks)
+        finally:
+            part.close()
+    return write
+
+def _unique(prefix: str, taken, start: int = 1) -> str:
+    number = start
+    while f"{prefix}{number}" in taken:
+        number += 1
+    return f"{prefix}{number}"
+
+def append_to_workbook(creator, source: BinaryIO, content: str, output: BinaryIO):
+    """
+    Append `content` (the markdown generate-excel takes) to the workbook in `source` and write
+    the result into `output`. Sections under a "# Sheet" heading that names an existing sheet
+    are added below its last row, other sections become new sheets, and lines before the first
+    heading go to the last sheet.
+    """
+    reader = PackageReader(source)
+    try:
+        sheets = worksheet_parts(reader)
+        sheet_parts = dict(sheets)
+        
+        with stage("excel", "build"):
+            workbook = Workbook()
+            workbook.remove(workbook.active)
+            creator.parse_and_format_content(workbook, content, default_sheet=sheets[-1][0] if sheets else "Sheet1")
+            buffer = io.BytesIO()
+            workbook.save(buffer)
+            delta = PackageReader(buffer)
+            styles, format_map = merge_styles(reader.read(STYLES_PART), delta.read(STYLES_PART))
+            shared_strings = []
+            if "xl/sharedStrings.xml" in delta.names:
+                shared_strings = list(etree.fromstring(delta.read("xl/sharedStrings.xml")))
+            
+            rewritten: Dict[str, Callable[[PackageWriter], None]] = {
+                STYLES_PART: lambda writer: writer.write(STYLES_PART, styles)
+            }
+            new_sheets = []
+            for name, delta_part in worksheet_parts(delta):
+                worksheet = etree.fromstring(delta.read(delta_part))
+                sheet_data = worksheet.find(_q("sheetData"))
+                if not len(sheet_data):
+                    continue
+                _restyle(worksheet, format_map, shared_strings)
+                if name in sheet_parts:
+                    rewritten[sheet_parts[name]] = _append_rows(reader, sheet_parts[name], sheet_data)
+                else:
+                    new_sheets.append((name, _xml(worksheet)))
+            
+            if new_sheets:
+                workbook_root = etree.fromstring(reader.read(WORKBOOK_PART))
+                relationships = etree.fromstring(reader.read(WORKBOOK_RELS_PART))
+                content_types = etree.fromstring(reader.read(CONTENT_TYPES_PART))
+                sheets_element = workbook_root.find(_q("sheets"))
+                sheet_id = max([0, *(int(sheet.get("sheetId")) for sheet in sheets_element)])
+                relationship_ids = {relationship.get("Id") for relationship in relationships}
+                part_names = set(reader.names)
+                for name, data in new_sheets:
+                    sheet_id += 1
+                    part_name = _unique("xl/worksheets/sheet", {part[:-len(".xml")] for part in part_names if part.endswith(".xml")}) + ".xml"
+                    relationship_id = _unique("rId", relationship_ids)
+                    part_names.add(part_name)
+                    relationship_ids.add(relationship_id)
+                    etree.SubElement(sheets_element, _q("sheet"), {
+                        "name": name, "sheetId": str(sheet_id), _q("id", REL_NS): relationship_id
+                    })
+                    etree.SubElement(relationships, _q("Relationship", PACKAGE_REL_NS), {
+                        "Type": f"{REL_NS}/worksheet", "Target": f"/{part_name}", "Id": relationship_id
+                    })
+                    etree.SubElement(content_types, _q("Override", CONTENT_TYPES_NS), {
+                        "PartName": f"/{part_name}", "ContentType": WORKSHEET_CONTENT_TYPE
+                    })
+                    rewritten[part_name] = (lambda part_name, data: lambda writer: writer.write(part_name, data))(part_name, data)
+                # docProps/app.xml keeps listing the original sheets; Excel does not rely on it
+                for part_name, root in ((WORKBOOK_PART, workbook_root), (WORKBOOK_RELS_PART, relationships),
+                                        (CONTENT_TYPES_PART, content_types)):
+                    rewritten[part_name] = (lambda part_name, data: lambda writer: writer.write(part_name, data))(part_name, _xml(root))
+        
+        with stage("excel", "serialize"):
+            writer = PackageWriter(output)
+            for info in reader.infos:
+                write = rewritten.pop(info.filename, None)
+                if write is not None:
+                    write(writer)
+                else:
+                    writer.copy(reader, info)
+            # New worksheet parts
+            for write in rewritten.values():
+                write(writer)
+            writer.close()
+    finally:
+        reader.close()
@@ -0,0 +1,117 @@
+from email.utils import format_datetime, formatdate, parsedate_to_datetime
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from urllib.parse import quote
+from fastapi import HTTPException
+
+def quote_etag(etag: str) -> str:
+    """Return the ETag in its quoted header form"""
+    etag = etag.strip()
+    if etag.startswith('W/') or etag.startswith('"'):
+        return etag
+    return f'"{etag}"'
+
+def http_date(value: datetime) -> str:
+    """Format a datetime as an HTTP date header value"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+def file_validators(stat_result: os.stat_result) -> Tuple[str, str]:
+    """ETag and Last-Modified for a local file, computed the same way as Starlette's FileResponse"""
+    etag_base = f"{stat_result.st_mtime}-{stat_result.st_size}"
+    etag = f'"{hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()}"'
+    return etag, formatdate(stat_result.st_mtime, usegmt=True)
+
+def content_disposition(filename: str) -> str:
+    """Attachment Content-Disposition header value, RFC 5987 encoded when needed"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match / If-Range header against an ETag"""
+    if header.strip() == '*':
+        return True
+    opaque = quote_etag(etag).removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == opaque for tag in header.split(','))
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def is_not_modified(headers, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Whether a conditional GET can be answered with 304 Not Modified"""
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        return _etag_matches(if_none_match, etag)
+    
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since and last_modified is not None:
+        since = _parse_http_date(if_modified_since)
+        if since is not None:
+            modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+            return modified.replace(microsecond=0) <= since
+    return False
+
+def if_range_allows(headers, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Whether a Range header should be honoured given an optional If-Range validator"""
+    if_range = headers.get('if-range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        # Strong comparison only: a weak ETag never satisfies If-Range
+        return not if_range.startswith('W/') and if_range == quote_etag(etag)
+    since = _parse_http_date(if_range)
+    if since is None or last_modified is None:
+        return False
+    modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+    return modified.replace(microsecond=0) == since
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single byte range (bytes=start-end, bytes=start-, bytes=-suffix)
+    into an inclusive (start, end) pair. Returns None when the whole body should
+    be sent and raises 416 when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        # Unknown units and multipart ranges fall back to the full body
+        return None
+    
+    start_text, sep, end_text = spec.strip().partition('-')
+    try:
+        if not sep:
+            return None
+        if start_text == '':
+            suffix = int(end_text)
+            if suffix < 0:
+                raise ValueError
+            # A zero-length suffix selects nothing and is unsatisfiable
+            start, end = max(size - suffix, 0), size - 1 if suffix else -1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+            if start < 0 or (end_text and end < start):
+                # Syntactically invalid (RFC 7233 2.1): ignore the header
+                return None
+            end = min(end, size - 1)
+    except ValueError:
+        return None
+    
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={'Content-Range': f'bytes */{size}'}
+        )
+    return start, end
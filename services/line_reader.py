@@ -0,0 +1,47 @@
+from typing import Iterable, Iterator, Optional, Union
+
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Lines of text arriving in arbitrary chunks, split exactly like str.split('\\n')"""
+    # Pieces of the line still being read; joined once its newline arrives, so a long line
+    # spread over many chunks is copied once rather than once per chunk
+    pending = []
+    for chunk in chunks:
+        if '\n' not in chunk:
+            if chunk:
+                pending.append(chunk)
+            continue
+        parts = chunk.split('\n')
+        pending.append(parts[0])
+        parts[0] = "".join(pending)
+        pending = [parts.pop()]
+        yield from parts
+    yield "".join(pending)
+
+class LineReader:
+    """
+    Lines of the content a creator parses, from a string or from a stream of text chunks
+    (a request body still arriving), with one line of lookahead for multi-line blocks like tables
+    """
+    _EMPTY = object()
+    
+    def __init__(self, content: Union[str, Iterable[str]]):
+        self._lines = iter(content.split('\n')) if isinstance(content, str) else iter_lines(content)
+        self._peeked = self._EMPTY
+    
+    def __iter__(self) -> "LineReader":
+        return self
+    
+    def __next__(self) -> str:
+        if self._peeked is not self._EMPTY:
+            line, self._peeked = self._peeked, self._EMPTY
+            if line is None:
+                # peek() already ran into the end
+                raise StopIteration
+            return line
+        return next(self._lines)
+    
+    def peek(self) -> Optional[str]:
+        """The next line without consuming it, or None at the end"""
+        if self._peeked is self._EMPTY:
+            self._peeked = next(self._lines, None)
+        return self._peeked
@@ -0,0 +1,66 @@
+from fastapi import HTTPException
+from typing import List, Dict, Any, Tuple
+import os
+from config import settings
+
+class LocalDocumentStore:
+    """Documents saved on local disk under settings.DOCUMENT_LOCATION, addressed by YYYY/MM/DD/... object names"""
+    def __init__(self, root: str = None):
+        self.root = os.path.abspath(root or settings.DOCUMENT_LOCATION)
+    
+    def resolve(self, object_name: str) -> str:
+        """Map an object name to a path inside the store, rejecting anything that escapes it"""
+        path = os.path.abspath(os.path.join(self.root, object_name))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            raise HTTPException(status_code=400, detail=f"Invalid object name: {object_name}")
+        return path
+    
+    def to_object_name(self, path: str) -> str:
+        """Object name (forward slashes, relative to the store) for a path inside the store"""
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+    
+    def iter_object_names(self, prefix: str = ""):
+        """Yield object names under a prefix, only walking the directory the prefix points into"""
+        head = prefix.rsplit('/', 1)[0] if '/' in prefix else ''
+        start = self.resolve(head)
+        for dirpath, _, filenames in os.walk(start):
+            for name in filenames:
+                object_name = self.to_object_name(os.path.join(dirpath, name))
+                if object_name.startswith(prefix):
+                    yield object_name
+    
+    def delete_documents(self, object_names: List[str]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Delete files by object name, returning the number deleted and per-object errors"""
+        deleted = 0
+        errors = []
+        touched_dirs = set()
+        for object_name in object_names:
+            try:
+                path = self.resolve(object_name)
+                os.remove(path)
+                touched_dirs.add(os.path.dirname(path))
+                deleted += 1
+            except HTTPException as e:
+                errors.append({"object_name": object_name, "error": e.detail})
+            except FileNotFoundError:
+                errors.append({"object_name": object_name, "error": "File not found"})
+            except OSError as e:
+                errors.append({"object_name": object_name, "error": str(e)})
+        
+        self.prune_empty_dirs(touched_dirs)
+        return deleted, errors
+    
+    def delete_prefix(self, prefix: str) -> Tuple[int, List[Dict[str, Any]]]:
+        """Delete every file whose object name starts with `prefix`"""
+        return self.delete_documents(list(self.iter_object_names(prefix)))
+    
+    def prune_empty_dirs(self, dirs):
+        """Remove date folders left empty after a delete, deepest first"""
+        for path in sorted(dirs, key=len, reverse=True):
+            while path.startswith(self.root + os.sep):
+                try:
+                    os.rmdir(path)
+                except OSError:
+                    # Not empty (or already gone)
+                    break
+                path = os.path.dirname(path)
@@ -0,0 +1,190 @@
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+from services.tracing import span
+
+# Latency buckets in seconds, from fast markdown renders to large SQL exports
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Size buckets in bytes, 1 KiB to 256 MiB in powers of four
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(10))
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class _Metric(ABC):
+    """Base for a metric family: one child per distinct label-value tuple"""
+    type = None
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+    
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+    
+    @abstractmethod
+    def _new_child(self):
+        """A fresh child for one label-value tuple"""
+    
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._samples(values, child))
+        return lines
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+    
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+    
+    def set(self, value: float):
+        self.value = value
+
+class Counter(_Metric):
+    type = "counter"
+    
+    def _new_child(self):
+        return _Value()
+    
+    def _samples(self, values, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+class Gauge(Counter):
+    type = "gauge"
+    
+    @contextmanager
+    def track(self, *values: str) -> Iterator[None]:
+        """Count something as in progress for the duration of the block"""
+        child = self.labels(*values)
+        child.inc()
+        try:
+            yield
+        finally:
+            child.dec()
+
+class _HistogramValue:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+class Histogram(_Metric):
+    type = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+    
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+    
+    @contextmanager
+    def time(self, *values: str) -> Iterator[None]:
+        """Observe the duration of the block in seconds"""
+        child = self.labels(*values)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            child.observe(time.perf_counter() - started)
+    
+    def _samples(self, values, child) -> List[str]:
+        lines, cumulative = [], 0
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+REGISTRY: List[_Metric] = []
+
+RENDER_STAGE_SECONDS = Histogram(
+    "forjinn_render_stage_seconds",
+    "Time spent in each pipeline stage of a generator (parse, build, images, serialize, persist, query, fetch)",
+    ["generator", "stage"]
+)
+RENDER_INPUT_BYTES = Histogram(
+    "forjinn_render_input_bytes", "Size of the content or query a render started from",
+    ["generator"], SIZE_BUCKETS
+)
+RENDER_OUTPUT_BYTES = Histogram(
+    "forjinn_render_output_bytes", "Size of the generated file", ["generator"], SIZE_BUCKETS
+)
+RENDERS_IN_FLIGHT = Gauge("forjinn_renders_in_flight", "Renders currently running", ["generator"])
+RENDER_ERRORS = Counter("forjinn_render_errors_total", "Renders that raised instead of producing a file", ["generator"])
+RENDERS_CANCELLED = Counter(
+    "forjinn_renders_cancelled_total", "Renders stopped because the client waiting on them disconnected", ["generator"]
+)
+RENDER_BUDGET_EXCEEDED = Counter(
+    "forjinn_render_memory_budget_exceeded_total", "Renders stopped for exceeding their memory budget", ["generator"]
+)
+SQL_ROWS = Histogram(
+    "forjinn_sql_rows", "Rows returned by SQL exports", [], (10, 100, 1000, 10000, 100000, 1000000)
+)
+MINIO_REQUEST_SECONDS = Histogram(
+    "forjinn_minio_request_seconds", "MinIO HTTP request latency up to the response headers", ["method"]
+)
+CACHE_LOOKUPS = Counter(
+    "forjinn_cache_lookups_total", "Lookups in in-process caches and request coalescing", ["cache", "result"]
+)
+ADMISSION_DECISIONS = Counter(
+    "forjinn_admission_decisions_total", "Admission control outcomes per endpoint", ["endpoint", "outcome"]
+)
+ADMISSION_IN_USE = Gauge("forjinn_admission_in_use", "Capacity units held by running renders", ["endpoint"])
+ADMISSION_QUEUED = Gauge("forjinn_admission_queued", "Requests waiting for render capacity", ["endpoint"])
+
+@contextmanager
+def stage(generator: str, name: str) -> Iterator[None]:
+    """Time one pipeline stage of a generator, also as a trace span when the request is traced"""
+    with span(f"{generator}.{name}", generator=generator, stage=name), RENDER_STAGE_SECONDS.time(generator, name):
+        yield
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
@@ -1,35 +1,154 @@
 from minio import Minio
 from minio.error import S3Error
+from minio.deleteobjects import DeleteObject
 from fastapi import HTTPException
 from io import BytesIO
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable, BinaryIO, Iterator, Iterable, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import contextvars
+import itertools
+import os
+import threading
+import time
 import uuid
+import certifi
+import urllib3
 from config import settings
+from services.metrics import MINIO_REQUEST_SECONDS
+from services.tracing import span
+
+# S3 multi-object delete accepts at most 1000 keys per request
+MAX_DELETE_BATCH = 1000
+
+def _batched(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Group an iterable into lists of at most `size` items"""
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+class _TimedPoolManager(urllib3.PoolManager):
+    """Connection pool that records the latency of every MinIO request by HTTP method"""
+    def urlopen(self, method, url, *args, **kwargs):
+        with span(f"minio {method}", "client", **{"http.method": method, "http.url": url.split('?')[0]}) as request_span, \
+                MINIO_REQUEST_SECONDS.time(method):
+            response = super().urlopen(method, url, *args, **kwargs)
+            if request_span is not None:
+                request_span.set("http.status_code", response.status)
+            return response
+
+def build_http_client() -> urllib3.PoolManager:
+    """Build the connection pool shared by every MinIO call in this worker"""
+    return _TimedPoolManager(
+        timeout=urllib3.util.Timeout(
+            connect=settings.MINIO_CONNECT_TIMEOUT,
+            read=settings.MINIO_READ_TIMEOUT
+        ),
+        maxsize=settings.MINIO_POOL_MAXSIZE,
+        cert_reqs='CERT_REQUIRED',
+        ca_certs=os.environ.get('SSL_CERT_FILE') or certifi.where(),
+        retries=urllib3.Retry(
+            total=3,
+            backoff_factor=0.2,
+            status_forcelist=[500, 502, 503, 504]
+        )
+    )
+
+class _RenderPipeReader:
+    """Read end of a render pipe that fails the upload instead of storing a truncated object"""
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.error = None
+    
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        # A buffered pipe read only comes back short at EOF, and the render records its error before closing
+        if self.error is not None and (size is None or size < 0 or len(data) < size):
+            raise IOError(f"Render failed before the upload completed: {self.error}")
+        return data
+    
+    def close(self):
+        self.stream.close()
 
 class MinioHandler:
-    def __init__(self):
-        self.client = Minio(
+    def __init__(self, client: Optional[Minio] = None):
+        # A client can be injected to point the handler at a local S3-compatible stand-in
+        self.client = client or Minio(
             endpoint=settings.MINIO_ENDPOINT,
             access_key=settings.MINIO_ACCESS_KEY,
             secret_key=settings.MINIO_SECRET_KEY,
-            secure=settings.MINIO_SECURE
+            secure=settings.MINIO_SECURE,
+            # A known region skips the GetBucketLocation lookup on the first call
+            region=settings.MINIO_REGION or None,
+            http_client=build_http_client()
         )
         self.bucket_name = settings.MINIO_BUCKET_NAME
-        self._ensure_bucket_exists()
+        self._bucket_lock = threading.Lock()
+        self._bucket_verified_at = None
+        self._stop_revalidation = threading.Event()
+        self._revalidation_thread = None
     
-    def _ensure_bucket_exists(self):
-        """Create bucket if it doesn't exist"""
-        try:
-            if not self.client.bucket_exists(self.bucket_name):
-                self.client.make_bucket(self.bucket_name)
-                print(f"Bucket '{self.bucket_name}' created successfully")
-        except S3Error as e:
-            print(f"Error creating bucket: {e}")
-            raise HTTPException(status_code=500, detail=f"Error connecting to MinIO: {e}")
+    def _ensure_bucket_exists(self, force: bool = False):
+        """Create bucket if it doesn't exist, checking the server only until it succeeds once"""
+        if self._bucket_verified_at is not None and not force:
+            return
+        
+        with self._bucket_lock:
+            if self._bucket_verified_at is not None and not force:
+                return
+            try:
+                if not self.client.bucket_exists(self.bucket_name):
+                    self.client.make_bucket(self.bucket_name)
+                    print(f"Bucket '{self.bucket_name}' created successfully")
+                self._bucket_verified_at = time.monotonic()
+            except S3Error as e:
+                self._bucket_verified_at = None
+                print(f"Error creating bucket: {e}")
+                raise HTTPException(status_code=500, detail=f"Error connecting to MinIO: {e}")
+    
+    def verify_bucket(self):
+        """Check (or create) the bucket now, opening a pooled connection to MinIO"""
+        self._ensure_bucket_exists(force=True)
+    
+    def start_bucket_revalidation(self, interval: Optional[int] = None):
+        """Verify the bucket in a background thread now and then every `interval` seconds"""
+        interval = settings.MINIO_BUCKET_REVALIDATE_SECONDS if interval is None else interval
+        if self._revalidation_thread is not None:
+            return
+        
+        # Each thread gets its own stop event, so a restart never revives a thread being stopped
+        stop = threading.Event()
+        
+        def revalidate():
+            while True:
+                try:
+                    self._ensure_bucket_exists(force=True)
+                except Exception as e:
+                    # The next request will verify the bucket again
+                    print(f"Bucket revalidation failed: {e}")
+                if interval <= 0 or stop.wait(interval):
+                    break
+        
+        self._stop_revalidation = stop
+        self._revalidation_thread = threading.Thread(
+            target=revalidate, name="minio-bucket-revalidation", daemon=True
+        )
+        self._revalidation_thread.start()
+    
+    def stop_bucket_revalidation(self):
+        """Stop the background bucket revalidation thread, waiting briefly for a check in progress"""
+        self._stop_revalidation.set()
+        thread, self._revalidation_thread = self._revalidation_thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
     
     def upload_document(self, file_stream: BytesIO, object_name: str, content_type: str = "application/vnd.openxmlformats-officedocument.wordprocessingml.document") -> str:
         """Upload a document to MinIO and return the object name"""
+        self._ensure_bucket_exists()
+        
         try:
             # Reset stream position
             file_stream.seek(0)
@@ -48,8 +167,68 @@ class MinioHandler:
             print(f"Error uploading file: {e}")
             raise HTTPException(status_code=500, detail=f"Error uploading file: {e}")
     
+    def upload_stream(self, stream, object_name: str, content_type: str, length: int = -1,
+                      metadata: Optional[Dict[str, str]] = None) -> str:
+        """Upload from any readable stream, using parallel multipart uploads when the size is unknown or large"""
+        self._ensure_bucket_exists()
+        
+        try:
+            self.client.put_object(
+                bucket_name=self.bucket_name,
+                object_name=object_name,
+                data=stream,
+                length=length,
+                content_type=content_type,
+                metadata=metadata,
+                part_size=settings.MINIO_PART_SIZE,
+                num_parallel_uploads=settings.MINIO_PARALLEL_UPLOADS
+            )
+            return object_name
+        except S3Error as e:
+            print(f"Error uploading file: {e}")
+            raise HTTPException(status_code=500, detail=f"Error uploading file: {e}")
+    
+    def upload_rendered(self, render: Callable[[BinaryIO], Any], object_name: str, content_type: str,
+                        metadata: Optional[Dict[str, str]] = None) -> str:
+        """
+        Upload the output of `render(stream)` while it is still being produced.
+        The render runs in its own thread and writes into a pipe that the upload reads from,
+        so parts are sent as soon as they are filled instead of after the whole file exists.
+        """
+        read_fd, write_fd = os.pipe()
+        reader = _RenderPipeReader(os.fdopen(read_fd, 'rb'))
+        writer = os.fdopen(write_fd, 'wb')
+        
+        def produce():
+            try:
+                render(writer)
+            except BaseException as e:
+                reader.error = e
+            finally:
+                try:
+                    writer.close()
+                except OSError:
+                    # The upload side already went away
+                    pass
+        
+        # The render keeps the caller's context (trace spans, profiling) in its own thread
+        producer = threading.Thread(
+            target=contextvars.copy_context().run, args=(produce,), name=f"render-pipe:{object_name}", daemon=True
+        )
+        producer.start()
+        try:
+            return self.upload_stream(reader, object_name, content_type, metadata=metadata)
+        finally:
+            # Closing the read end unblocks the render if the upload failed part way
+            reader.close()
+            producer.join()
+            if reader.error is not None and not isinstance(reader.error, BrokenPipeError):
+                raise reader.error
+    
     def download_document(self, object_name: str) -> BytesIO:
         """Download a document from MinIO"""
+        self._ensure_bucket_exists()
+        
         try:
             # Get object from MinIO
             response = self.client.get_object(self.bucket_name, object_name)
@@ -64,13 +243,43 @@ class MinioHandler:
             print(f"Error downloading file: {e}")
             raise HTTPException(status_code=404, detail=f"File not found: {e}")
     
-    def get_presigned_url(self, object_name: str, expires: timedelta = timedelta(days=7)) -> str:
+    def stat_document(self, object_name: str):
+        """Fetch size, ETag, content type and modification time of a document"""
+        try:
+            return self.client.stat_object(self.bucket_name, object_name)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject", "NoSuchBucket"):
+                raise HTTPException(status_code=404, detail=f"File not found: {object_name}")
+            print(f"Error reading file metadata: {e}")
+            raise HTTPException(status_code=500, detail=f"Error reading file metadata: {e}")
+    
+    def stream_document(self, object_name: str, offset: int = 0, length: int = 0) -> Iterator[bytes]:
+        """
+        Open a (ranged) GET for a document and return an iterator over its body in chunks,
+        so serving it never holds more than one chunk in memory
+        """
+        try:
+            response = self.client.get_object(self.bucket_name, object_name, offset=offset, length=length)
+        except S3Error as e:
+            print(f"Error downloading file: {e}")
+            raise HTTPException(status_code=404, detail=f"File not found: {e}")
+        
+        def iter_chunks():
+            try:
+                yield from response.stream(settings.MINIO_DOWNLOAD_CHUNK_SIZE)
+            finally:
+                response.close()
+                response.release_conn()
+        
+        return iter_chunks()
+    
+    def get_presigned_url(self, object_name: str, expires: Optional[timedelta] = None) -> str:
         """Generate a presigned URL for downloading a document"""
         try:
             url = self.client.presigned_get_object(
                 bucket_name=self.bucket_name,
                 object_name=object_name,
-                expires=expires
+                expires=expires or timedelta(hours=settings.MINIO_PRESIGNED_EXPIRY_HOURS)
             )
             return url
         except S3Error as e:
@@ -79,6 +288,8 @@ class MinioHandler:
     
     def list_documents(self, prefix: str = "") -> List[Dict[str, Any]]:
         """List all documents in the bucket, optionally filtered by prefix"""
+        self._ensure_bucket_exists()
+        
         try:
             objects = self.client.list_objects(self.bucket_name, prefix=prefix, recursive=True)
             
@@ -100,9 +311,85 @@ class MinioHandler:
     
     def delete_document(self, object_name: str) -> bool:
         """Delete a document from MinIO"""
+        self._ensure_bucket_exists()
+        
         try:
             self.client.remove_object(self.bucket_name, object_name)
             return True
         except S3Error as e:
             print(f"Error deleting file: {e}")
-            raise HTTPException(status_code=500, detail=f"Error deleting file: {e}")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=f"Error deleting file: {e}")
+    
+    def delete_documents(self, object_names: Iterable[str]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Delete many documents with batched multi-object deletes, several batches in flight at once.
+        Returns the number deleted and per-object errors.
+        """
+        self._ensure_bucket_exists()
+        
+        def remove_batch(batch):
+            errors = [
+                {"object_name": error.name, "error": f"{error.code}: {error.message}"}
+                for error in self.client.remove_objects(
+                    self.bucket_name, [DeleteObject(name) for name in batch]
+                )
+            ]
+            return len(batch) - len(errors), errors
+        
+        deleted = 0
+        errors = []
+        
+        def collect(done):
+            nonlocal deleted
+            for future in done:
+                batch_deleted, batch_errors = future.result()
+                deleted += batch_deleted
+                errors.extend(batch_errors)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=settings.MINIO_DELETE_CONCURRENCY) as pool:
+                # At most MINIO_DELETE_CONCURRENCY batches are out at once, so a prefix listing is
+                # consumed only as fast as its objects are deleted
+                pending = set()
+                for batch in _batched(object_names, MAX_DELETE_BATCH):
+                    if len(pending) >= settings.MINIO_DELETE_CONCURRENCY:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(pool.submit(remove_batch, batch))
+                collect(wait(pending)[0])
+        except S3Error as e:
+            print(f"Error deleting files: {e}")
+            raise HTTPException(status_code=500, detail=f"Error deleting files: {e}")
+        
+        return deleted, errors
+    
+    def delete_prefix(self, prefix: str) -> Tuple[int, List[Dict[str, Any]]]:
+        """Delete every document whose name starts with `prefix`"""
+        self._ensure_bucket_exists()
+        
+        try:
+            objects = self.client.list_objects(self.bucket_name, prefix=prefix, recursive=True)
+            return self.delete_documents(obj.object_name for obj in objects)
+        except S3Error as e:
+            print(f"Error listing documents: {e}")
+            raise HTTPException(status_code=500, detail=f"Error listing documents: {e}")
+
+_handler: Optional[MinioHandler] = None
+_handler_lock = threading.Lock()
+
+def get_minio_handler() -> MinioHandler:
+    """Return the MinioHandler shared by this worker, creating it on first use"""
+    global _handler
+    if _handler is None:
+        with _handler_lock:
+            if _handler is None:
+                _handler = MinioHandler()
+    return _handler
+
+def set_minio_handler(handler: Optional[MinioHandler]):
+    """Replace the shared MinioHandler, e.g. with one bound to a local stand-in"""
+    global _handler
+    with _handler_lock:
+        if _handler is not None and _handler is not handler:
+            _handler.stop_bucket_revalidation()
+        _handler = handler
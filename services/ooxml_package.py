@@ -0,0 +1,188 @@
+import re
+import shutil
+import struct
+import time
+import zipfile
+import zlib
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
+from fastapi import HTTPException
+from services.render_memory import checkpoint, spooled_buffer
+
+COPY_CHUNK_BYTES = 1024 * 1024
+# Where an insertion point is looked for first: the end of a part (</sheetData>, the body's sectPr)
+TAIL_WINDOW_BYTES = 1024 * 1024
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_OF_CENTRAL_DIRECTORY = struct.Struct("<IHHHHIIH")
+_ZIP32_LIMIT = 0xFFFFFFFF
+
+class PackageReader:
+    """
+    An Office file (zip package) opened for copy-through editing: parts can be read decompressed,
+    or copied into a PackageWriter as their original compressed bytes without being inflated
+    """
+    def __init__(self, source: BinaryIO):
+        self.source = source
+        try:
+            self.zip = zipfile.ZipFile(source)
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=422, detail="The artifact is not a valid Office file")
+        self.infos = self.zip.infolist()
+        self.names = {info.filename for info in self.infos}
+    
+    def read(self, name: str) -> bytes:
+        """A small part (workbook, styles, relationships) read whole"""
+        return self.zip.read(name)
+    
+    def extract(self, name: str) -> BinaryIO:
+        """A possibly large part decompressed into a spooled buffer, for splicing"""
+        part = spooled_buffer()
+        with self.zip.open(name) as stream:
+            shutil.copyfileobj(stream, part, COPY_CHUNK_BYTES)
+        part.seek(0)
+        return part
+    
+    def raw_chunks(self, info: zipfile.ZipInfo) -> Iterator[bytes]:
+        """The stored (compressed) bytes of one part"""
+        self.source.seek(info.header_offset)
+        header = self.source.read(_LOCAL_HEADER.size)
+        name_length, extra_length = _LOCAL_HEADER.unpack(header)[-2:]
+        self.source.seek(name_length + extra_length, 1)
+        remaining = info.compress_size
+        while remaining:
+            data = self.source.read(min(COPY_CHUNK_BYTES, remaining))
+            if not data:
+                raise HTTPException(status_code=422, detail=f"The artifact is truncated in {info.filename}")
+            remaining -= len(data)
+            yield data
+    
+    def close(self):
+        self.zip.close()
+
+def _dos_time(date_time: Tuple[int, ...]) -> Tuple[int, int]:
+    year, month, day, hour, minute, second = date_time[:6]
+    return (hour << 11) | (minute << 5) | (second // 2), ((max(year, 1980) - 1980) << 9) | (month << 5) | day
+
+class PackageWriter:
+    """
+    Writes a zip package front to back into an unseekable output (a render pipe or upload).
+    Parts copied from a PackageReader keep their compressed bytes and CRC, so the cost of an
+    unchanged part is a plain byte copy; rewritten parts are deflated once on the way out.
+    """
+    def __init__(self, output: BinaryIO):
+        self.output = output
+        self.offset = 0
+        self._entries: List[tuple] = []
+    
+    def _write(self, data: bytes):
+        self.output.write(data)
+        self.offset += len(data)
+    
+    def _add(self, name: str, method: int, date_time: Tuple[int, ...], crc: int, compressed_size: int,
+             size: int, chunks: Iterable[bytes]):
+        if max(self.offset, compressed_size, size) > _ZIP32_LIMIT:
+            raise HTTPException(status_code=413, detail="The artifact is too large to append to")
+        encoded = name.encode("utf-8")
+        # Bit 11: the name is UTF-8
+        flags = 0x800
+        dos_time, dos_date = _dos_time(date_time)
+        entry = (encoded, flags, method, dos_time, dos_date, crc, compressed_size, size, self.offset)
+        self._write(_LOCAL_HEADER.pack(
+            0x04034B50, 20, flags, method, dos_time, dos_date, crc, compressed_size, size, len(encoded), 0
+        ))
+        self._write(encoded)
+        for chunk in chunks:
+            self._write(chunk)
+            checkpoint("serialize")
+        self._entries.append(entry)
+    
+    def copy(self, reader: PackageReader, info: zipfile.ZipInfo):
+        """Copy a part unchanged, without decompressing it"""
+        self._add(info.filename, info.compress_type, info.date_time, info.CRC, info.compress_size,
+                  info.file_size, reader.raw_chunks(info))
+    
+    def write(self, name: str, data: bytes):
+        """Add a rewritten part held in memory"""
+        self.write_stream(name, [data])
+    
+    def write_stream(self, name: str, chunks: Iterable[bytes]):
+        """Add a rewritten part from chunks; it is deflated into a spooled buffer first so its sizes are known"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed = spooled_buffer()
+        crc, size = 0, 0
+        try:
+            for chunk in chunks:
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                compressed.write(compressor.compress(chunk))
+            compressed.write(compressor.flush())
+            compressed_size = compressed.tell()
+            compressed.seek(0)
+            self._add(name, zipfile.ZIP_DEFLATED, time.localtime()[:6], crc, compressed_size, size,
+                      iter(lambda: compressed.read(COPY_CHUNK_BYTES), b""))
+        finally:
+            compressed.close()
+    
+    def close(self):
+        """Write the central directory"""
+        start = self.offset
+        for encoded, flags, method, dos_time, dos_date, crc, compressed_size, size, offset in self._entries:
+            self._write(_CENTRAL_HEADER.pack(
+                0x02014B50, 20, 20, flags, method, dos_time, dos_date, crc, compressed_size, size,
+                len(encoded), 0, 0, 0, 0, 0, offset
+            ))
+            self._write(encoded)
+        if self.offset > _ZIP32_LIMIT or len(self._entries) > 0xFFFF:
+            raise HTTPException(status_code=413, detail="The artifact is too large to append to")
+        self._write(_END_OF_CENTRAL_DIRECTORY.pack(
+            0x06054B50, 0, 0, len(self._entries), len(self._entries), self.offset - start, start, 0
+        ))
+
+def find_insertion(part: BinaryIO, finder: Callable[[bytes], Optional[int]]) -> Optional[int]:
+    """
+    Offset in a decompressed part where `finder` places new content, looking at the part's
+    tail first and only reading the whole part if the tail does not contain it
+    """
+    size = part.seek(0, 2)
+    start = max(0, size - TAIL_WINDOW_BYTES)
+    while True:
+        part.seek(start)
+        position = finder(part.read())
+        if position is not None:
+            return start + position
+        if start == 0:
+            return None
+        start = 0
+
+def find_last(part: BinaryIO, pattern: "re.Pattern[bytes]", end: int) -> Optional[bytes]:
+    """First group of the last match of `pattern` before `end` in a decompressed part, searching the tail first"""
+    start = max(0, end - TAIL_WINDOW_BYTES)
+    while True:
+        part.seek(start)
+        match = None
+        for match in pattern.finditer(part.read(end - start)):
+            pass
+        if match is not None:
+            return match.group(1)
+        if start == 0:
+            return None
+        start = 0
+
+def spliced_chunks(part: BinaryIO, position: int, insert: bytes, replace: int = 0,
+                   rewrite_head: Optional[Callable[[bytes], bytes]] = None, head_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    A decompressed part with `insert` placed at `position` (in place of the `replace` bytes there)
+    and its first bytes optionally rewritten
+    """
+    part.seek(0)
+    head = part.read(min(head_bytes, position))
+    yield rewrite_head(head) if rewrite_head else head
+    remaining = position - len(head)
+    while remaining:
+        data = part.read(min(COPY_CHUNK_BYTES, remaining))
+        remaining -= len(data)
+        yield data
+    yield insert
+    part.seek(position + replace)
+    yield from iter(lambda: part.read(COPY_CHUNK_BYTES), b"")
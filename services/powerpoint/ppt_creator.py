@@ -5,9 +5,17 @@ from pptx.dml.color import RGBColor
 from bs4 import BeautifulSoup
 import re
 import requests
+import threading
+import time
 from io import BytesIO
+from typing import BinaryIO, Iterable, Union
 from datetime import datetime
 from config import settings
+from services.storage_layout import build_object_name
+from services.metrics import CACHE_LOOKUPS, RENDER_INPUT_BYTES, stage
+from services.powerpoint.slide_cache import SlideCache, SlideFragment, get_slide_cache
+from services.render_memory import checkpoint, spooled_buffer
+from services.tracing import inject, span
 import os
 
 class PresentationCreator:
@@ -16,9 +24,21 @@ class PresentationCreator:
         self.default_font_size = settings.DEFAULT_FONT_SIZE
         self.slide_width = Inches(10)  # Standard 16:9 aspect ratio
         self.slide_height = Inches(5.625)
+        # Per render thread: images that failed to load on the slide being built
+        self._slide_state = threading.local()
     
-    def create_presentation(self, content: str, filename: str = None) -> BytesIO:
-        """Create a PowerPoint presentation from HTML content and return as BytesIO"""
+    def create_presentation(self, content: Union[str, Iterable[str]], filename: str = None, output: BinaryIO = None) -> BinaryIO:
+        """
+        Create a PowerPoint presentation from HTML content (or text chunks still arriving) and return it
+        in a spooled buffer, or write it into `output`
+        """
+        if isinstance(content, str):
+            # Streamed bodies are measured by the endpoint that reads them
+            RENDER_INPUT_BYTES.labels("presentation").observe(len(content))
+        else:
+            # html.parser needs the whole document, so a streamed body is joined once it has arrived
+            content = "".join(content)
+        
         # Create presentation
         prs = Presentation()
         
@@ -26,26 +46,58 @@ class PresentationCreator:
         prs.slide_width = self.slide_width
         prs.slide_height = self.slide_height
         
-        # Parse HTML content
-        soup = BeautifulSoup(content, 'html.parser')
+        with stage("presentation", "parse"):
+            # Parse HTML content
+            soup = BeautifulSoup(content, 'html.parser')
+            
+            # Extract slides
+            slides = soup.find_all('div', class_='slide')
         
-        # Extract slides
-        slides = soup.find_all('div', class_='slide')
+        # Includes the "images" stage, which is also reported on its own
+        with stage("presentation", "build"):
+            slide_cache = get_slide_cache()
+            # If no slides found, treat the entire content as one slide
+            for slide_soup in slides or [soup]:
+                checkpoint("build")
+                self.build_slide(prs, slide_soup, slide_cache)
         
-        # If no slides found, treat the entire content as one slide
-        if not slides:
-            self.create_slide_from_content(prs, soup)
-        else:
-            for slide_soup in slides:
-                self.create_slide_from_content(prs, slide_soup)
+        # Stream straight into the caller's output (file, pipe, upload) when given
+        if output is not None:
+            with stage("presentation", "serialize"):
+                prs.save(output)
+            return output
         
-        # Save to BytesIO
-        prs_stream = BytesIO()
-        prs.save(prs_stream)
+        # Save to a buffer that moves to a temp file once it gets large
+        prs_stream = spooled_buffer()
+        with stage("presentation", "serialize"):
+            prs.save(prs_stream)
         prs_stream.seek(0)
         
         return prs_stream
     
+    def build_slide(self, prs, slide_soup, slide_cache: SlideCache):
+        """Add a slide for one slide's HTML, reusing the slide rendered for the same HTML recently"""
+        if not slide_cache.enabled:
+            self.create_slide_from_content(prs, slide_soup)
+            return
+        
+        key = slide_cache.key(
+            str(slide_soup), self.default_font_name, self.default_font_size, self.slide_width, self.slide_height
+        )
+        fragment = slide_cache.get(key)
+        CACHE_LOOKUPS.labels("slide", "miss" if fragment is None else "hit").inc()
+        if fragment is not None:
+            fragment.restore(prs, prs.slide_layouts[1])
+            return
+        
+        self._slide_state.image_errors = 0
+        slide = self.create_slide_from_content(prs, slide_soup)
+        # A slide missing an image that failed to load is built again next time instead of cached
+        if not self._slide_state.image_errors:
+            fragment = SlideFragment.capture(slide)
+            if fragment is not None:
+                slide_cache.put(key, fragment)
+    
     def create_slide_from_content(self, prs, slide_soup):
         """Create a slide from parsed HTML content"""
         # Add a slide
@@ -72,11 +124,13 @@ class PresentationCreator:
                 p = paragraph._p
                 p.getparent().remove(p)
             
-            # Process remaining content
-            self.process_content(slide_soup, content_placeholder.text_frame)
+            # Process remaining content (tables and images still need the slide itself)
+            self.process_content(slide_soup, content_placeholder.text_frame, slide)
         else:
             # If no placeholder, add content directly to slide
             self.process_content(slide_soup, None, slide)
+        
+        return slide
     
     def process_content(self, soup, text_frame=None, slide=None):
         """Process HTML content and add to slide"""
@@ -85,6 +139,7 @@ class PresentationCreator:
         
         # Process each element
         for element in soup.children:
+            checkpoint("build")
             if hasattr(element, 'name'):
                 tag_name = element.name.lower()
                 
@@ -211,8 +266,9 @@ class PresentationCreator:
         try:
             # If it's a URL, download the image
             if src.startswith('http'):
-                response = requests.get(src)
-                img_data = BytesIO(response.content)
+                with stage("presentation", "images"), span("http GET", "client", **{"http.url": src}) as request_span:
+                    content = self.fetch_image(src, request_span)
+                img_data = BytesIO(content)
             else:
                 # If it's a local path, open the file
                 img_data = src
@@ -238,6 +294,28 @@ class PresentationCreator:
             slide.shapes.add_picture(img_data, left, top, width=img_width, height=img_height)
         except Exception as e:
             print(f"Error adding image: {e}")
+            self._slide_state.image_errors = getattr(self._slide_state, "image_errors", 0) + 1
+    
+    def fetch_image(self, src: str, request_span=None) -> bytes:
+        """
+        Download a remote image, giving up after IMAGE_FETCH_TIMEOUT_SECONDS so a slow host
+        cannot hold the render (and its admission capacity) indefinitely
+        """
+        timeout = settings.IMAGE_FETCH_TIMEOUT_SECONDS
+        deadline = time.monotonic() + timeout
+        with requests.get(src, headers=inject({}), timeout=timeout, stream=True) as response:
+            if request_span is not None:
+                request_span.set("http.status_code", response.status_code)
+            content = bytearray()
+            # The read timeout only bounds each read; a host trickling bytes is cut off here.
+            # read1 returns whatever has arrived instead of waiting for a full chunk
+            while chunk := response.raw.read1(64 * 1024, decode_content=True):
+                content += chunk
+                if time.monotonic() > deadline:
+                    raise requests.Timeout(f"Image download took longer than {timeout:g}s: {src}")
+        if request_span is not None:
+            request_span.set("http.response_content_length", len(content))
+        return bytes(content)
     
     def add_table(self, element, slide):
         """Add a table to the slide"""
@@ -281,6 +359,5 @@ class PresentationCreator:
         return filename
     
     def generate_object_name(self, filename: str) -> str:
-        """Generate MinIO object name with date-based folder structure"""
-        today = datetime.now()
-        return f"{today.strftime('%Y')}/{today.strftime('%m')}/{today.strftime('%d')}/{filename}"
\ No newline at end of file
+        """Generate a unique, sharded object name under the date-based folder structure"""
+        return build_object_name(filename)
\ No newline at end of file
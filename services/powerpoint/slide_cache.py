@@ -0,0 +1,121 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from typing import List, Optional, Tuple
+from lxml import etree
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml import parse_xml
+from config import settings
+
+# Attributes that point at a slide relationship by id
+_REL_ATTRIBUTES = tuple(
+    f"{{http://schemas.openxmlformats.org/officeDocument/2006/relationships}}{name}" for name in ("embed", "link", "id")
+)
+
+class SlideFragment:
+    """One rendered slide: its XML and the images it refers to, by the relationship ids it used"""
+    def __init__(self, xml: bytes, images: List[Tuple[str, bytes]]):
+        self.xml = xml
+        self.images = images
+        self.size = len(xml) + sum(len(blob) for _, blob in images)
+        self.created = time.monotonic()
+    
+    @classmethod
+    def capture(cls, slide) -> Optional["SlideFragment"]:
+        """Fragment of a slide just built, or None if it uses relationships a fragment can't carry"""
+        images = []
+        for rId, rel in slide.part.rels.items():
+            if rel.reltype == RT.IMAGE and not rel.is_external:
+                images.append((rId, rel.target_part.blob))
+            elif rel.reltype != RT.SLIDE_LAYOUT:
+                return None
+        return cls(etree.tostring(slide._element), images)
+    
+    def restore(self, prs, slide_layout):
+        """
+        Add this slide to `prs`. Unlike Slides.add_slide this skips cloning the layout's
+        placeholders, which the fragment's own shapes replace anyway.
+        """
+        rId, slide = prs.part.add_slide(slide_layout)
+        prs.slides._sldIdLst.add_sldId(rId)
+        element = parse_xml(self.xml)
+        rIds = {}
+        for rId, blob in self.images:
+            # Identical images across slides still share one media part
+            _, rIds[rId] = slide.part.get_or_add_image_part(BytesIO(blob))
+        if rIds:
+            for node in element.iter():
+                for attribute in _REL_ATTRIBUTES:
+                    value = node.get(attribute)
+                    if value in rIds:
+                        node.set(attribute, rIds[value])
+        target = slide._element
+        for child in list(target):
+            target.remove(child)
+        target.extend(list(element))
+        return slide
+
+class SlideCache:
+    """
+    Rendered slides of recent presentations, keyed by a hash of the slide's HTML and the render
+    settings, so a deck resent with a few slides changed only builds those. Least recently used
+    fragments are dropped beyond `max_bytes`; entries older than `ttl` seconds are rebuilt.
+    Shared by the render threads of one worker.
+    """
+    def __init__(self, max_bytes: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_bytes = settings.SLIDE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.ttl = settings.SLIDE_CACHE_TTL_SECONDS if ttl is None else ttl
+        self._entries: "OrderedDict[str, SlideFragment]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+    
+    @staticmethod
+    def key(html: str, *render_settings) -> str:
+        digest = hashlib.sha256(repr(render_settings).encode())
+        digest.update(html.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[SlideFragment]:
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is None:
+                return None
+            if self.ttl and time.monotonic() - fragment.created > self.ttl:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return fragment
+    
+    def put(self, key: str, fragment: SlideFragment):
+        if fragment.size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = fragment
+            self.size += fragment.size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+    
+    def _remove(self, key: str):
+        self.size -= self._entries.pop(key).size
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+_slide_cache: Optional[SlideCache] = None
+
+def get_slide_cache() -> SlideCache:
+    """Return the SlideCache shared by this worker's renders"""
+    global _slide_cache
+    if _slide_cache is None:
+        _slide_cache = SlideCache()
+    return _slide_cache
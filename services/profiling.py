@@ -0,0 +1,180 @@
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+from config import settings
+
+# tracemalloc traces every thread, so only one render at a time gets a memory profile
+_memory_lock = threading.Lock()
+
+def profile_dir() -> str:
+    """Folder profiles are written to, next to the artifact index unless configured"""
+    if settings.PROFILE_DIR:
+        return settings.PROFILE_DIR
+    return os.path.join(os.path.dirname(os.path.abspath(settings.ARTIFACT_INDEX_PATH)), "profiles")
+
+def is_admin(token: Optional[str]) -> bool:
+    """Whether a request carries the profiling admin token"""
+    return bool(settings.PROFILE_ADMIN_TOKEN and token) and hmac.compare_digest(token, settings.PROFILE_ADMIN_TOKEN)
+
+def should_profile(token: Optional[str] = None) -> bool:
+    """Profile this render if an admin asked for it or it falls in the sampling rate"""
+    if is_admin(token):
+        return True
+    return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+class RenderProfiler:
+    """
+    Profiles one render on the thread that runs it: cProfile for CPU time, tracemalloc for
+    peak memory and the lines that allocated most. The result is saved as <id>.pstats
+    (for pstats/snakeviz) plus an <id>.json summary.
+    """
+    def __init__(self, generator: str, modes: Optional[str] = None):
+        modes = {mode.strip() for mode in (modes or settings.PROFILE_MODES).split(',')}
+        self.profile_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:12]}"
+        self.generator = generator
+        self.cpu = "cpu" in modes
+        self.memory = "memory" in modes
+        self.profile = None
+        self.summary: Dict[str, Any] = {}
+    
+    def wrap(self, render: Callable[[BinaryIO], Any]) -> Callable[[BinaryIO], Any]:
+        """Render function that runs `render` under the profilers"""
+        def profiled(output: BinaryIO):
+            return self.run(render, output)
+        return profiled
+    
+    def run(self, render: Callable[[BinaryIO], Any], output: BinaryIO):
+        traced = self.memory and _memory_lock.acquire(blocking=False)
+        # Memory budgets in tracemalloc mode keep tracing on for the whole worker; leave it running
+        owns_tracing = traced and not tracemalloc.is_tracing()
+        if owns_tracing:
+            tracemalloc.start()
+        elif traced:
+            tracemalloc.reset_peak()
+        profile = cProfile.Profile() if self.cpu else None
+        started = time.perf_counter()
+        try:
+            if profile is not None:
+                try:
+                    profile.enable()
+                except ValueError:
+                    # Python 3.12+ allows one active profiler per process
+                    self.summary["cpu_skipped"] = "another render was being CPU-profiled"
+                    profile = None
+            try:
+                return render(output)
+            finally:
+                if profile is not None:
+                    profile.disable()
+        finally:
+            self.summary["wall_ms"] = (time.perf_counter() - started) * 1000
+            self.profile = profile
+            if traced:
+                try:
+                    self.summary["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+                    self.summary["top_allocators"] = [
+                        {"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                         "size": stat.size, "count": stat.count}
+                        for stat in tracemalloc.take_snapshot().statistics('lineno')[:20]
+                    ]
+                finally:
+                    if owns_tracing:
+                        tracemalloc.stop()
+                    _memory_lock.release()
+            elif self.memory:
+                self.summary["memory_skipped"] = "another render was being memory-profiled"
+    
+    def top_functions(self, limit: int = 30) -> List[Dict[str, Any]]:
+        """Functions with the highest cumulative time"""
+        if self.profile is None:
+            return []
+        stats = pstats.Stats(self.profile).stats
+        ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+        return [
+            {"function": f"{filename}:{lineno}({name})", "calls": calls,
+             "total_time": total_time, "cumulative_time": cumulative_time}
+            for (filename, lineno, name), (_, calls, total_time, cumulative_time, _) in ranked
+        ]
+    
+    def save(self, object_name: Optional[str] = None, error: Optional[str] = None) -> Dict[str, Any]:
+        """Write the profile and its summary to the profile folder"""
+        folder = profile_dir()
+        os.makedirs(folder, exist_ok=True)
+        summary = {
+            "profile_id": self.profile_id,
+            "generator": self.generator,
+            "object_name": object_name,
+            "error": error,
+            "created_at": datetime.now().isoformat(),
+            **self.summary,
+            "top_functions": self.top_functions(),
+            "has_pstats": self.profile is not None,
+        }
+        if self.profile is not None:
+            self.profile.dump_stats(os.path.join(folder, f"{self.profile_id}.pstats"))
+        with open(os.path.join(folder, f"{self.profile_id}.json"), 'w') as f:
+            json.dump(summary, f)
+        prune_profiles(folder)
+        return summary
+
+def prune_profiles(folder: str, keep: Optional[int] = None):
+    """Keep only the newest `keep` profiles"""
+    keep = settings.PROFILE_MAX_FILES if keep is None else keep
+    summaries = sorted(
+        (entry for entry in os.scandir(folder) if entry.name.endswith('.json')),
+        key=lambda entry: entry.name, reverse=True
+    )
+    for entry in summaries[keep:]:
+        profile_id = entry.name[:-len('.json')]
+        for suffix in ('.json', '.pstats'):
+            try:
+                os.remove(os.path.join(folder, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+def list_profiles(generator: Optional[str] = None, object_name: Optional[str] = None,
+                  limit: int = 50) -> List[Dict[str, Any]]:
+    """Saved profile summaries, newest first"""
+    folder = profile_dir()
+    if not os.path.isdir(folder):
+        return []
+    profiles = []
+    for name in sorted((name for name in os.listdir(folder) if name.endswith('.json')), reverse=True):
+        summary = load_profile(name[:-len('.json')])
+        if summary is None:
+            continue
+        if generator and summary["generator"] != generator:
+            continue
+        if object_name and summary["object_name"] != object_name:
+            continue
+        profiles.append({key: value for key, value in summary.items() if key not in ("top_functions", "top_allocators")})
+        if len(profiles) >= limit:
+            break
+    return profiles
+
+def profile_path(profile_id: str, suffix: str) -> Optional[str]:
+    """Path of a stored profile file, or None for unknown or malformed ids"""
+    if not profile_id or os.path.basename(profile_id) != profile_id or profile_id.startswith('.'):
+        return None
+    path = os.path.join(profile_dir(), profile_id + suffix)
+    return path if os.path.isfile(path) else None
+
+def load_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    """Summary of one stored profile"""
+    path = profile_path(profile_id, '.json')
+    if path is None:
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,131 @@
+import contextvars
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+from fastapi import HTTPException
+from config import settings
+from services.admission import parse_limits
+from services.cancellation import raise_if_cancelled
+from services.metrics import RENDER_BUDGET_EXCEEDED
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def spooled_buffer() -> tempfile.SpooledTemporaryFile:
+    """Render buffer that stays in memory up to RENDER_SPOOL_MAX_BYTES and moves to a temp file beyond"""
+    return tempfile.SpooledTemporaryFile(
+        max_size=settings.RENDER_SPOOL_MAX_BYTES, dir=settings.RENDER_SPOOL_DIR or None
+    )
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def budget_bytes(generator: str) -> int:
+    """Memory budget of one render of `generator`; 0 disables the check"""
+    megabytes = parse_limits(settings.RENDER_MEMORY_BUDGETS).get(generator, settings.RENDER_MEMORY_BUDGET_MB)
+    return megabytes * 1024 * 1024
+
+class MemoryBudgetExceeded(HTTPException):
+    """A render grew past its memory budget and was stopped"""
+    def __init__(self, generator: str, limit: int, used: int, where: str):
+        self.generator = generator
+        self.limit = limit
+        self.used = used
+        self.where = where
+        super().__init__(
+            status_code=413,
+            detail=(
+                f"The {generator} render needed more than its {limit / 2 ** 20:.0f} MiB memory budget "
+                f"(about {used / 2 ** 20:.0f} MiB{f' during {where}' if where else ''}); "
+                "split the content into smaller requests"
+            )
+        )
+
+# Below this much process CPU time since a render started, its CPU share is too noisy to use
+_MIN_SHARE_CPU_SECONDS = 0.05
+
+class MemoryBudget:
+    """
+    Memory one render may add to its worker. Both modes measure the whole process, either its
+    RSS (the default, cheap) or tracemalloc's traced Python memory (slower renders), so the
+    growth since the render started also contains what concurrent renders allocated. Each
+    render is charged that growth in proportion to its share of the process CPU time over the
+    same period: a small render next to a large one is charged little, a render running alone
+    nearly all of it. This is an estimate, a guard against one render taking the worker down,
+    not an exact per-render accounting.
+    """
+    def __init__(self, generator: str, limit: int, mode: Optional[str] = None):
+        self.generator = generator
+        self.limit = limit
+        self.mode = mode or settings.RENDER_MEMORY_BUDGET_MODE
+        if self.mode == "tracemalloc" and not tracemalloc.is_tracing():
+            # Left running for the life of the worker; starting and stopping it per render would lose other renders' baselines
+            tracemalloc.start()
+        self.interval = settings.RENDER_MEMORY_CHECK_INTERVAL_MS / 1000
+        self.baseline = self._usage()
+        self.cpu_baseline = time.process_time()
+        # CPU time of each thread working for this render: (at its first check, at its latest check)
+        self._thread_cpu: Dict[int, Tuple[float, float]] = {}
+        self.peak = 0
+        self._next_check = 0.0
+    
+    def _usage(self) -> int:
+        if self.mode == "tracemalloc":
+            return tracemalloc.get_traced_memory()[0]
+        return current_rss()
+    
+    def _cpu_share(self) -> float:
+        """This render's share of the process CPU time since it started (1.0 until that is measurable)"""
+        now = time.thread_time()
+        first, _ = self._thread_cpu.get(threading.get_ident(), (now, now))
+        self._thread_cpu[threading.get_ident()] = (first, now)
+        process_cpu = time.process_time() - self.cpu_baseline
+        if process_cpu < _MIN_SHARE_CPU_SECONDS:
+            return 1.0
+        own_cpu = sum(last - first for first, last in self._thread_cpu.values())
+        return min(1.0, own_cpu / process_cpu)
+    
+    def check(self, where: str = ""):
+        """Raise MemoryBudgetExceeded once this render's estimated usage is over the limit; sampled at most every interval"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.interval
+        used = int((self._usage() - self.baseline) * self._cpu_share())
+        self.peak = max(self.peak, used)
+        if used > self.limit:
+            RENDER_BUDGET_EXCEEDED.labels(self.generator).inc()
+            raise MemoryBudgetExceeded(self.generator, self.limit, used, where)
+
+_budget: contextvars.ContextVar[Optional[MemoryBudget]] = contextvars.ContextVar("memory_budget", default=None)
+
+@contextmanager
+def memory_budget(generator: str, limit: Optional[int] = None) -> Iterator[Optional[MemoryBudget]]:
+    """Give the renders started in this block (render threads inherit the context) a memory budget"""
+    limit = budget_bytes(generator) if limit is None else limit
+    if limit <= 0:
+        yield None
+        return
+    token = _budget.set(MemoryBudget(generator, limit))
+    try:
+        yield _budget.get()
+    finally:
+        _budget.reset(token)
+
+def checkpoint(where: str = ""):
+    """Called from render loops; stops the render if its client went away or its memory budget is exhausted"""
+    raise_if_cancelled(where)
+    budget = _budget.get()
+    if budget is not None:
+        budget.check(where)
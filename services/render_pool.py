@@ -0,0 +1,36 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
+
+# Renders are CPU/IO bound library calls, so they run here instead of on the event loop
+_executor = ThreadPoolExecutor(
+    max_workers=settings.RENDER_WORKERS,
+    thread_name_prefix="render"
+)
+
+async def run_render(func, *args, **kwargs):
+    """Run a blocking render call in the shared render pool and await its result"""
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context variables into the worker thread
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_executor, call)
+
+def prestart_render_pool(timeout: float = 5):
+    """Start every render thread now instead of on the first renders"""
+    barrier = threading.Barrier(settings.RENDER_WORKERS)
+    # Each task blocks until all workers hold one, so the pool has to spawn them all
+    futures = [_executor.submit(barrier.wait, timeout) for _ in range(settings.RENDER_WORKERS)]
+    for future in futures:
+        try:
+            future.result()
+        except threading.BrokenBarrierError:
+            # Busy workers already exist; nothing left to start
+            pass
+
+def shutdown_render_pool():
+    """Wait for running renders and stop the pool"""
+    _executor.shutdown(wait=True)
@@ -0,0 +1,236 @@
+import itertools
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from config import settings
+from services.artifact_index import ArtifactIndex, get_artifact_index
+from services.local_store import LocalDocumentStore
+
+def parse_max_ages(spec: str) -> Dict[str, timedelta]:
+    """Parse "docx=30,xlsx=14,*=90" (days per artifact type, * for any type) into timedeltas"""
+    max_ages = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        artifact_type, _, days = item.partition('=')
+        max_ages[artifact_type.strip().lstrip('.').lower()] = timedelta(days=float(days))
+    return max_ages
+
+# Files this recent may be renders whose index row is still being written
+UNINDEXED_GRACE = timedelta(hours=1)
+
+class RetentionManager:
+    """
+    Deletes generated files on local disk that are older than their type's maximum age,
+    then evicts least-recently-downloaded files while the total exceeds the size budget.
+    Works from the artifact index in small batches. Files the index does not know (written
+    before it existed, or in the legacy directories) are found by a directory walk that
+    checks a slice of the tree per pass and resumes where the previous pass stopped.
+    """
+    storage = "local"
+    
+    def __init__(self, artifact_index: Optional[ArtifactIndex] = None, store: Optional[LocalDocumentStore] = None):
+        self.artifact_index = artifact_index or get_artifact_index()
+        self.store = store or LocalDocumentStore()
+        self.max_total_bytes = settings.RETENTION_MAX_TOTAL_BYTES
+        self.max_ages = parse_max_ages(settings.RETENTION_MAX_AGE_DAYS)
+        self.batch_size = settings.RETENTION_BATCH_SIZE
+        self.scan_files = settings.RETENTION_SCAN_FILES
+        self.legacy_stores = [
+            LocalDocumentStore(path) for path in filter(None, (part.strip() for part in settings.RETENTION_LEGACY_DIRS.split(',')))
+        ]
+        self._walker: Optional[Iterator[Tuple[LocalDocumentStore, str]]] = None
+        self.last_report = None
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def run_once(self) -> Dict[str, Any]:
+        """Run one retention pass and return what it reclaimed"""
+        with self._run_lock:
+            started = time.perf_counter()
+            report = {"indexed_files": 0, "expired_files": 0, "evicted_files": 0, "reclaimed_bytes": 0, "errors": []}
+            self._scan(report)
+            self._expire(report)
+            self._evict(report)
+            report["remaining_bytes"] = self.artifact_index.total_size(self.storage)
+            report["duration_ms"] = (time.perf_counter() - started) * 1000
+            report["finished_at"] = datetime.now()
+            self.last_report = report
+            if report["expired_files"] or report["evicted_files"]:
+                print(
+                    f"Retention reclaimed {report['reclaimed_bytes']} bytes "
+                    f"({report['expired_files']} expired, {report['evicted_files']} evicted)"
+                )
+            return report
+    
+    def _max_age(self, artifact_type: str) -> Optional[timedelta]:
+        return self.max_ages.get(artifact_type, self.max_ages.get('*'))
+    
+    def _walk(self) -> Iterator[Tuple[LocalDocumentStore, str]]:
+        for store in [self.store] + self.legacy_stores:
+            for dirpath, _, filenames in os.walk(store.root):
+                for name in filenames:
+                    yield store, os.path.join(dirpath, name)
+    
+    def _scan(self, report: Dict[str, Any]):
+        """Check the next slice of the directory walk for files the index does not know"""
+        if self.scan_files <= 0:
+            return
+        if self._walker is None:
+            self._walker = self._walk()
+        files = list(itertools.islice(self._walker, self.scan_files))
+        if len(files) < self.scan_files:
+            # The walk is done; the next pass starts over and picks up what was written since
+            self._walker = None
+        for start in range(0, len(files), self.batch_size):
+            self._scan_batch(files[start:start + self.batch_size], report)
+            time.sleep(settings.RETENTION_BATCH_PAUSE_SECONDS)
+    
+    def _scan_batch(self, batch: List[Tuple[LocalDocumentStore, str]], report: Dict[str, Any]):
+        """
+        Index unknown files under DOCUMENT_LOCATION so expiry and eviction see them; expire files
+        in the legacy directories by modification time. Temp files left by interrupted renders are removed.
+        """
+        now = datetime.now()
+        object_names = {path: self.store.to_object_name(path) for store, path in batch if store is self.store}
+        known = self.artifact_index.known(object_names.values(), self.storage)
+        touched_dirs = {}
+        for store, path in batch:
+            if object_names.get(path) in known:
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            modified = datetime.fromtimestamp(stat.st_mtime)
+            if now - modified < UNINDEXED_GRACE:
+                continue
+            name = os.path.basename(path)
+            leftover = name.startswith('.') and name.endswith('.tmp')
+            if store is self.store and not leftover:
+                self.artifact_index.record(
+                    self.storage, object_names[path], path, name, "unknown", stat.st_size, created_at=modified
+                )
+                report["indexed_files"] += 1
+                continue
+            max_age = self._max_age(os.path.splitext(name)[1].lstrip('.').lower())
+            if not leftover and (max_age is None or now - modified < max_age):
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                report["errors"].append({"path": path, "error": str(e)})
+                continue
+            touched_dirs.setdefault(store, set()).add(os.path.dirname(path))
+            report["expired_files"] += 1
+            report["reclaimed_bytes"] += stat.st_size
+        for store, dirs in touched_dirs.items():
+            store.prune_empty_dirs(dirs)
+    
+    def _expire(self, report: Dict[str, Any]):
+        """Delete artifacts past the maximum age of their type, oldest first"""
+        now = datetime.now()
+        typed = [artifact_type for artifact_type in self.max_ages if artifact_type != '*']
+        for artifact_type in typed:
+            cutoff = now - self.max_ages[artifact_type]
+            self._delete_while(
+                lambda: self.artifact_index.created_before(
+                    self.storage, cutoff, self.batch_size, artifact_type=artifact_type
+                ),
+                "expired_files", report
+            )
+        if '*' in self.max_ages:
+            # Types without their own limit fall back to '*'
+            cutoff = now - self.max_ages['*']
+            self._delete_while(
+                lambda: self.artifact_index.created_before(
+                    self.storage, cutoff, self.batch_size, exclude_types=typed
+                ),
+                "expired_files", report
+            )
+    
+    def _evict(self, report: Dict[str, Any]):
+        """Delete least-recently-downloaded artifacts until the total fits the size budget"""
+        if self.max_total_bytes <= 0:
+            return
+        while True:
+            excess = self.artifact_index.total_size(self.storage) - self.max_total_bytes
+            if excess <= 0:
+                return
+            batch = []
+            for artifact in self.artifact_index.least_recently_used(self.storage, self.batch_size):
+                batch.append(artifact)
+                excess -= artifact["size"]
+                if excess <= 0:
+                    break
+            if not batch or not self._delete_batch(batch, "evicted_files", report):
+                return
+    
+    def _delete_while(self, next_batch, counter: str, report: Dict[str, Any]):
+        """Keep deleting batches until the query returns nothing"""
+        while True:
+            batch = next_batch()
+            if not batch or not self._delete_batch(batch, counter, report):
+                return
+    
+    def _delete_batch(self, batch: List[Dict[str, Any]], counter: str, report: Dict[str, Any]) -> bool:
+        """Delete one batch of files and their index rows; False if nothing could be removed"""
+        removed, touched_dirs = [], set()
+        for artifact in batch:
+            try:
+                os.remove(artifact["path"])
+            except FileNotFoundError:
+                # Already gone from disk; just forget it
+                pass
+            except OSError as e:
+                report["errors"].append({"object_name": artifact["object_name"], "error": str(e)})
+                continue
+            removed.append(artifact["object_name"])
+            touched_dirs.add(os.path.dirname(os.path.abspath(artifact["path"])))
+            report[counter] += 1
+            report["reclaimed_bytes"] += artifact["size"]
+        
+        self.artifact_index.delete(removed, self.storage)
+        self.store.prune_empty_dirs(touched_dirs)
+        # Yield between batches so retention stays in the background
+        time.sleep(settings.RETENTION_BATCH_PAUSE_SECONDS)
+        return bool(removed)
+    
+    def start(self, interval: Optional[int] = None):
+        """Run retention passes in a background thread every `interval` seconds"""
+        interval = settings.RETENTION_INTERVAL_SECONDS if interval is None else interval
+        if interval <= 0 or self._thread is not None:
+            return
+        if self.max_total_bytes <= 0 and not self.max_ages:
+            return
+        
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"Retention pass failed: {e}")
+        
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="artifact-retention", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the background retention thread"""
+        self._stop.set()
+        self._thread = None
+
+_manager: Optional[RetentionManager] = None
+_manager_lock = threading.Lock()
+
+def get_retention_manager() -> RetentionManager:
+    """Return the RetentionManager shared by this worker"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = RetentionManager()
+    return _manager
@@ -0,0 +1,126 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from config import settings
+from services.cancellation import SharedCancelToken, cancel_scope, cancellable, current_token
+from services.metrics import CACHE_LOOKUPS
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on this platform: coalescing stays within one process
+    fcntl = None
+
+def _acquire(path: str):
+    """Block (on a threadpool thread) until this worker holds the lock file at `path`"""
+    while True:
+        lock_file = open(path, "a+b")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # The previous holder unlinks the file on release; retry if we locked a stale inode
+            if os.path.samestat(os.fstat(lock_file.fileno()), os.stat(path)):
+                return lock_file
+        except FileNotFoundError:
+            pass
+        except BaseException:
+            lock_file.close()
+            raise
+        lock_file.close()
+
+def _release(lock_file):
+    try:
+        # Unlink while still locked so lock files do not pile up per key
+        os.remove(lock_file.name)
+    except FileNotFoundError:
+        pass
+    finally:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+@asynccontextmanager
+async def file_lock(lock_dir: str, key: str) -> AsyncIterator[None]:
+    """Hold the per-key lock file in `lock_dir` for the block, excluding every worker that shares the directory"""
+    os.makedirs(lock_dir, exist_ok=True)
+    lock_file = await run_in_threadpool(_acquire, os.path.join(lock_dir, f"{key}.lock"))
+    try:
+        yield
+    finally:
+        _release(lock_file)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one in-flight task.
+    Duplicates await the leader's result instead of starting their own render. With a lock
+    directory, workers also serialise on a per-key lock file so a duplicate in another
+    process can pick up the artifact the first one produced instead of rendering again.
+    """
+    def __init__(self, lock_dir: Optional[str] = None):
+        self.lock_dir = settings.SINGLE_FLIGHT_LOCK_DIR if lock_dir is None else lock_dir
+        if self.lock_dir and fcntl is not None:
+            os.makedirs(self.lock_dir, exist_ok=True)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        # The shared render is cancelled only once every request waiting on it has been
+        self._tokens: Dict[str, SharedCancelToken] = {}
+    
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+    
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]],
+                 recheck: Optional[Callable[[datetime], Any]] = None) -> Any:
+        """
+        Run `func` once for all concurrent callers with `key`.
+        `recheck(since)` is called after waiting on another worker's lock and may return
+        the result that worker produced since `since`, which is then used instead of `func`.
+        """
+        task = self._in_flight.get(key)
+        CACHE_LOOKUPS.labels("single_flight", "miss" if task is None else "hit").inc()
+        if task is None:
+            token = self._tokens[key] = SharedCancelToken()
+            task = asyncio.ensure_future(self._lead(key, func, recheck, token))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        unregister = self._tokens[key].join(current_token())
+        try:
+            # Shielded so one caller disconnecting does not cancel the render the others wait on
+            return await cancellable(asyncio.shield(task))
+        finally:
+            unregister()
+    
+    def _forget(self, key: str, task: asyncio.Future):
+        self._in_flight.pop(key, None)
+        self._tokens.pop(key, None)
+        if not task.cancelled():
+            # Every caller may have stopped waiting (disconnected) before the render failed
+            task.exception()
+    
+    async def _lead(self, key: str, func: Callable[[], Awaitable[Any]],
+                    recheck: Optional[Callable[[datetime], Any]], token: SharedCancelToken) -> Any:
+        with cancel_scope(token):
+            return await self._lead_locked(key, func, recheck)
+    
+    async def _lead_locked(self, key: str, func: Callable[[], Awaitable[Any]],
+                           recheck: Optional[Callable[[datetime], Any]]) -> Any:
+        if not self.lock_dir or fcntl is None:
+            return await func()
+        
+        since = datetime.now()
+        async with file_lock(self.lock_dir, key):
+            if recheck is not None:
+                result = await run_in_threadpool(recheck, since)
+                CACHE_LOOKUPS.labels("single_flight_cross_worker", "miss" if result is None else "hit").inc()
+                if result is not None:
+                    return result
+            return await func()
+
+_single_flight: Optional[SingleFlight] = None
+
+def get_single_flight() -> SingleFlight:
+    """Return the SingleFlight shared by this worker's event loop"""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
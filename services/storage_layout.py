@@ -0,0 +1,22 @@
+import os
+import uuid
+from datetime import datetime
+from typing import Optional
+from config import settings
+
+def build_object_name(filename: str, artifact_id: Optional[str] = None, when: Optional[datetime] = None) -> str:
+    """
+    Storage key for a generated file: YYYY/MM/DD/<shard>/<id><ext>.
+    The id is unique (or a content hash when given), so two requests in the same second
+    never collide, and hash-prefix shard folders keep each directory small.
+    The friendly filename is only kept as download metadata.
+    """
+    artifact_id = artifact_id or uuid.uuid4().hex
+    when = when or datetime.now()
+    extension = os.path.splitext(filename)[1].lower()
+    
+    shards = [
+        artifact_id[level * settings.STORAGE_SHARD_WIDTH:(level + 1) * settings.STORAGE_SHARD_WIDTH]
+        for level in range(settings.STORAGE_SHARD_DEPTH)
+    ]
+    return '/'.join([when.strftime('%Y'), when.strftime('%m'), when.strftime('%d'), *shards, artifact_id + extension])
@@ -0,0 +1,385 @@
+import contextvars
+import json
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from config import settings
+
+# W3C trace context: version-traceid-parentid-flags
+TRACEPARENT_RE = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?$")
+
+# OTLP SpanKind values
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+class Span:
+    """One timed operation of a sampled trace"""
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "kind", "attributes",
+                 "start_ns", "end_ns", "error")
+    
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, kind: str = "internal",
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+    
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+    
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1e6 if self.end_ns else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+# Innermost open span of the current request; unset (None) for requests that are not sampled
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+def tracing_enabled() -> bool:
+    return bool(settings.TRACE_EXPORTER) or _processor is not None
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent span id, sampled) of a valid traceparent header, else None"""
+    match = TRACEPARENT_RE.match((value or "").strip().lower())
+    if match is None:
+        return None
+    version, trace_id, parent_id, flags, rest = match.groups()
+    if version == "ff" or (version == "00" and rest) or set(trace_id) == {"0"} or set(parent_id) == {"0"}:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+def inject(headers: Dict[str, str]) -> Dict[str, str]:
+    """Add the current span's traceparent to outbound request headers"""
+    span = _current_span.get()
+    if span is not None:
+        headers["traceparent"] = span.traceparent
+    return headers
+
+def start_span(name: str, kind: str = "internal", **attributes) -> Optional[Span]:
+    """
+    Start a child of the current span without making it current, for spans that begin and end
+    in separate callbacks (SQL events). None when the request is not being traced.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return Span(name, parent.trace_id, parent.span_id, kind, attributes)
+
+def finish_span(span: Optional[Span], error: Optional[BaseException] = None):
+    if span is None:
+        return
+    span.end_ns = time.time_ns()
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}"
+    processor = get_span_processor()
+    if processor is not None:
+        processor.submit(span)
+
+@contextmanager
+def _activate(span: Span) -> Iterator[Span]:
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        finish_span(span, e)
+        raise
+    else:
+        finish_span(span)
+    finally:
+        _current_span.reset(token)
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes) -> Iterator[Optional[Span]]:
+    """Trace the block as a child of the current span; a no-op outside sampled traces"""
+    child = start_span(name, kind, **attributes)
+    if child is None:
+        yield None
+        return
+    with _activate(child):
+        yield child
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, kind: str = "server",
+                **attributes) -> Iterator[Optional[Span]]:
+    """
+    Open the root span of a request. Continues the caller's trace when it sent a traceparent
+    (honouring its sampling decision), otherwise samples at TRACE_SAMPLE_RATE.
+    """
+    parent = parse_traceparent(traceparent) if tracing_enabled() else None
+    if parent is not None:
+        sampled = parent[2]
+    else:
+        sampled = tracing_enabled() and settings.TRACE_SAMPLE_RATE > 0 and random.random() < settings.TRACE_SAMPLE_RATE
+    if not sampled:
+        yield None
+        return
+    trace_id, parent_id = (parent[0], parent[1]) if parent else (secrets.token_hex(16), None)
+    with _activate(Span(name, trace_id, parent_id, kind, attributes)) as root:
+        yield root
+
+class TracingMiddleware:
+    """ASGI middleware that opens a server span per HTTP request, named after the matched route"""
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracing_enabled():
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope.get("headers") or ())
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1")
+        with start_trace(f"{scope['method']} {scope['path']}", traceparent,
+                         **{"http.method": scope["method"], "http.target": scope["path"]}) as root:
+            if root is None:
+                await self.app(scope, receive, send)
+                return
+            
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    root.set("http.status_code", message["status"])
+                await send(message)
+            
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = scope.get("route")
+                if route is not None and getattr(route, "path", None):
+                    root.name = f"{scope['method']} {route.path}"
+                    root.set("http.route", route.path)
+
+def instrument_engine(engine):
+    """Record a client span for every SQL statement the engine executes"""
+    from sqlalchemy import event
+    if getattr(engine, "_traced", False):
+        return engine
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        sql_span = start_span("sql", "client", **{"db.system": engine.dialect.name, "db.statement": statement[:2000]})
+        if sql_span is not None:
+            conn.info.setdefault("trace_spans", []).append(sql_span)
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            sql_span = spans.pop()
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                sql_span.set("db.rowcount", cursor.rowcount)
+            finish_span(sql_span)
+    
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if spans:
+            finish_span(spans.pop(), exception_context.original_exception)
+    
+    engine._traced = True
+    return engine
+
+class SpanExporter(ABC):
+    """Destination for batches of finished spans"""
+    @abstractmethod
+    def export(self, spans: List[Span]):
+        """Send one batch of finished spans"""
+    
+    def shutdown(self):
+        pass
+
+class JsonLinesExporter(SpanExporter):
+    """Appends one JSON object per span to a local file, for offline analysis"""
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.TRACE_JSONL_PATH
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+    
+    def export(self, spans: List[Span]):
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        # One write per batch in append mode keeps lines from several workers intact
+        with open(self.path, "a") as f:
+            f.write(lines)
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+class OTLPExporter(SpanExporter):
+    """Posts spans to an OpenTelemetry collector using OTLP/HTTP with JSON encoding"""
+    def __init__(self, endpoint: Optional[str] = None, headers: Optional[Dict[str, str]] = None,
+                 service_name: Optional[str] = None):
+        import requests
+        self.endpoint = endpoint or settings.TRACE_OTLP_ENDPOINT
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.session.headers.update(headers if headers is not None else parse_headers(settings.TRACE_OTLP_HEADERS))
+        self.resource = {"attributes": _otlp_attributes({
+            "service.name": service_name or settings.TRACE_SERVICE_NAME,
+            "service.version": settings.APP_VERSION,
+            "process.pid": os.getpid(),
+        })}
+    
+    def encode(self, spans: List[Span]) -> Dict[str, Any]:
+        encoded = []
+        for span in spans:
+            item = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": SPAN_KINDS.get(span.kind, 1),
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": _otlp_attributes(span.attributes),
+                # STATUS_CODE_ERROR = 2, STATUS_CODE_UNSET = 0
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+            }
+            if span.parent_id:
+                item["parentSpanId"] = span.parent_id
+            encoded.append(item)
+        return {"resourceSpans": [{
+            "resource": self.resource,
+            "scopeSpans": [{"scope": {"name": "forjinn.tracing"}, "spans": encoded}],
+        }]}
+    
+    def export(self, spans: List[Span]):
+        response = self.session.post(self.endpoint, data=json.dumps(self.encode(spans)), timeout=10)
+        response.raise_for_status()
+    
+    def shutdown(self):
+        self.session.close()
+
+def parse_headers(value: str) -> Dict[str, str]:
+    headers = {}
+    for item in value.split(","):
+        key, _, header_value = item.partition("=")
+        if key.strip():
+            headers[key.strip()] = header_value.strip()
+    return headers
+
+EXPORTERS: Dict[str, Callable[[], SpanExporter]] = {
+    "jsonl": JsonLinesExporter,
+    "otlp": OTLPExporter,
+}
+
+class BatchSpanProcessor:
+    """
+    Queues finished spans and exports them in batches from a background thread, so requests
+    never wait on the exporter. When the queue is full new spans are dropped and counted.
+    """
+    def __init__(self, exporter: SpanExporter, max_queue: Optional[int] = None,
+                 batch_size: Optional[int] = None, interval: Optional[float] = None):
+        self.exporter = exporter
+        self.batch_size = batch_size or settings.TRACE_EXPORT_BATCH_SIZE
+        self.interval = settings.TRACE_EXPORT_INTERVAL_SECONDS if interval is None else interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue or settings.TRACE_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+        self._thread.start()
+    
+    def submit(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+    
+    def _export(self, batch: List[Span]):
+        if not batch:
+            return
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            print(f"Exporting {len(batch)} spans failed: {e}")
+    
+    def _run(self):
+        batch: List[Span] = []
+        deadline = time.monotonic() + self.interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False
+            if item is None:
+                self._export(batch)
+                return
+            if item:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._export(batch)
+                batch = []
+                deadline = time.monotonic() + self.interval
+    
+    def shutdown(self, timeout: float = 10):
+        """Export what is queued and stop the thread"""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self.exporter.shutdown()
+
+_processor: Optional[BatchSpanProcessor] = None
+_processor_lock = threading.Lock()
+
+def get_span_processor() -> Optional[BatchSpanProcessor]:
+    """Return this worker's span processor for TRACE_EXPORTER, creating it on first use"""
+    global _processor
+    if _processor is None and tracing_enabled():
+        with _processor_lock:
+            if _processor is None:
+                factory = EXPORTERS.get(settings.TRACE_EXPORTER)
+                if factory is None:
+                    raise ValueError(f"Unknown TRACE_EXPORTER: {settings.TRACE_EXPORTER} (expected one of {', '.join(EXPORTERS)})")
+                _processor = BatchSpanProcessor(factory())
+    return _processor
+
+def set_span_exporter(exporter: Optional[SpanExporter]):
+    """Send spans to a custom exporter instead of the one TRACE_EXPORTER names"""
+    global _processor
+    with _processor_lock:
+        if _processor is not None:
+            _processor.shutdown()
+        _processor = BatchSpanProcessor(exporter) if exporter is not None else None
+
+def shutdown_tracing():
+    """Flush queued spans; called on worker shutdown"""
+    global _processor
+    with _processor_lock:
+        if _processor is not None:
+            _processor.shutdown()
+            _processor = None
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from datetime import datetime
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from config import settings
+from services.artifact_index import get_artifact_index
+from services.creators import enabled_formats, get_creator
+from services.minio_handler import get_minio_handler
+from services.render_pool import prestart_render_pool, run_render
+from services.worker_stats import get_worker_stats
+
+# Tiny inputs that still go through every code path of a creator (headings, formatting, lists, tables)
+SAMPLES = {
+    "document": "# Warm-up\n**bold** *italic* [SIZE:12]sized[/SIZE]\n- item\n1. item\n|a|b|\n|-|-|\n|1|2|",
+    "excel": "# Warm-up\n[BOLD]title[/BOLD]\n|a|b|\n|-|-|\n|1|2|",
+    "presentation": (
+        '<div class="slide"><h1>Warm-up</h1><p>text</p><ul><li>item</li></ul>'
+        '<table><tr><th>a</th></tr><tr><td>1</td></tr></table></div>'
+    ),
+    "sql": "SELECT 1",
+}
+
+class WarmupState:
+    """Progress of this worker's warm-up; the worker is ready once every required step passed"""
+    def __init__(self):
+        self.status = "pending"
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.steps: List[Dict[str, Any]] = []
+        # Rounds of retrying failed required steps so far
+        self.retries = 0
+    
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+    
+    def report(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "retries": self.retries,
+            "steps": self.steps,
+        }
+
+state = WarmupState()
+
+def render_sample(fmt: str):
+    """Import a format's creator and render its sample once"""
+    creator = get_creator(fmt)
+    output = BytesIO()
+    if fmt == "document":
+        creator.create_document(SAMPLES[fmt], output=output)
+    elif fmt == "excel":
+        creator.create_excel_from_content(SAMPLES[fmt], output=output)
+    elif fmt == "presentation":
+        creator.create_presentation(SAMPLES[fmt], output=output)
+    else:
+        # Opens the engine's connection pool and exercises the Excel writer
+        creator.execute_query_to_excel(SAMPLES[fmt], output=output)
+    return output.getbuffer().nbytes
+
+def warmup_steps() -> List[Tuple[str, bool, Callable, tuple]]:
+    """(name, required, call, args) of every warm-up step"""
+    steps = [
+        ("render_pool", True, run_in_threadpool, (prestart_render_pool,)),
+        ("artifact_index", True, run_in_threadpool, (get_artifact_index,)),
+        ("minio", settings.DEFAULT_STORAGE == "minio", run_in_threadpool, (lambda: get_minio_handler().verify_bucket(),)),
+    ]
+    for fmt in sorted(enabled_formats()):
+        # A database outage should not keep document/excel/presentation traffic away
+        steps.append((f"render:{fmt}", fmt != "sql", run_render, (render_sample, fmt)))
+    return steps
+
+async def _step(name: str, required: bool, call: Callable, *args) -> Dict[str, Any]:
+    started = time.perf_counter()
+    step = {"step": name, "required": required or settings.WARMUP_STRICT}
+    try:
+        result = call(*args)
+        if asyncio.iscoroutine(result):
+            await result
+        step["ok"] = True
+    except Exception as e:
+        step["ok"] = False
+        step["error"] = str(getattr(e, "detail", e))
+        print(f"Warm-up step '{name}' failed: {step['error']}")
+    step["duration_ms"] = (time.perf_counter() - started) * 1000
+    return step
+
+def _failed() -> List[str]:
+    return [step["step"] for step in state.steps if step["required"] and not step["ok"]]
+
+def _finish():
+    state.finished_at = datetime.now()
+    failed = _failed()
+    state.status = "retrying" if failed else "ready"
+    worker_stats = get_worker_stats()
+    if worker_stats is not None and state.ready:
+        # Tells the supervisor this worker can take over from the one it replaces
+        worker_stats.mark_ready()
+    took = (state.finished_at - state.started_at).total_seconds()
+    print(f"Warm-up {state.status} after {took:.2f}s" + (f" (failed: {', '.join(failed)})" if failed else ""))
+
+async def run_warmup():
+    """
+    Prime pools, connections and every enabled creator before reporting ready. Required steps
+    that fail (MinIO or the index briefly unreachable) are retried with capped backoff until
+    they pass, so a worker is never stuck reporting 503 for its whole life.
+    """
+    state.status = "running"
+    state.started_at = datetime.now()
+    state.steps = []
+    state.retries = 0
+    
+    steps = warmup_steps() if settings.WARMUP_ENABLED else []
+    for name, required, call, args in steps:
+        state.steps.append(await _step(name, required, call, *args))
+    _finish()
+    
+    delay = settings.WARMUP_RETRY_SECONDS
+    while not state.ready:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, settings.WARMUP_RETRY_MAX_SECONDS)
+        state.retries += 1
+        failed = set(_failed())
+        for index, (name, required, call, args) in enumerate(steps):
+            if name in failed:
+                state.steps[index] = await _step(name, required, call, *args)
+        _finish()
+    return state
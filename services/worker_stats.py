@@ -0,0 +1,69 @@
+import mmap
+import os
+import struct
+import threading
+from typing import Any, Dict, Optional
+from config import settings
+
+# renders completed, ready flag (1 once warm-up passed), pid
+STATS_FORMAT = struct.Struct("<QQQ")
+
+def create_stats_file(path: str):
+    """Zeroed stats file the supervisor hands to a new worker"""
+    with open(path, "wb") as f:
+        f.write(b"\0" * STATS_FORMAT.size)
+
+def read_stats(path: str) -> Optional[Dict[str, Any]]:
+    """A worker's counters as last written, or None if the file is gone or incomplete"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(STATS_FORMAT.size)
+    except OSError:
+        return None
+    if len(data) < STATS_FORMAT.size:
+        return None
+    renders, ready, pid = STATS_FORMAT.unpack(data)
+    return {"renders": renders, "ready": bool(ready), "pid": pid}
+
+class WorkerStats:
+    """
+    Counters a supervised worker shares with its supervisor through a small memory-mapped file,
+    so recording a render costs no system call
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), STATS_FORMAT.size)
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.ready = False
+        self._write()
+    
+    def _write(self):
+        STATS_FORMAT.pack_into(self._map, 0, self.renders, int(self.ready), os.getpid())
+    
+    def record_render(self):
+        with self._lock:
+            self.renders += 1
+            self._write()
+    
+    def mark_ready(self):
+        with self._lock:
+            self.ready = True
+            self._write()
+    
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+_stats: Optional[WorkerStats] = None
+_stats_lock = threading.Lock()
+
+def get_worker_stats() -> Optional[WorkerStats]:
+    """This worker's shared counters when it runs under the supervisor, else None"""
+    global _stats
+    if _stats is None and settings.WORKER_STATS_FILE:
+        with _stats_lock:
+            if _stats is None:
+                _stats = WorkerStats(settings.WORKER_STATS_FILE)
+    return _stats
@@ -0,0 +1,73 @@
+import json
+import zipfile
+from typing import Any, Iterator
+
+class _ChunkBuffer:
+    """Unseekable write target for ZipFile whose contents are drained after every write"""
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class ZipStreamWriter:
+    """
+    Builds a zip archive incrementally and hands back the bytes produced so far,
+    so the archive can be streamed while later entries are still being rendered.
+    Office files are already deflated, so entries are stored rather than recompressed.
+    """
+    def __init__(self, chunk_size: int = 1024 * 1024):
+        self.chunk_size = chunk_size
+        self._buffer = _ChunkBuffer()
+        self._zip = zipfile.ZipFile(self._buffer, 'w', compression=zipfile.ZIP_STORED, allowZip64=True)
+        self._names = set()
+        # Entry name the latest add() used, after de-duplication
+        self.last_name = None
+    
+    def unique_name(self, name: str) -> str:
+        """Entry name that does not clash with earlier entries ("a.docx", "a (1).docx", ...)"""
+        base, dot, extension = name.rpartition('.')
+        if not dot:
+            base, extension = name, ''
+        candidate, counter = name, 1
+        while candidate in self._names:
+            candidate = f"{base} ({counter}){dot}{extension}"
+            counter += 1
+        self._names.add(candidate)
+        return candidate
+    
+    def add(self, name: str, stream) -> Iterator[bytes]:
+        """Add one entry from a readable stream, yielding the archive bytes as each chunk is written"""
+        self.last_name = self.unique_name(name)
+        with self._zip.open(self.last_name, 'w', force_zip64=True) as entry:
+            while True:
+                data = stream.read(self.chunk_size)
+                if not data:
+                    break
+                entry.write(data)
+                chunk = self._buffer.drain()
+                if chunk:
+                    yield chunk
+        # Data descriptor written when the entry closes
+        chunk = self._buffer.drain()
+        if chunk:
+            yield chunk
+    
+    def add_json(self, name: str, payload: Any) -> bytes:
+        """Add a small JSON entry (e.g. a manifest) and return the bytes it produced"""
+        self._zip.writestr(self.unique_name(name), json.dumps(payload, indent=2, default=str))
+        return self._buffer.drain()
+    
+    def close(self) -> bytes:
+        """Finish the archive and return the central directory bytes"""
+        self._zip.close()
+        return self._buffer.drain()
@@ -0,0 +1,220 @@
+"""
+Supervisor mode: run the API as several uvicorn workers that share one listening socket and
+recycle each worker gracefully once it has rendered RECYCLE_AFTER_RENDERS files or its RSS
+passes RECYCLE_RSS_MB.
+
+    python supervisor.py                                  # SUPERVISOR_WORKERS workers on HOST:PORT
+    RECYCLE_AFTER_RENDERS=500 RECYCLE_RSS_MB=1500 python supervisor.py --workers 4
+    python supervisor.py --log-level warning              # other options are passed on to uvicorn
+
+A worker due for recycling keeps serving while its replacement starts and warms up; only once
+the replacement reports ready does the old worker get SIGTERM, stop accepting connections and
+finish its in-flight requests (up to WORKER_GRACEFUL_TIMEOUT_SECONDS). Capacity never drops
+below the configured number of workers.
+
+SIGTERM/SIGINT stop every worker gracefully; SIGHUP recycles all workers one at a time.
+"""
+import argparse
+import itertools
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+from config import settings
+from services.worker_stats import create_stats_file, read_stats
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Current resident set size of a process, from /proc"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Listening socket every worker accepts from"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+class Worker:
+    """One uvicorn process serving the shared socket"""
+    def __init__(self, slot: int, generation: int, sock: socket.socket, run_dir: str, uvicorn_args: List[str]):
+        self.slot = slot
+        self.name = f"{slot}.{generation}"
+        self.stats_path = os.path.join(run_dir, f"worker-{self.name}.stats")
+        create_stats_file(self.stats_path)
+        # Jitter keeps workers that started together from all recycling at the same moment
+        jitter = 1 + random.uniform(-settings.RECYCLE_JITTER, settings.RECYCLE_JITTER)
+        self.render_limit = max(1, round(settings.RECYCLE_AFTER_RENDERS * jitter)) if settings.RECYCLE_AFTER_RENDERS else 0
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--fd", str(sock.fileno()),
+             "--timeout-graceful-shutdown", str(settings.WORKER_GRACEFUL_TIMEOUT_SECONDS), *uvicorn_args],
+            cwd=ROOT, pass_fds=(sock.fileno(),), env=dict(os.environ, WORKER_STATS_FILE=self.stats_path)
+        )
+        self.started_at = time.monotonic()
+        self.stopping_since: Optional[float] = None
+        # A failed replacement is not retried before this time
+        self.next_recycle_at = 0.0
+    
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+    
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+    
+    def stats(self) -> dict:
+        return read_stats(self.stats_path) or {"renders": 0, "ready": False, "pid": 0}
+    
+    def recycle_reason(self) -> Optional[str]:
+        """Why this worker should be replaced, or None while it is within its limits"""
+        renders = self.stats()["renders"]
+        if self.render_limit and renders >= self.render_limit:
+            return f"{renders} renders (limit {self.render_limit})"
+        rss = rss_bytes(self.pid)
+        if settings.RECYCLE_RSS_MB and rss is not None and rss >= settings.RECYCLE_RSS_MB * 1024 * 1024:
+            return f"RSS {rss / 2 ** 20:.0f} MiB (limit {settings.RECYCLE_RSS_MB} MiB)"
+        return None
+    
+    def stop(self):
+        """Ask uvicorn to stop accepting and finish in-flight requests"""
+        if self.stopping_since is None and self.alive:
+            self.stopping_since = time.monotonic()
+            self.process.send_signal(signal.SIGTERM)
+    
+    def reap(self) -> bool:
+        """True once a stopping worker has exited; kills it if draining takes too long"""
+        if self.alive:
+            if self.stopping_since is not None and \
+                    time.monotonic() - self.stopping_since > settings.WORKER_GRACEFUL_TIMEOUT_SECONDS + 10:
+                print(f"Worker {self.name} (pid {self.pid}) did not drain in time; killing it")
+                self.process.kill()
+            return False
+        try:
+            os.remove(self.stats_path)
+        except OSError:
+            pass
+        return True
+
+class Supervisor:
+    def __init__(self, workers: int, host: str, port: int, uvicorn_args: List[str]):
+        self.worker_count = workers
+        self.sock = bind_socket(host, port)
+        self.uvicorn_args = uvicorn_args
+        self.run_dir = tempfile.mkdtemp(prefix="forjinn-supervisor-")
+        self.generations = itertools.count()
+        self.active: Dict[int, Worker] = {}
+        # slot -> replacement warming up for the active worker of that slot
+        self.replacements: Dict[int, Worker] = {}
+        self.reasons: Dict[int, str] = {}
+        self.retiring: List[Worker] = []
+        self.rolling_restart = set()
+        self.stopping = False
+    
+    def spawn(self, slot: int) -> Worker:
+        worker = Worker(slot, next(self.generations), self.sock, self.run_dir, self.uvicorn_args)
+        print(f"Started worker {worker.name} (pid {worker.pid})")
+        return worker
+    
+    def handle_signal(self, signum, frame):
+        if signum == signal.SIGHUP:
+            print("SIGHUP: recycling every worker")
+            self.rolling_restart = set(self.active)
+        else:
+            self.stopping = True
+    
+    def run(self):
+        signal.signal(signal.SIGTERM, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+        signal.signal(signal.SIGHUP, self.handle_signal)
+        host, port = self.sock.getsockname()[:2]
+        print(f"Supervisor (pid {os.getpid()}) listening on http://{host}:{port} with {self.worker_count} workers")
+        
+        for slot in range(self.worker_count):
+            self.active[slot] = self.spawn(slot)
+        try:
+            while not self.stopping:
+                self.tick()
+                deadline = time.monotonic() + settings.SUPERVISOR_POLL_SECONDS
+                while not self.stopping and time.monotonic() < deadline:
+                    time.sleep(0.1)
+        finally:
+            self.shutdown()
+    
+    def tick(self):
+        self.retiring = [worker for worker in self.retiring if not worker.reap()]
+        now = time.monotonic()
+        for slot, worker in list(self.active.items()):
+            replacement = self.replacements.get(slot)
+            if not worker.alive:
+                print(f"Worker {worker.name} (pid {worker.pid}) exited with code {worker.process.returncode}")
+                worker.reap()
+                self.active[slot] = self.replacements.pop(slot, None) or self.spawn(slot)
+                continue
+            
+            if replacement is None:
+                if now < worker.next_recycle_at or self.replacements:
+                    # One recycle at a time: a warming replacement costs memory and CPU of its own
+                    continue
+                reason = "rolling restart" if slot in self.rolling_restart else worker.recycle_reason()
+                if reason:
+                    print(f"Recycling worker {worker.name} (pid {worker.pid}): {reason}")
+                    self.replacements[slot] = self.spawn(slot)
+                    self.reasons[slot] = reason
+                continue
+            
+            if replacement.stats()["ready"]:
+                del self.replacements[slot]
+                self.rolling_restart.discard(slot)
+                self.active[slot] = replacement
+                worker.stop()
+                self.retiring.append(worker)
+                print(f"Worker {replacement.name} (pid {replacement.pid}) is ready; draining {worker.name} (pid {worker.pid})")
+            elif not replacement.alive or now - replacement.started_at > settings.SUPERVISOR_READY_TIMEOUT_SECONDS:
+                print(f"Replacement {replacement.name} for worker {worker.name} did not become ready; "
+                      f"keeping the old worker ({self.reasons.get(slot)})")
+                del self.replacements[slot]
+                replacement.stop()
+                self.retiring.append(replacement)
+                worker.next_recycle_at = now + settings.SUPERVISOR_READY_TIMEOUT_SECONDS
+    
+    def shutdown(self):
+        """Stop every worker gracefully, then remove the run folder"""
+        print("Stopping workers")
+        workers = list(self.active.values()) + list(self.replacements.values()) + self.retiring
+        for worker in workers:
+            worker.stop()
+        while workers:
+            workers = [worker for worker in workers if not worker.reap()]
+            time.sleep(0.1)
+        self.sock.close()
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.SUPERVISOR_WORKERS)
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    args, uvicorn_args = parser.parse_known_args(argv)
+    Supervisor(args.workers, args.host, args.port, uvicorn_args).run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+import pytest
+
+@pytest.fixture
+def anyio_backend():
+    # Async tests run on asyncio, the loop the app runs on
+    return "asyncio"
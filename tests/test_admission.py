@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from config import settings
+from services.admission import AdmissionController, admit
+
+pytestmark = pytest.mark.anyio
+
+async def settle():
+    """Let queued tasks run up to their next wait"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+async def test_admits_within_capacity_and_clamps_oversized_requests():
+    controller = AdmissionController("test", 4, max_queue=1, queue_timeout=1)
+    small = await controller.admit(1)
+    assert controller.in_use == 1
+    small.release()
+    big = await controller.admit(100)
+    assert big.weight == 4 and controller.in_use == 4
+    big.release()
+    big.release()
+    assert controller.in_use == 0 and controller.admitted == 2
+
+async def test_queued_requests_are_admitted_in_order():
+    controller = AdmissionController("test", 2, max_queue=5, queue_timeout=5)
+    holder = await controller.admit(1)
+    order = []
+    
+    async def render(name, weight):
+        async with await controller.admit(weight):
+            order.append(name)
+            await asyncio.sleep(0.01)
+    
+    # The heavy request at the head of the queue is not overtaken by the light one behind it
+    tasks = [asyncio.create_task(render("heavy", 2)), asyncio.create_task(render("light", 1))]
+    await settle()
+    assert controller.queued == 2 and controller.in_use == 1 and order == []
+    holder.release()
+    await asyncio.gather(*tasks)
+    assert order == ["heavy", "light"]
+    assert controller.in_use == 0 and controller.queued == 0 and controller.admitted == 3
+
+async def test_queue_timeout_answers_503_with_retry_after():
+    controller = AdmissionController("test", 1, max_queue=5, queue_timeout=0.05)
+    holder = await controller.admit(1)
+    with pytest.raises(HTTPException) as raised:
+        await controller.admit(1)
+    assert raised.value.status_code == 503
+    assert int(raised.value.headers["Retry-After"]) >= 1
+    assert controller.timed_out == 1 and controller.queued == 0 and controller.in_use == 1
+    holder.release()
+    assert controller.in_use == 0
+
+async def test_full_queue_rejects_at_once_with_429():
+    controller = AdmissionController("test", 1, max_queue=1, queue_timeout=5)
+    holder = await controller.admit(1)
+    waiting = asyncio.create_task(controller.admit(1))
+    await settle()
+    with pytest.raises(HTTPException) as raised:
+        await controller.admit(1)
+    assert raised.value.status_code == 429
+    assert int(raised.value.headers["Retry-After"]) >= 1
+    assert controller.rejected == 1 and controller.queued == 1
+    holder.release()
+    (await waiting).release()
+    assert controller.in_use == 0
+
+async def test_cancelled_waiter_leaves_the_queue():
+    controller = AdmissionController("test", 1, max_queue=5, queue_timeout=5)
+    holder = await controller.admit(1)
+    waiting = asyncio.create_task(controller.admit(1))
+    behind = asyncio.create_task(controller.admit(1))
+    await settle()
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert controller.queued == 1 and controller.in_use == 1
+    # Capacity goes to the next waiter, not to the cancelled one
+    holder.release()
+    (await behind).release()
+    assert controller.in_use == 0 and controller.queued == 0
+
+async def test_cancel_just_after_grant_does_not_leak_capacity():
+    controller = AdmissionController("test", 1, max_queue=5, queue_timeout=5)
+    holder = await controller.admit(1)
+    
+    async def render():
+        async with await controller.admit(1):
+            await asyncio.sleep(5)
+    
+    task = asyncio.create_task(render())
+    await settle()
+    # Grant the capacity and cancel before the waiter gets to run
+    holder.release()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert controller.in_use == 0 and controller.queued == 0
+
+async def test_cancelled_render_releases_its_ticket():
+    controller = AdmissionController("test", 1, max_queue=5, queue_timeout=5)
+    
+    async def render():
+        async with await controller.admit(1):
+            await asyncio.sleep(5)
+    
+    task = asyncio.create_task(render())
+    await settle()
+    assert controller.in_use == 1
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert controller.in_use == 0
+
+async def test_disabled_admission_hands_out_empty_tickets(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+    ticket = await admit("test-disabled", 10)
+    assert ticket.weight == 0
+    ticket.release()
@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+import pytest
+from fastapi import HTTPException
+from services.http_ranges import content_disposition, if_range_allows, is_not_modified, parse_range_header, quote_etag
+
+SIZE = 100
+ETAG = '"abc"'
+MODIFIED = datetime(2026, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+MODIFIED_HTTP = "Fri, 02 Jan 2026 03:04:05 GMT"
+EARLIER_HTTP = "Fri, 02 Jan 2026 03:04:04 GMT"
+LATER_HTTP = "Fri, 02 Jan 2026 03:04:06 GMT"
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=90-200", (90, 99)),
+    ("bytes=99-99", (99, 99)),
+    ("BYTES= 5-6 ", (5, 6)),
+    # Suffix ranges: the last n bytes, the whole body when n exceeds it
+    ("bytes=-10", (90, 99)),
+    ("bytes=-1000", (0, 99)),
+    # Multiple ranges, other units and malformed specs fall back to the full body
+    ("bytes=0-1,5-6", None),
+    ("items=0-9", None),
+    ("bytes=5", None),
+    ("bytes=a-b", None),
+    ("bytes=--5", None),
+    ("bytes=9-5", None),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, SIZE) == expected
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=100-", 100),
+    ("bytes=150-200", 100),
+    ("bytes=-0", 100),
+    ("bytes=0-", 0),
+    ("bytes=-5", 0),
+])
+def test_parse_range_header_unsatisfiable(header, size):
+    with pytest.raises(HTTPException) as raised:
+        parse_range_header(header, size)
+    assert raised.value.status_code == 416
+    assert raised.value.headers == {"Content-Range": f"bytes */{size}"}
+
+@pytest.mark.parametrize("headers, last_modified, expected", [
+    ({}, MODIFIED, False),
+    ({"if-none-match": '"abc"'}, MODIFIED, True),
+    ({"if-none-match": 'W/"abc"'}, MODIFIED, True),
+    ({"if-none-match": '"x", W/"abc"'}, MODIFIED, True),
+    ({"if-none-match": "*"}, MODIFIED, True),
+    ({"if-none-match": '"other"'}, MODIFIED, False),
+    # If-None-Match takes precedence over If-Modified-Since
+    ({"if-none-match": '"other"', "if-modified-since": LATER_HTTP}, MODIFIED, False),
+    # Dates compare at second precision, the precision of the header
+    ({"if-modified-since": MODIFIED_HTTP}, MODIFIED, True),
+    ({"if-modified-since": LATER_HTTP}, MODIFIED, True),
+    ({"if-modified-since": EARLIER_HTTP}, MODIFIED, False),
+    ({"if-modified-since": MODIFIED_HTTP}, MODIFIED.replace(tzinfo=None), True),
+    ({"if-modified-since": "not a date"}, MODIFIED, False),
+    ({"if-modified-since": MODIFIED_HTTP}, None, False),
+])
+def test_is_not_modified(headers, last_modified, expected):
+    assert is_not_modified(headers, ETAG, last_modified) is expected
+
+@pytest.mark.parametrize("headers, etag, last_modified, expected", [
+    ({}, ETAG, MODIFIED, True),
+    ({"if-range": '"abc"'}, ETAG, MODIFIED, True),
+    ({"if-range": '"abc"'}, "abc", MODIFIED, True),
+    ({"if-range": '"other"'}, ETAG, MODIFIED, False),
+    # If-Range uses strong comparison: weak validators never match
+    ({"if-range": 'W/"abc"'}, ETAG, MODIFIED, False),
+    ({"if-range": '"abc"'}, 'W/"abc"', MODIFIED, False),
+    # A date must equal Last-Modified exactly
+    ({"if-range": MODIFIED_HTTP}, ETAG, MODIFIED, True),
+    ({"if-range": LATER_HTTP}, ETAG, MODIFIED, False),
+    ({"if-range": EARLIER_HTTP}, ETAG, MODIFIED, False),
+    ({"if-range": MODIFIED_HTTP}, ETAG, None, False),
+    ({"if-range": "garbage"}, ETAG, MODIFIED, False),
+])
+def test_if_range_allows(headers, etag, last_modified, expected):
+    assert if_range_allows(headers, etag, last_modified) is expected
+
+@pytest.mark.parametrize("etag, expected", [
+    ("abc", '"abc"'),
+    (' "abc" ', '"abc"'),
+    ('W/"abc"', 'W/"abc"'),
+])
+def test_quote_etag(etag, expected):
+    assert quote_etag(etag) == expected
+
+@pytest.mark.parametrize("filename, expected", [
+    ("report.docx", 'attachment; filename="report.docx"'),
+    ("résumé 1.docx", "attachment; filename*=utf-8''r%C3%A9sum%C3%A9%201.docx"),
+])
+def test_content_disposition(filename, expected):
+    assert content_disposition(filename) == expected
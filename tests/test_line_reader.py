@@ -0,0 +1,126 @@
+import gzip
+import zlib
+import pytest
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from starlette.requests import Request
+from config import settings
+from services import body_stream
+from services.body_stream import BodyStream
+from services.line_reader import LineReader, iter_lines
+
+TEXT = "# Title\r\nfirst line\r\n\r\n|a|b|\r\n|-|-|\r\n|1|é|\r\nno newline at the end"
+
+def chunked(text: str, size: int) -> list:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+@pytest.mark.parametrize("chunks", [
+    [TEXT],
+    chunked(TEXT, 1),
+    chunked(TEXT, 2),
+    chunked(TEXT, 7),
+    # CRLF split across the chunk boundary
+    ["# Title\r", "\nfirst line\r", "\n\r", "\n|a|b|\r\n|-|-|\r\n|1|é|\r\nno newline at the end"],
+    ["", "# Title", "", "\r\nfirst line\r\n\r\n|a|b|\r\n|-|-|\r\n|1|é|\r\nno newline ", "at the end", ""],
+])
+def test_iter_lines_matches_str_split(chunks):
+    assert list(iter_lines(chunks)) == TEXT.split('\n')
+
+@pytest.mark.parametrize("chunks, expected", [
+    ([], [""]),
+    ([""], [""]),
+    (["\n"], ["", ""]),
+    (["a", "b", "c"], ["abc"]),
+    (["a\n", "b\n"], ["a", "b", ""]),
+    (["a\r", "\n", "b"], ["a\r", "b"]),
+])
+def test_iter_lines_edges(chunks, expected):
+    assert list(iter_lines(chunks)) == expected
+
+def test_line_longer_than_a_chunk():
+    line = "x" * (3 * 4096 + 17)
+    chunks = ["head\n"] + chunked(line, 4096) + ["\r\ntail"]
+    assert list(iter_lines(chunks)) == ["head", line + "\r", "tail"]
+
+def test_line_reader_peek_over_chunks():
+    lines = LineReader(chunked("|a|\n|b|\nafter", 3))
+    assert next(lines) == "|a|"
+    assert lines.peek() == "|b|" and lines.peek() == "|b|"
+    assert next(lines) == "|b|"
+    assert next(lines) == "after"
+    assert lines.peek() is None
+    with pytest.raises(StopIteration):
+        next(lines)
+
+def make_request(body: bytes, chunk_size: int, headers: dict) -> Request:
+    messages = [
+        {"type": "http.request", "body": body[i:i + chunk_size], "more_body": i + chunk_size < len(body)}
+        for i in range(0, len(body), chunk_size)
+    ] or [{"type": "http.request", "body": b"", "more_body": False}]
+    
+    async def receive():
+        return messages.pop(0)
+    
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    return Request(scope, receive)
+
+async def read_lines(body: BodyStream) -> list:
+    # BodyStream is iterated from a render thread, which pulls each chunk through the event loop
+    return await run_in_threadpool(lambda: list(LineReader(body)))
+
+def zstd_compress(data: bytes) -> bytes:
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(data)
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("encoding, compress", [
+    ("identity", lambda data: data),
+    ("gzip", gzip.compress),
+    ("deflate", zlib.compress),
+    ("zstd", zstd_compress),
+])
+async def test_body_stream_lines(encoding, compress, monkeypatch):
+    # Small decompression steps, so CRLFs and the two bytes of "é" land on chunk boundaries
+    monkeypatch.setattr(settings, "INGEST_CHUNK_BYTES", 3)
+    long_line = "y" * 1000
+    text = TEXT.replace("first line", long_line)
+    request = make_request(
+        compress(text.encode("utf-8")), 5, {"Content-Type": "text/markdown; charset=utf-8", "Content-Encoding": encoding}
+    )
+    body = BodyStream(request)
+    
+    assert await read_lines(body) == text.split('\n')
+    assert body.done and body.size == len(text.encode("utf-8"))
+
+@pytest.mark.anyio
+async def test_body_stream_concatenated_gzip_members():
+    request = make_request(gzip.compress(b"a\r") + gzip.compress(b"\nb"), 4, {"Content-Encoding": "gzip"})
+    assert await read_lines(BodyStream(request)) == ["a\r", "b"]
+
+@pytest.mark.anyio
+async def test_body_stream_over_the_size_limit(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_MAX_BYTES", 1000)
+    request = make_request(gzip.compress(b"z" * 5000), 64, {"Content-Encoding": "gzip"})
+    with pytest.raises(HTTPException) as raised:
+        await read_lines(BodyStream(request))
+    assert raised.value.status_code == 413
+
+@pytest.mark.anyio
+async def test_body_stream_truncated_gzip():
+    request = make_request(gzip.compress(b"line\n" * 100)[:-8], 16, {"Content-Encoding": "gzip"})
+    with pytest.raises(HTTPException) as raised:
+        await read_lines(BodyStream(request))
+    assert raised.value.status_code == 400
+
+@pytest.mark.anyio
+async def test_zstd_without_zstandard_is_unsupported(monkeypatch):
+    monkeypatch.setattr(body_stream, "zstandard", None)
+    with pytest.raises(HTTPException) as raised:
+        BodyStream(make_request(b"", 1, {"Content-Encoding": "zstd"}))
+    assert raised.value.status_code == 415
+    assert "zstd" not in raised.value.headers["Accept-Encoding"]
@@ -0,0 +1,150 @@
+import threading
+import time
+import pytest
+from fastapi import HTTPException
+from minio.deleteobjects import DeleteError
+from minio.error import S3Error
+from benchmarks.fake_s3 import InMemoryS3
+from config import settings
+from services.minio_handler import MAX_DELETE_BATCH, MinioHandler
+
+class RecordingS3(InMemoryS3):
+    """The in-memory stand-in, recording delete batches and failing the names it is told to"""
+    def __init__(self, failing=(), delete_delay: float = 0):
+        super().__init__()
+        self.failing = set(failing)
+        self.delete_delay = delete_delay
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.bucket_checks = 0
+        self._count_lock = threading.Lock()
+    
+    def bucket_exists(self, bucket_name: str) -> bool:
+        self.bucket_checks += 1
+        return super().bucket_exists(bucket_name)
+    
+    def remove_objects(self, bucket_name, delete_object_list, **kwargs):
+        names = [delete_object._name for delete_object in delete_object_list]
+        with self._count_lock:
+            self.batches.append(len(names))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delete_delay)
+        with self._count_lock:
+            self.in_flight -= 1
+        failed = [name for name in names if name in self.failing]
+        super().remove_objects(bucket_name, [delete_object for delete_object in delete_object_list
+                                             if delete_object._name not in self.failing])
+        return iter([DeleteError("AccessDenied", "Access Denied", name, None) for name in failed])
+
+class FailingUploadS3(InMemoryS3):
+    """Fails the upload after reading the first bytes of the body, like a dropped connection"""
+    def put_object(self, bucket_name, object_name, data, length, *args, **kwargs):
+        data.read(16)
+        raise S3Error("InternalError", "connection reset", f"/{bucket_name}/{object_name}", "fake", "fake", None,
+                      bucket_name, object_name)
+
+@pytest.fixture
+def s3():
+    return RecordingS3()
+
+@pytest.fixture
+def handler(s3):
+    return MinioHandler(client=s3)
+
+def put(handler: MinioHandler, object_name: str, data: bytes = b"data"):
+    handler.upload_rendered(lambda stream: stream.write(data), object_name, "application/octet-stream")
+
+def stored(s3: InMemoryS3, object_name: str) -> bytes:
+    return s3.get_object(settings.MINIO_BUCKET_NAME, object_name).read()
+
+def test_upload_rendered_streams_through_the_pipe(handler, s3):
+    chunk = bytes(range(256)) * 256
+    
+    def render(stream):
+        # Far more than a pipe buffer holds, so the render has to wait on the upload reading it
+        for _ in range(64):
+            stream.write(chunk)
+    
+    assert handler.upload_rendered(render, "2026/01/02/big.bin", "application/octet-stream") == "2026/01/02/big.bin"
+    assert stored(s3, "2026/01/02/big.bin") == chunk * 64
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("render-pipe:")]
+
+def test_failed_render_is_not_stored(handler, s3):
+    def render(stream):
+        stream.write(b"partial")
+        raise ValueError("render failed")
+    
+    with pytest.raises(ValueError, match="render failed"):
+        handler.upload_rendered(render, "2026/01/02/broken.bin", "application/octet-stream")
+    with pytest.raises(S3Error):
+        s3.stat_object(settings.MINIO_BUCKET_NAME, "2026/01/02/broken.bin")
+
+def test_failed_upload_stops_the_render():
+    handler = MinioHandler(client=FailingUploadS3())
+    written = []
+    
+    def render(stream):
+        for _ in range(1024):
+            written.append(stream.write(b"x" * 65536))
+    
+    with pytest.raises(HTTPException) as raised:
+        handler.upload_rendered(render, "2026/01/02/dropped.bin", "application/octet-stream")
+    assert raised.value.status_code == 500
+    # The render got a broken pipe instead of blocking on a pipe nobody reads
+    assert len(written) < 1024
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("render-pipe:")]
+
+def test_delete_documents_in_bounded_batches(s3, monkeypatch):
+    monkeypatch.setattr(settings, "MINIO_DELETE_CONCURRENCY", 2)
+    s3.delete_delay = 0.02
+    handler = MinioHandler(client=s3)
+    names = [f"2026/01/02/{i:05d}.docx" for i in range(2 * MAX_DELETE_BATCH + 500)]
+    for name in names:
+        put(handler, name)
+    
+    pulled = []
+    
+    def listing():
+        for name in names:
+            pulled.append(name)
+            yield name
+    
+    assert handler.delete_documents(listing()) == (len(names), [])
+    assert sorted(s3.batches) == [500, MAX_DELETE_BATCH, MAX_DELETE_BATCH]
+    assert s3.max_in_flight <= 2
+    assert len(pulled) == len(names)
+    assert list(s3.list_objects(settings.MINIO_BUCKET_NAME)) == []
+
+def test_delete_documents_reports_per_object_errors(handler, s3):
+    for name in ("a.docx", "b.docx", "c.docx"):
+        put(handler, name)
+    s3.failing = {"b.docx"}
+    
+    deleted, errors = handler.delete_documents(["a.docx", "b.docx", "c.docx"])
+    
+    assert deleted == 2
+    assert errors == [{"object_name": "b.docx", "error": "AccessDenied: Access Denied"}]
+    assert [obj.object_name for obj in s3.list_objects(settings.MINIO_BUCKET_NAME)] == ["b.docx"]
+
+def test_delete_prefix_only_touches_the_prefix(handler, s3):
+    for name in ("2026/01/01/a.docx", "2026/01/02/a.docx", "2026/01/02/b.xlsx", "2026/01/03/c.pptx"):
+        put(handler, name)
+    
+    assert handler.delete_prefix("2026/01/02/") == (2, [])
+    assert [obj.object_name for obj in s3.list_objects(settings.MINIO_BUCKET_NAME)] == [
+        "2026/01/01/a.docx", "2026/01/03/c.pptx"
+    ]
+    assert handler.delete_prefix("2027/") == (0, [])
+
+def test_bucket_revalidation_stops_and_joins(handler, s3):
+    handler.start_bucket_revalidation(interval=0.01)
+    time.sleep(0.05)
+    thread = handler._revalidation_thread
+    handler.stop_bucket_revalidation()
+    assert not thread.is_alive() and handler._revalidation_thread is None
+    checks = s3.bucket_checks
+    time.sleep(0.05)
+    assert s3.bucket_checks == checks >= 2
+    assert s3.bucket_exists(settings.MINIO_BUCKET_NAME)
@@ -0,0 +1,108 @@
+import io
+import zipfile
+import docx
+import openpyxl
+from services.docx.docx_creator import DocxCreator
+from services.excel.excel_creator import ExcelCreator
+
+TABLE_1 = "|A|B|\n|-|-|\n|1|[BOLD]x[/BOLD]|"
+TABLE_2 = "|C|D|\n|-|-|\n|2|[COLOR:FF0000]y[/COLOR]|\n|3|[ALIGN:center]z[/ALIGN]|"
+TABLE_3 = "|Q|R|\n|-|-|\n|5|6|"
+
+def crcs(blob: bytes) -> dict:
+    with zipfile.ZipFile(io.BytesIO(blob)) as package:
+        assert package.testzip() is None
+        return {info.filename: info.CRC for info in package.infolist()}
+
+def changed_parts(before: bytes, after: bytes) -> set:
+    old, new = crcs(before), crcs(after)
+    return {name for name in new if old.get(name) != new[name]}
+
+def cells(blob: bytes) -> list:
+    """Every sheet's values, fonts, borders, alignment, dimensions and column widths"""
+    wb = openpyxl.load_workbook(io.BytesIO(blob))
+    return [
+        (
+            ws.title,
+            ws.dimensions,
+            [
+                [
+                    (
+                        cell.value, cell.font.b, cell.font.color.rgb if cell.font.color else None,
+                        cell.border.left.style, cell.border.bottom.style, cell.alignment.horizontal
+                    )
+                    for cell in row
+                ]
+                for row in ws.iter_rows()
+            ],
+            {letter: column.width for letter, column in ws.column_dimensions.items()},
+        )
+        for ws in wb
+    ]
+
+def paragraphs(blob: bytes) -> list:
+    doc = docx.Document(io.BytesIO(blob))
+    return [(p.style.name, p.text, [run.bold for run in p.runs]) for p in doc.paragraphs]
+
+def tables(blob: bytes) -> list:
+    doc = docx.Document(io.BytesIO(blob))
+    return [[[cell.text for cell in row.cells] for row in table.rows] for table in doc.tables]
+
+def test_workbook_append_round_trip():
+    creator = ExcelCreator()
+    original = creator.create_excel_from_content(f"# Data\n{TABLE_1}\n# Notes\nhello", output=io.BytesIO()).getvalue()
+    
+    # Into existing sheets: only those sheets and the shared styles are rewritten
+    first = creator.append_to_workbook(io.BytesIO(original), f"# Data\n{TABLE_2}\n# Notes\nmore", output=io.BytesIO()).getvalue()
+    assert changed_parts(original, first) == {"xl/worksheets/sheet1.xml", "xl/worksheets/sheet2.xml", "xl/styles.xml"}
+    assert cells(first) == cells(
+        creator.create_excel_from_content(f"# Data\n{TABLE_1}\n\n{TABLE_2}\n# Notes\nhello\nmore", output=io.BytesIO()).getvalue()
+    )
+    
+    # A new sheet: the existing sheets are copied byte for byte
+    second = creator.append_to_workbook(io.BytesIO(first), f"# Extra\n{TABLE_3}", output=io.BytesIO()).getvalue()
+    assert changed_parts(first, second) == {
+        "xl/worksheets/sheet3.xml", "xl/workbook.xml", "xl/_rels/workbook.xml.rels", "[Content_Types].xml"
+    }
+    
+    wb = openpyxl.load_workbook(io.BytesIO(second))
+    assert wb.sheetnames == ["Data", "Notes", "Extra"]
+    data, notes, extra = wb["Data"], wb["Notes"], wb["Extra"]
+    assert data.dimensions == "A1:B5"
+    assert [[cell.value for cell in row] for row in data.iter_rows()] == [
+        ["A", "B"], ["1", "x"], ["C", "D"], ["2", "y"], ["3", "z"]
+    ]
+    assert data["A3"].font.b and data["A3"].alignment.horizontal == "center"
+    assert data["B4"].font.color.rgb == "00FF0000" and not data["B4"].font.b
+    assert data["B5"].alignment.horizontal == "center"
+    assert all(cell.border.top.style == "thin" for row in data.iter_rows() for cell in row)
+    assert data.column_dimensions["A"].width == data.column_dimensions["B"].width == 15
+    assert [[cell.value for cell in row] for row in notes.iter_rows()] == [["hello"], ["more"]]
+    assert extra.dimensions == "A1:B2" and extra["A1"].font.b and extra["B2"].border.left.style == "thin"
+
+def test_document_append_round_trip():
+    creator = DocxCreator()
+    original = creator.create_document(f"# Title\nFirst para\n{TABLE_1}", output=io.BytesIO()).getvalue()
+    
+    first = creator.append_to_document(io.BytesIO(original), "## Added\nMore **bold**", output=io.BytesIO()).getvalue()
+    second = creator.append_to_document(io.BytesIO(first), f"{TABLE_3}\n- item", output=io.BytesIO()).getvalue()
+    # Styles, numbering, headers and footers are reused; only the body is rewritten
+    assert changed_parts(original, first) == {"word/document.xml"}
+    assert changed_parts(first, second) == {"word/document.xml"}
+    
+    fresh = creator.create_document(
+        f"# Title\nFirst para\n{TABLE_1}\n## Added\nMore **bold**\n{TABLE_3}\n- item", output=io.BytesIO()
+    ).getvalue()
+    assert paragraphs(second) == paragraphs(fresh)
+    assert tables(second) == tables(fresh) == [[["A", "B"], ["1", "[BOLD]x[/BOLD]"]], [["Q", "R"], ["5", "6"]]]
+    assert [(style, text) for style, text, _ in paragraphs(second)] == [
+        ("Heading 1", "Title"), ("Normal", "First para"), ("Heading 2", "Added"), ("Normal", "More bold"),
+        ("List Bullet", "item")
+    ]
+    assert paragraphs(second)[3][2] == [None, True]
+    
+    doc = docx.Document(io.BytesIO(second))
+    # Appended content goes before the section properties, which stay last in the body
+    assert doc.element.body[-1].tag.endswith("}sectPr")
+    assert len(doc.sections) == 1
+    assert doc.sections[0].footer.paragraphs[0]._p.xml.count("PAGE") == 1
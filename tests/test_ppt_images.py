@@ -0,0 +1,49 @@
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from pptx import Presentation
+from config import settings
+from services.powerpoint.ppt_creator import PresentationCreator
+
+class SlowImageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/stall":
+            # Headers never arrive
+            time.sleep(2)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.end_headers()
+        # Each byte arrives within the read timeout, the whole body does not
+        for _ in range(20):
+            self.wfile.write(b"x")
+            self.wfile.flush()
+            time.sleep(0.1)
+    
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def image_host(monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_FETCH_TIMEOUT_SECONDS", 0.5)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowImageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+@pytest.mark.parametrize("path", ["/stall", "/trickle"])
+def test_slow_image_counts_as_failed_fetch(image_host, path):
+    creator = PresentationCreator()
+    html = f'<div class="slide"><h1>Title</h1><img src="{image_host}{path}"></div>'
+    
+    started = time.monotonic()
+    output = creator.create_presentation(html)
+    
+    assert time.monotonic() - started < 1.5
+    assert creator._slide_state.image_errors == 1
+    slide = Presentation(io.BytesIO(output.read())).slides[0]
+    assert slide.shapes.title.text == "Title"
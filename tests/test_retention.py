@@ -0,0 +1,69 @@
+import os
+import time
+from datetime import datetime, timedelta
+import pytest
+from config import settings
+from services.artifact_index import ArtifactIndex
+from services.local_store import LocalDocumentStore
+from services.retention import RetentionManager
+
+def write(path, size: int = 10, days_old: float = 0) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    modified = time.time() - days_old * 86400
+    os.utime(path, (modified, modified))
+    return str(path)
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RETENTION_MAX_AGE_DAYS", "*=30")
+    monkeypatch.setattr(settings, "RETENTION_MAX_TOTAL_BYTES", 0)
+    monkeypatch.setattr(settings, "RETENTION_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "RETENTION_BATCH_PAUSE_SECONDS", 0)
+    monkeypatch.setattr(settings, "RETENTION_SCAN_FILES", 100)
+    monkeypatch.setattr(settings, "RETENTION_LEGACY_DIRS", str(tmp_path / "legacy"))
+    index = ArtifactIndex(str(tmp_path / "index.sqlite3"))
+    return RetentionManager(index, LocalDocumentStore(str(tmp_path / "docs")))
+
+def test_unindexed_old_files_are_removed(manager, tmp_path):
+    docs, legacy = tmp_path / "docs", tmp_path / "legacy"
+    old = write(docs / "2020/01/02/old.docx", days_old=90)
+    recent = write(docs / "2026/01/02/recent.docx", days_old=2)
+    just_written = write(docs / "2026/01/03/new.xlsx")
+    leftover = write(docs / "2026/01/02/.recent.docx.abc.tmp", days_old=2)
+    legacy_old = write(legacy / "2020/01/02/deck.pptx", days_old=90)
+    legacy_recent = write(legacy / "2026/01/02/deck.pptx", days_old=2)
+    
+    report = manager.run_once()
+    
+    assert not os.path.exists(old) and not os.path.exists(legacy_old) and not os.path.exists(leftover)
+    assert os.path.exists(recent) and os.path.exists(just_written) and os.path.exists(legacy_recent)
+    # Emptied date folders are pruned in both trees
+    assert not os.path.exists(docs / "2020") and not os.path.exists(legacy / "2020")
+    assert report["indexed_files"] == 2 and report["expired_files"] == 3
+    # The surviving unindexed file is now in the index, dated by its modification time
+    record = manager.artifact_index.get("2026/01/02/recent.docx", "local")
+    assert record["size"] == 10
+    assert datetime.fromisoformat(record["created_at"]) < datetime.now() - timedelta(days=1)
+    # Files still inside the grace period are left for their render to index
+    assert manager.artifact_index.get("2026/01/03/new.xlsx", "local") is None
+
+def test_walk_resumes_across_passes(manager, tmp_path):
+    for i in range(5):
+        write(tmp_path / "docs" / f"2020/01/0{i + 1}/file{i}.docx", days_old=90)
+    manager.scan_files = 2
+    
+    reports = [manager.run_once() for _ in range(3)]
+    
+    assert [report["expired_files"] for report in reports] == [2, 2, 1]
+    assert not os.path.exists(tmp_path / "docs" / "2020")
+
+def test_indexed_files_are_not_recorded_again(manager, tmp_path):
+    path = write(tmp_path / "docs" / "2026/01/02/report.docx", days_old=2)
+    manager.artifact_index.record("local", "2026/01/02/report.docx", path, "Report.docx", "document", 10)
+    
+    report = manager.run_once()
+    
+    assert report["indexed_files"] == 0
+    assert manager.artifact_index.get("2026/01/02/report.docx", "local")["generator"] == "document"
@@ -0,0 +1,140 @@
+import asyncio
+import os
+import pytest
+from services.cancellation import CancelToken, RenderCancelled, cancel_scope, current_token
+from services.single_flight import SingleFlight, fcntl
+
+pytestmark = pytest.mark.anyio
+
+needs_flock = pytest.mark.skipif(fcntl is None, reason="no flock on this platform")
+
+class Render:
+    """A render that counts its calls and finishes when told to"""
+    def __init__(self, result="file", error=None):
+        self.calls = 0
+        self.result = result
+        self.error = error
+        self.release = asyncio.Event()
+        self.started = asyncio.Event()
+    
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+async def test_concurrent_callers_render_once():
+    single_flight = SingleFlight(lock_dir="")
+    render = Render()
+    callers = [asyncio.create_task(single_flight.do("key", render)) for _ in range(2)]
+    await render.started.wait()
+    assert single_flight.in_flight == 1
+    render.release.set()
+    assert await asyncio.gather(*callers) == ["file", "file"]
+    assert render.calls == 1 and single_flight.in_flight == 0
+
+async def test_different_keys_render_separately():
+    single_flight = SingleFlight(lock_dir="")
+    render = Render()
+    render.release.set()
+    assert await asyncio.gather(single_flight.do("a", render), single_flight.do("b", render)) == ["file", "file"]
+    assert render.calls == 2
+
+async def test_error_reaches_every_follower_and_is_not_cached():
+    single_flight = SingleFlight(lock_dir="")
+    render = Render(error=ValueError("render failed"))
+    callers = [asyncio.create_task(single_flight.do("key", render)) for _ in range(3)]
+    await render.started.wait()
+    render.release.set()
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(result, ValueError) and str(result) == "render failed" for result in results)
+    assert single_flight.in_flight == 0
+    
+    # The next call renders again instead of replaying the failure
+    retry = Render()
+    retry.release.set()
+    assert await single_flight.do("key", retry) == "file" and retry.calls == 1
+
+async def test_a_disconnected_follower_does_not_stop_the_render():
+    single_flight = SingleFlight(lock_dir="")
+    render = Render()
+    leaving, staying = CancelToken(), CancelToken()
+    
+    async def call(token):
+        with cancel_scope(token):
+            return await single_flight.do("key", render)
+    
+    callers = [asyncio.create_task(call(leaving)), asyncio.create_task(call(staying))]
+    await render.started.wait()
+    leaving.cancel("client disconnected")
+    await asyncio.sleep(0.01)
+    render.release.set()
+    first, second = await asyncio.gather(*callers, return_exceptions=True)
+    assert isinstance(first, RenderCancelled) and second == "file"
+    assert render.calls == 1
+
+async def test_the_render_is_cancelled_once_every_caller_left():
+    single_flight = SingleFlight(lock_dir="")
+    seen = []
+    
+    async def render():
+        seen.append(current_token())
+        # Like a render loop reaching its next checkpoint
+        await current_token().wait()
+        current_token().raise_if_cancelled()
+    
+    tokens = [CancelToken(), CancelToken()]
+    
+    async def call(token):
+        with cancel_scope(token):
+            return await single_flight.do("key", render)
+    
+    callers = [asyncio.create_task(call(token)) for token in tokens]
+    await asyncio.sleep(0.01)
+    for token in tokens:
+        token.cancel("client disconnected")
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(result, RenderCancelled) for result in results)
+    assert seen[0].cancelled
+
+@needs_flock
+async def test_lock_file_is_held_during_the_render_and_removed_after(tmp_path):
+    single_flight = SingleFlight(lock_dir=str(tmp_path))
+    render = Render()
+    caller = asyncio.create_task(single_flight.do("key", render))
+    await render.started.wait()
+    assert os.listdir(tmp_path) == ["key.lock"]
+    render.release.set()
+    assert await caller == "file"
+    assert os.listdir(tmp_path) == []
+    
+    failing = Render(error=RuntimeError("boom"))
+    failing.release.set()
+    with pytest.raises(RuntimeError):
+        await single_flight.do("key", failing)
+    assert os.listdir(tmp_path) == []
+
+@needs_flock
+async def test_another_worker_waits_and_reuses_the_result(tmp_path):
+    # Two SingleFlight instances sharing a lock directory stand in for two workers
+    first, second = SingleFlight(lock_dir=str(tmp_path)), SingleFlight(lock_dir=str(tmp_path))
+    render, duplicate = Render(), Render()
+    produced = []
+    
+    async def produce():
+        result = await render()
+        produced.append(result)
+        return result
+    
+    leader = asyncio.create_task(first.do("key", produce))
+    await render.started.wait()
+    follower = asyncio.create_task(second.do("key", duplicate, recheck=lambda since: produced[0] if produced else None))
+    await asyncio.sleep(0.05)
+    # Still blocked on the first worker's lock file
+    assert not follower.done() and duplicate.calls == 0
+    render.release.set()
+    assert await asyncio.gather(leader, follower) == ["file", "file"]
+    assert render.calls == 1 and duplicate.calls == 0
+    assert os.listdir(tmp_path) == []